@@ -0,0 +1,65 @@
+"""
+API Response Benchmark
+Per-request latency of the profile listing, eUICC info and NDJSON export endpoints
+Requests go through httpx's in-process ASGI transport against the in-memory store, with rate limiting off.
+Run from the repository root: python -m benchmarks.api_responses
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime
+import httpx
+import jwt
+
+from src.api.rest_api import ESIMAPIServer
+from src.core.esim_manager import ESIMProfile, EUICCInfo, ProfileState
+
+async def main(profiles: int, operators: int, icon_size: int, page_size: int, requests: int):
+    server = ESIMAPIServer({'jwt_secret': 'benchmark', 'rate_limit_enabled': False, 'list_max_page_size': page_size})
+    manager = server.esim_manager
+    await manager.initialize()
+    
+    # Half the profiles carry an operator icon; the first 500 share one eUICC
+    icons = [random.randbytes(icon_size) for _ in range(operators)]
+    now = datetime.utcnow()
+    busy_eid = 'F' * 32
+    await manager.register_euicc(EUICCInfo(busy_eid, {'svn': '2.2'}, [], None, 'lpa.ds.gsma.com'))
+    for i in range(profiles):
+        op = i % operators
+        eid = busy_eid if i < 500 else f"{i // 4:032X}"
+        await manager.store.store_profile(eid, ESIMProfile(
+            f"8901{i:015d}", f"A0000005591010FFFFFFFF89{i:08d}", ProfileState.DISABLED, None,
+            f"Operator {op}", f"Plan {op}", "png", bytes(icons[op]) if i % 2 else None, "operational",
+            {"notification_address": f"smdp{op}.example.com"}, None, "A0000005591010", now, now
+        ))
+    
+    token = jwt.encode({'exp': time.time() + 3600, 'sub': 'benchmark'}, 'benchmark', algorithm='HS256')
+    headers = {'Authorization': f'Bearer {token}'}
+    cases = [
+        (f"list, {page_size}-row page", f"/api/v1/profiles?limit={page_size}", requests),
+        ("eUICC info, 500 profiles", f"/api/v1/euicc/{busy_eid}/info", requests),
+        (f"NDJSON export, {profiles} rows", "/api/v1/profiles/stream", max(1, requests // 12))
+    ]
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url='http://bench') as client:
+        for label, url, count in cases:
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+            start = time.perf_counter()
+            for _ in range(count):
+                response = await client.get(url, headers=headers)
+            elapsed = (time.perf_counter() - start) / count
+            print(f"{label:28s} {elapsed * 1000:7.1f} ms/request  {len(response.content) / 1e6:5.1f} MB")
+    
+    await manager.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API response serialization benchmark")
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--operators", type=int, default=20)
+    parser.add_argument("--icon-size", type=int, default=3000)
+    parser.add_argument("--page-size", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=60, help="Timed requests per endpoint; the export runs 1/12 as many")
+    args = parser.parse_args()
+    asyncio.run(main(args.profiles, args.operators, args.icon_size, args.page_size, args.requests))
@@ -0,0 +1,46 @@
+"""
+Auth Cache Benchmark
+Per-request bearer token verification: jwt.decode on every request vs TokenVerifier's claim cache
+Run from the repository root: python -m benchmarks.auth_cache
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+import jwt
+
+from src.api.auth import TokenVerifier
+
+SECRET = "benchmark-secret-0123456789"
+
+def decode_every_request(token: str):
+    """What each route did before the verifier: decode and check exp"""
+    payload = jwt.decode(token, SECRET, algorithms=['HS256'])
+    if payload.get('exp', 0) < datetime.utcnow().timestamp():
+        raise ValueError("Token expired")
+    return payload
+
+async def main(iterations: int):
+    token = jwt.encode({'exp': time.time() + 3600, 'sub': 'bench', 'scopes': ['profiles']},
+                       SECRET, algorithm='HS256')
+    verifier = TokenVerifier(SECRET)
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        decode_every_request(token)
+    decoded = (time.perf_counter() - start) / iterations
+    
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await verifier.verify(token)
+    cached = (time.perf_counter() - start) / iterations
+    
+    print(f"jwt.decode + expiry check  {decoded * 1e6:6.1f} us/request")
+    print(f"TokenVerifier (cached)     {cached * 1e6:6.1f} us/request")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bearer token verification benchmark")
+    parser.add_argument("--iterations", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(main(args.iterations))
@@ -0,0 +1,91 @@
+"""
+Download Stages Benchmark
+download_profile latency with its stages run one after another vs the concurrent stage phases
+Runs against the in-process stub SM-DP+ with an artificial delay on every store round trip.
+Every download runs its own InitiateAuthentication / AuthenticateClient / GetBoundProfilePackage.
+Run from the repository root: python -m benchmarks.download_stages
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from src.core.esim_manager import ESIMManager, EUICCInfo, OperationResult, _discard_spool
+from src.core.smdp_stub import StubSMDPServer
+
+STORE_CALLS = ('get_euicc_info', 'get_profile', 'store_profile', 'save_notification_event')
+
+async def sequential_download(manager: ESIMManager, eid: str, activation_code: str) -> dict:
+    """
+    The same stages awaited strictly in order, as download_profile did before
+    The notification re-reads the stored profile for its address, as it used to
+    """
+    async with manager.eid_locks.acquire(eid):
+        if not await manager._get_euicc_info(eid):
+            raise ValueError("Invalid EID")
+        profile_info = await manager._parse_activation_code(activation_code)
+        channel = await manager._establish_secure_channel(profile_info['smdp_address'])
+        profile_data = await manager._download_from_smdp(channel, profile_info, None)
+        try:
+            result = await manager._install_profile(eid, profile_data)
+        finally:
+            _discard_spool(profile_data['bpp_path'])
+        await manager._store_profile_info(eid, profile_data, result)
+        await manager._send_profile_notification(eid, profile_data['iccid'], "download", result)
+        return {"result": OperationResult.OK.value}
+
+def with_delay(method, delay: float):
+    async def delayed(*args, **kwargs):
+        await asyncio.sleep(delay)
+        return await method(*args, **kwargs)
+    return delayed
+
+async def run(sequential: bool, args) -> list:
+    smdp = StubSMDPServer(bpp_size=args.bpp_size, latency=args.smdp_latency_ms / 1000)
+    address = await smdp.start()
+    manager = ESIMManager({
+        'default_notification_address': address,
+        'notification_batch_delay_seconds': 5
+    })
+    await manager.initialize()
+    for name in STORE_CALLS:
+        setattr(manager.store, name, with_delay(getattr(manager.store, name), args.store_rtt_ms / 1000))
+    
+    eids = [f"{i:032X}" for i in range(args.downloads + 1)]
+    for eid in eids:
+        await manager.register_euicc(EUICCInfo(eid, {}, [], None, 'lpa.ds.gsma.com'))
+    # Warm the HTTP pool before measuring
+    await manager.download_profile(eids[0], f"1${address}$WARMUP")
+    
+    latencies = []
+    for i, eid in enumerate(eids[1:]):
+        code = f"1${address}$MATCH{i}"
+        start = time.perf_counter()
+        if sequential:
+            result = await sequential_download(manager, eid, code)
+        else:
+            result = await manager.download_profile(eid, code)
+        latencies.append(time.perf_counter() - start)
+        if result['result'] != OperationResult.OK.value:
+            raise RuntimeError(f"Download failed: {result}")
+    
+    await manager.shutdown()
+    await smdp.stop()
+    return sorted(latencies)
+
+async def main(args):
+    for sequential in (True, False):
+        latencies = await run(sequential, args)
+        print(f"{'sequential' if sequential else 'concurrent':10s} "
+              f"mean {statistics.mean(latencies) * 1000:6.2f} ms  "
+              f"p50 {latencies[len(latencies) // 2] * 1000:6.2f} ms  "
+              f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:6.2f} ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="download_profile stage concurrency benchmark")
+    parser.add_argument("--downloads", type=int, default=300)
+    parser.add_argument("--smdp-latency-ms", type=float, default=4.0, help="Stub SM-DP+ delay per ES9+ call")
+    parser.add_argument("--store-rtt-ms", type=float, default=2.0, help="Delay added to every store call")
+    parser.add_argument("--bpp-size", type=int, default=16000)
+    asyncio.run(main(parser.parse_args()))
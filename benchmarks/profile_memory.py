@@ -0,0 +1,111 @@
+"""
+Profile Memory Benchmark
+Traced memory per 1M ESIMProfile objects and to_dict() cost, for the slotted class vs the former dataclass
+Rows are built as a database driver returns them: every string and icon freshly decoded.
+Run from the repository root: python -m benchmarks.profile_memory
+"""
+
+import argparse
+import base64
+import gc
+import random
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from src.core import esim_manager
+from src.core.esim_manager import UNLOADED, ESIMProfile, ProfileState
+
+@dataclass
+class DataclassProfile:
+    """ESIMProfile as it was before the slotted rewrite"""
+    iccid: str
+    isdp_aid: str
+    profile_state: ProfileState
+    profile_nickname: Optional[str]
+    service_provider_name: str
+    profile_name: str
+    icon_type: Optional[str]
+    icon: Optional[bytes]
+    profile_class: str
+    notification_configuration_info: Dict[str, Any]
+    profile_owner: Optional[str]
+    dp_aid: str
+    created_at: datetime
+    updated_at: datetime
+    
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data['profile_state'] = self.profile_state.value
+        data['icon'] = base64.b64encode(self.icon).decode() if self.icon is not None else None
+        data['created_at'] = self.created_at.isoformat()
+        data['updated_at'] = self.updated_at.isoformat()
+        return data
+
+def driver_rows(count: int, operators: int, icons: Optional[list]):
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        op = i % operators
+        timestamp = base + timedelta(seconds=i)
+        # "".join builds a new string object per row, like a driver decoding a column
+        yield dict(
+            iccid=f"8901{i:015d}",
+            isdp_aid=f"A0000005591010FFFFFFFF89{i:08d}",
+            profile_state=ProfileState(("enabled", "disabled")[i % 2]),
+            profile_nickname=None,
+            service_provider_name="".join(["Operator ", str(op)]),
+            profile_name="".join(["Plan ", str(op)]),
+            icon_type="".join(["pn", "g"]),
+            icon=bytes(bytearray(icons[op])) if icons else None,
+            profile_class="".join(["opera", "tional"]),
+            notification_configuration_info={"notification_address": f"smdp{op}.example.com"},
+            profile_owner=None,
+            dp_aid="".join(["A000000559", "1010"]),
+            created_at=timestamp,
+            updated_at=timestamp
+        )
+
+def measure(label: str, cls, rows, count: int, to_dict_samples: int):
+    gc.collect()
+    tracemalloc.start()
+    profiles = [cls(**row) for row in rows]
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    sample = profiles[:to_dict_samples]
+    start = time.perf_counter()
+    for profile in sample:
+        profile.to_dict()
+    per_call = (time.perf_counter() - start) / len(sample)
+    
+    print(f"{label:28s} {current / count * 1_000_000 / 2 ** 20:8.0f} MiB per 1M profiles  "
+          f"to_dict {per_call * 1e6:5.1f} us")
+    del profiles
+    esim_manager._interned_icons.clear()
+    esim_manager._interned_notification_info.clear()
+
+def unloaded(rows):
+    for row in rows:
+        row['icon'] = UNLOADED
+        row['notification_configuration_info'] = UNLOADED
+        yield row
+
+def main(count: int, operators: int, icon_size: int, to_dict_samples: int):
+    icons = [random.randbytes(icon_size) for _ in range(operators)]
+    measure("dataclass (before)", DataclassProfile, driver_rows(count, operators, icons), count, to_dict_samples)
+    measure("slotted, details loaded", ESIMProfile, driver_rows(count, operators, icons), count, to_dict_samples)
+    measure("slotted, details unloaded", ESIMProfile, unloaded(driver_rows(count, operators, icons)),
+            count, to_dict_samples)
+    measure("dataclass, no icons", DataclassProfile, driver_rows(count, operators, None), count, to_dict_samples)
+    measure("slotted, no icons", ESIMProfile, driver_rows(count, operators, None), count, to_dict_samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ESIMProfile memory benchmark")
+    parser.add_argument("--profiles", type=int, default=100000, help="Profiles built per variant; results are scaled to 1M")
+    parser.add_argument("--operators", type=int, default=20)
+    parser.add_argument("--icon-size", type=int, default=3000)
+    parser.add_argument("--to-dict-samples", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.profiles, args.operators, args.icon_size, args.to_dict_samples)
@@ -0,0 +1,177 @@
+"""
+Sharding Benchmark
+Starts several API workers sharing one SQLite store and a shard_dir, checks that EID-affine routing
+stays consistent, and measures the latency added by forwarding a request to the owning worker.
+Run from the repository root: python -m benchmarks.sharding
+"""
+
+import argparse
+import asyncio
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+import jwt
+
+from src.api.sharding import HashRing
+from src.core.esim_manager import EUICCInfo
+from src.core.smdp_stub import StubSMDPServer
+from src.database.sqlite_store import SQLiteProfileStore
+
+SECRET = "benchmark"
+
+def run_worker(worker_id: str, port: int, workdir: str, smdp_address: str):
+    import uvicorn
+    from src.api.rest_api import ESIMAPIServer
+    
+    server = ESIMAPIServer({
+        'jwt_secret': SECRET,
+        'storage_backend': 'sqlite',
+        'sqlite_path': os.path.join(workdir, 'profiles.db'),
+        'default_notification_address': smdp_address,
+        'rate_limit_enabled': False,
+        'shard_dir': os.path.join(workdir, 'shards'),
+        'shard_worker_id': worker_id,
+        'shard_refresh_seconds': 0.5,
+        'stats_reconcile_interval_seconds': 0
+    })
+    uvicorn.run(server.app, host='127.0.0.1', port=port, log_level='warning')
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if (await client.get('/health')).status_code == 200:
+                return
+        except httpx.TransportError:
+            if time.monotonic() > deadline:
+                raise
+        await asyncio.sleep(0.2)
+
+async def timed(client: httpx.AsyncClient, url: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        (await client.get(url)).raise_for_status()
+    return (time.perf_counter() - start) / requests
+
+async def print_stats(clients, names, store: SQLiteProfileStore):
+    for name in names:
+        print(f"stats via {name}:", (await clients[name].get('/api/v1/stats')).json()['by_state'])
+    by_state = {}
+    for (state, _, _), count in (await store.count_profiles_by_group()).items():
+        by_state[state] = by_state.get(state, 0) + count
+    print("store:", by_state)
+
+async def main(workers: int, eid_count: int, requests: int, base_port: int):
+    workdir = tempfile.mkdtemp(prefix='esim-shard-bench-')
+    smdp = StubSMDPServer(bpp_size=2000, latency=0.0)
+    address = await smdp.start()
+    ports = {f"w{i + 1}": base_port + i for i in range(workers)}
+    
+    # The schema is created before any worker starts so they do not race on it
+    store = SQLiteProfileStore(os.path.join(workdir, 'profiles.db'))
+    await store.initialize()
+    eids = [f"{i:032X}" for i in range(eid_count)]
+    for eid in eids:
+        await store.put_euicc_info(EUICCInfo(eid, {}, [], None, 'lpa.ds.gsma.com'))
+    
+    processes = {
+        worker_id: subprocess.Popen([sys.executable, '-m', 'benchmarks.sharding', '--worker', worker_id,
+                                     '--port', str(port), '--workdir', workdir, '--smdp', address])
+        for worker_id, port in ports.items()
+    }
+    token = jwt.encode({'exp': time.time() + 3600, 'sub': 'benchmark'}, SECRET, algorithm='HS256')
+    clients = {
+        worker_id: httpx.AsyncClient(base_url=f'http://127.0.0.1:{port}',
+                                     headers={'Authorization': f'Bearer {token}'}, timeout=30)
+        for worker_id, port in ports.items()
+    }
+    names = list(ports)
+    try:
+        for client in clients.values():
+            await wait_ready(client)
+        # Let every worker see the full membership
+        await asyncio.sleep(1.0)
+        
+        ring = HashRing(names)
+        print("owners", {name: sum(ring.owner(eid) == name for eid in eids) for name in names})
+        
+        # Download through one worker, enable through the next, read through a third
+        iccids = {}
+        for i, eid in enumerate(eids):
+            result = (await clients[names[i % workers]].post('/api/v1/profiles/download', json={
+                'eid': eid, 'activation_code': f"1${address}$MATCH{i}"})).json()
+            assert result['result'] == 'ok', result
+            iccids[eid] = result['iccid']
+        for i, eid in enumerate(eids):
+            result = (await clients[names[(i + 1) % workers]].post('/api/v1/profiles/enable', json={
+                'eid': eid, 'iccid': iccids[eid]})).json()
+            assert result['result'] == 'ok', result
+            info = (await clients[names[(i + 2) % workers]].get(f'/api/v1/euicc/{eid}/info')).json()
+            assert info['profiles'][0]['profile_state'] == 'enabled', info
+        print(f"{eid_count} downloads and enables across workers: consistent")
+        
+        batch = (await clients[names[0]].post('/api/v1/profiles/batch', json={'operations': [
+            {'operation': 'disable', 'eid': eid, 'iccid': iccids[eid]} for eid in eids]})).json()
+        in_order = [item['index'] for item in batch['results']] == list(range(eid_count))
+        print(f"batch of {eid_count}: {batch['succeeded']} succeeded, {batch['failed']} failed, merged in order: {in_order}")
+        
+        await asyncio.sleep(0.3)
+        await print_stats(clients, names, store)
+        
+        eid = eids[0]
+        owner = ring.owner(eid)
+        peer = next(name for name in names if name != owner)
+        url = f'/api/v1/euicc/{eid}/info'
+        direct = await timed(clients[owner], url, requests)
+        forwarded = await timed(clients[peer], url, requests)
+        print(f"eUICC info via owner  {direct * 1000:6.2f} ms/request")
+        print(f"eUICC info via peer   {forwarded * 1000:6.2f} ms/request  (+{(forwarded - direct) * 1000:.2f} ms forwarding)")
+        
+        # The last worker leaves; its EIDs move to the survivors
+        leaving = names[-1]
+        processes[leaving].send_signal(signal.SIGTERM)
+        processes[leaving].wait()
+        await asyncio.sleep(1.5)
+        survivors = names[:-1]
+        enabled = 0
+        for eid in eids:
+            result = (await clients[survivors[0]].post('/api/v1/profiles/enable', json={
+                'eid': eid, 'iccid': iccids[eid]})).json()
+            enabled += result['result'] == 'ok'
+        print(f"after {leaving} left: {enabled}/{eid_count} enables succeeded")
+        await asyncio.sleep(0.3)
+        await print_stats(clients, survivors, store)
+    finally:
+        for client in clients.values():
+            await client.aclose()
+        for process in processes.values():
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+        for process in processes.values():
+            process.wait()
+        await store.close()
+        await smdp.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-worker sharding benchmark")
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--eids", type=int, default=30)
+    parser.add_argument("--requests", type=int, default=300, help="Timed eUICC info reads per path")
+    parser.add_argument("--base-port", type=int, default=8101)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--workdir", help=argparse.SUPPRESS)
+    parser.add_argument("--smdp", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.workers < 2:
+        parser.error("--workers must be at least 2")
+    if args.worker:
+        run_worker(args.worker, args.port, args.workdir, args.smdp)
+    else:
+        asyncio.run(main(args.workers, args.eids, args.requests, args.base_port))
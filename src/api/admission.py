@@ -0,0 +1,310 @@
+"""
+API Admission Control
+Per-client token-bucket rate limits and a bounded, latency-budgeted download queue
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+from fastapi import HTTPException, status
+
+RateLimitLoader = Callable[[], Awaitable[Dict[str, int]]]
+
+def _retry_after(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+class RateLimiter:
+    """
+    Per-client token buckets
+    Each client refills at its api_tokens.rate_limit_per_hour and may burst up
+    to burst_seconds worth of requests. Limits are refreshed in the background.
+    With a Redis client the budget is shared between workers as a fixed window
+    of burst_seconds per client; Redis failures fall back to the local buckets.
+    """
+    
+    def __init__(self,
+                 default_limit_per_hour: int = 1000,
+                 burst_seconds: float = 300.0,
+                 limits_loader: Optional[RateLimitLoader] = None,
+                 refresh_seconds: float = 60.0,
+                 max_clients: int = 100000,
+                 redis_client: Any = None,
+                 namespace: str = "esim"):
+        self.default_limit_per_hour = default_limit_per_hour
+        self.burst_seconds = burst_seconds
+        self.limits_loader = limits_loader
+        self.refresh_seconds = refresh_seconds
+        self.max_clients = max_clients
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.logger = logging.getLogger(__name__)
+        self._limits: Dict[str, int] = {}
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.redis_errors = 0
+    
+    async def start(self):
+        """Load per-client limits and keep them refreshed"""
+        await self.refresh_limits()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def refresh_limits(self):
+        if self.limits_loader is not None:
+            try:
+                self._limits = dict(await self.limits_loader())
+            except Exception as e:
+                self.logger.error(f"Rate limit refresh failed: {str(e)}")
+    
+    def limit_for(self, client: str) -> int:
+        return self._limits.get(client) or self.default_limit_per_hour
+    
+    def capacity_for(self, client: str) -> float:
+        """Largest number of requests the client may make at once"""
+        return max(1.0, self.limit_for(client) * self.burst_seconds / 3600)
+    
+    async def check(self, client: str, cost: int = 1) -> float:
+        """Take cost requests from the client's budget; 0 if admitted, else seconds until retry"""
+        limit = self.limit_for(client)
+        capacity = self.capacity_for(client)
+        if self.redis_client is not None:
+            try:
+                return await self._check_redis(client, capacity, cost)
+            except Exception as e:
+                self.redis_errors += 1
+                self.logger.warning(f"Redis rate limit check failed: {str(e)}")
+        return self._check_local(client, capacity, limit / 3600, cost)
+    
+    def _check_local(self, client: str, capacity: float, rate: float, cost: int) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(client)
+        if bucket is None:
+            bucket = self._buckets[client] = [capacity, now]
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+        
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return 0.0
+        return (cost - bucket[0]) / rate
+    
+    async def _check_redis(self, client: str, capacity: float, cost: int) -> float:
+        now = time.time()
+        window = int(now // self.burst_seconds)
+        key = f"{self.namespace}:ratelimit:{client}:{window}"
+        count = await self.redis_client.incrby(key, cost)
+        if count == cost:
+            await self.redis_client.pexpire(key, int(self.burst_seconds * 1000) + 1000)
+        if count <= capacity:
+            return 0.0
+        return (window + 1) * self.burst_seconds - now
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            await self.refresh_limits()
+
+class ConcurrencyLimiter:
+    """
+    Concurrency limit with a bounded FIFO queue
+    A request waits for a slot only if the queue has room and the expected wait
+    (queue position times the average slot hold time, spread over the slots) fits
+    within latency_budget; otherwise it is shed immediately. Waiters still queued
+    when the budget runs out are shed as well. Freed slots are handed directly to
+    the oldest waiter.
+    """
+    
+    def __init__(self, limit: int = 64, max_queue: int = 256, latency_budget: float = 2.0):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.latency_budget = latency_budget
+        self.active = 0
+        self.hold_time: Optional[float] = None
+        self._waiters: "deque[asyncio.Future]" = deque()
+    
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+    
+    def expected_wait(self, position: int) -> float:
+        """Estimated wait of the position-th queued request (1-based)"""
+        return math.ceil(position / self.limit) * (self.hold_time or 0.0)
+    
+    async def acquire(self, wait: bool = False) -> bool:
+        """
+        Take a slot, returning whether the request had to queue; raises HTTP 503 when shed
+        With wait the caller queues for as long as it takes, for bulk work with no latency budget.
+        """
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return False
+        
+        expected = self.expected_wait(len(self._waiters) + 1)
+        if not wait and (len(self._waiters) >= self.max_queue or expected > self.latency_budget):
+            raise self._overloaded(expected)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await asyncio.wait_for(future, None if wait else self.latency_budget)
+        except asyncio.TimeoutError:
+            raise self._overloaded(self.expected_wait(len(self._waiters)))
+        except asyncio.CancelledError:
+            # The slot may have been handed over just before the caller went away
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            if future in self._waiters:
+                self._waiters.remove(future)
+        return True
+    
+    def release(self):
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+    
+    def observe(self, seconds: float):
+        """Fold one slot hold time into the moving average"""
+        self.hold_time = seconds if self.hold_time is None else 0.9 * self.hold_time + 0.1 * seconds
+    
+    def _overloaded(self, expected: float) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, retry later",
+            headers=_retry_after(expected or self.latency_budget)
+        )
+
+class AdmissionController:
+    """
+    Admission control for the API
+    Every authenticated request is charged against its client's rate limit
+    (HTTP 429 when exhausted). Batch operations are charged per operation to
+    a separate per-client budget, batch_limiter, so a fleet-sized batch does
+    not have to fit in the request burst; a batch larger than that budget's
+    burst gets HTTP 413. Downloads, batch items included, additionally pass
+    through the global download concurrency limit (HTTP 503 when shed).
+    429 and 503 carry Retry-After.
+    Decisions are counted in stats() and, given a Prometheus registry, in
+    admission_requests{gate,decision} with a download queue depth gauge.
+    """
+    
+    def __init__(self,
+                 rate_limiter: RateLimiter,
+                 download_limiter: ConcurrencyLimiter,
+                 rate_limit_enabled: bool = True,
+                 registry: Any = None,
+                 namespace: str = "esim",
+                 batch_limiter: Optional[RateLimiter] = None):
+        self.rate_limiter = rate_limiter
+        self.download_limiter = download_limiter
+        self.rate_limit_enabled = rate_limit_enabled
+        self.batch_limiter = batch_limiter
+        self.counts: Dict[str, int] = {
+            'rate_limit_admitted': 0,
+            'rate_limited': 0,
+            'batch_admitted': 0,
+            'batch_limited': 0,
+            'download_admitted': 0,
+            'download_queued': 0,
+            'download_shed': 0
+        }
+        self._counters: Dict[str, Any] = {}
+        if registry is not None:
+            from prometheus_client import Counter, Gauge
+            requests = Counter(
+                'admission_requests', 'API admission decisions',
+                ['gate', 'decision'], namespace=namespace, registry=registry
+            )
+            for name in self.counts:
+                gate = next(g for g in ('download', 'batch', 'rate_limit') if name.startswith(g))
+                decision = 'shed' if name.endswith('_limited') else name.rsplit('_', 1)[-1]
+                self._counters[name] = requests.labels(gate, decision)
+            queue_depth = Gauge(
+                'admission_download_queue_depth', 'Downloads waiting for a slot',
+                namespace=namespace, registry=registry
+            )
+            queue_depth.set_function(lambda: self.download_limiter.queued)
+    
+    async def admit(self, client: str):
+        """Charge one request to the client, raising HTTP 429 when over its limit"""
+        if self.rate_limit_enabled:
+            await self._charge(self.rate_limiter, client, 1, 'rate_limit_admitted', 'rate_limited')
+    
+    async def admit_batch(self, client: str, operations: int):
+        """Charge a batch's operations to the client's batch budget (HTTP 429, or 413 if it can never fit)"""
+        if self.rate_limit_enabled and self.batch_limiter is not None and operations > 0:
+            await self._charge(self.batch_limiter, client, operations, 'batch_admitted', 'batch_limited')
+    
+    async def _charge(self, limiter: RateLimiter, client: str, cost: int, admitted: str, limited: str):
+        capacity = limiter.capacity_for(client)
+        if cost > capacity:
+            # Could never be admitted; retrying would not help
+            self._count(limited)
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Request exceeds the client's burst limit of {int(capacity)} operations"
+            )
+        
+        retry_after = await limiter.check(client, cost)
+        if retry_after:
+            self._count(limited)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Rate limit exceeded",
+                headers=_retry_after(retry_after)
+            )
+        self._count(admitted)
+    
+    @asynccontextmanager
+    async def download_slot(self, wait: bool = False):
+        """Hold one of the download concurrency slots, raising HTTP 503 when shed unless wait"""
+        try:
+            queued = await self.download_limiter.acquire(wait)
+        except HTTPException:
+            self._count('download_shed')
+            raise
+        self._count('download_queued' if queued else 'download_admitted')
+        
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.download_limiter.observe(time.monotonic() - started)
+            self.download_limiter.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.counts,
+            'download_active': self.download_limiter.active,
+            'download_queue_depth': self.download_limiter.queued,
+            'download_hold_time': self.download_limiter.hold_time,
+            'local_buckets': len(self.rate_limiter._buckets),
+            'redis_errors': self.rate_limiter.redis_errors + (self.batch_limiter.redis_errors
+                                                              if self.batch_limiter else 0)
+        }
+    
+    def _count(self, name: str):
+        self.counts[name] += 1
+        counter = self._counters.get(name)
+        if counter is not None:
+            counter.inc()
@@ -0,0 +1,136 @@
+"""
+API Authentication
+Verified-JWT cache with periodic revocation sync against api_tokens
+"""
+
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence, Set, Tuple
+from fastapi import HTTPException, status
+import jwt
+
+RevocationLoader = Callable[[], Awaitable[Set[str]]]
+
+def token_digest(token: str) -> str:
+    """SHA-256 hex digest of a bearer token, as stored in api_tokens.token_hash"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class TokenVerifier:
+    """
+    Verifies bearer JWTs once and caches the decoded claims until the token's exp
+    Cache keys are token digests, so raw tokens are never retained. Revoked token
+    hashes are refreshed in the background, keeping the database off the request path.
+    """
+    
+    def __init__(self,
+                 secret: str,
+                 algorithms: Sequence[str] = ('HS256',),
+                 max_entries: int = 10000,
+                 default_ttl: float = 300.0,
+                 revocation_loader: Optional[RevocationLoader] = None,
+                 revocation_refresh_seconds: float = 30.0):
+        self.secret = secret
+        self.algorithms = list(algorithms)
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.revocation_loader = revocation_loader
+        self.revocation_refresh_seconds = revocation_refresh_seconds
+        self.logger = logging.getLogger(__name__)
+        self._cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._revoked: Set[str] = set()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.misses = 0
+        self.rejected = 0
+    
+    async def start(self):
+        """Load the revocation list and keep it refreshed"""
+        await self.refresh_revocations()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+    
+    async def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's claims or raise HTTP 401"""
+        digest = token_digest(token)
+        if digest in self._revoked:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+        
+        now = time.time()
+        entry = self._cache.get(digest)
+        if entry is not None:
+            expires_at, claims = entry
+            if expires_at > now:
+                self.hits += 1
+                self._cache.move_to_end(digest)
+                return claims
+            del self._cache[digest]
+            if 'exp' in claims:
+                self.rejected += 1
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+        
+        self.misses += 1
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=self.algorithms)
+        except jwt.ExpiredSignatureError:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expired")
+        except jwt.InvalidTokenError:
+            self.rejected += 1
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+        
+        # Tokens without exp are re-verified after default_ttl
+        expires_at = float(claims['exp']) if 'exp' in claims else now + self.default_ttl
+        self._cache[digest] = (expires_at, claims)
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+        
+        return claims
+    
+    def revoke(self, digest: str):
+        """Revoke a token locally without waiting for the next refresh"""
+        self._revoked.add(digest)
+        self._cache.pop(digest, None)
+    
+    async def refresh_revocations(self):
+        """Reload revoked token hashes, dropping their cached claims and any expired entries"""
+        if self.revocation_loader is not None:
+            try:
+                self._revoked = set(await self.revocation_loader())
+            except Exception as e:
+                self.logger.error(f"Token revocation refresh failed: {str(e)}")
+        
+        for digest in self._revoked:
+            self._cache.pop(digest, None)
+        
+        now = time.time()
+        for digest in [d for d, (expires_at, _) in self._cache.items() if expires_at <= now]:
+            del self._cache[digest]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'cached_tokens': len(self._cache),
+            'revoked_tokens': len(self._revoked),
+            'hits': self.hits,
+            'misses': self.misses,
+            'rejected': self.rejected,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.revocation_refresh_seconds)
+            await self.refresh_revocations()
+    
\ No newline at end of file
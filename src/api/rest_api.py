@@ -3,16 +3,27 @@ RESTful API for eSIM Manager System
 GSMA-compliant endpoints with security and rate limiting
 """
 
-from fastapi import FastAPI, HTTPException, Depends, Security, status
+from fastapi import FastAPI, HTTPException, Depends, Header, Security, Query, Request, status
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from pydantic import BaseModel, Field
 from typing import Dict, List, Optional, Any
 import asyncio
+import base64
+import hashlib
+import json
 import logging
 from datetime import datetime
-import jwt
+import orjson
+from src.api.admission import AdmissionController, ConcurrencyLimiter, RateLimiter
+from src.api.auth import TokenVerifier
+from src.api.sharding import ShardForwardError, ShardRouter
+from src.core.change_feed import ChangeFeedGap
+from src.core.instrumentation import current_traceparent
+from src.core.journal import current_actor
+from src.core.idempotency import IdempotencyConflictError
 from src.core.esim_manager import ESIMManager, ProfileState, OperationResult
 
 # API Models
@@ -36,6 +47,27 @@ class EUICCInfoResponse(BaseModel):
     profiles: List[Dict[str, Any]]
     euicc_info: Dict[str, Any]
 
+class BatchOperationItem(BaseModel):
+    operation: str = Field(..., pattern="^(download|enable|disable|delete)$", description="Lifecycle operation")
+    eid: str = Field(..., description="eUICC Identifier")
+    iccid: Optional[str] = Field(None, description="Profile ICCID (enable/disable/delete)")
+    activation_code: Optional[str] = Field(None, description="SGP.22 Activation Code (download)")
+    confirmation_code: Optional[str] = Field(None, description="Confirmation Code (download)")
+
+class BatchOperationRequest(BaseModel):
+    operations: List[BatchOperationItem] = Field(..., min_length=1, description="Operations to execute")
+    concurrency: Optional[int] = Field(None, ge=1, description="Maximum EIDs processed in parallel")
+
+class BatchOperationResult(ProfileResponse):
+    index: int
+    operation: str
+    eid: str
+
+class BatchOperationResponse(BaseModel):
+    results: List[BatchOperationResult]
+    succeeded: int
+    failed: int
+
 # Security
 security = HTTPBearer()
 
@@ -49,10 +81,60 @@ class ESIMAPIServer:
             description="GSMA SGP.22/SGP.32 Compliant eSIM Management Platform",
             version="1.0.0",
             docs_url="/api/docs",
-            redoc_url="/api/redoc"
+            redoc_url="/api/redoc",
+            default_response_class=ORJSONResponse
         )
         self.esim_manager = ESIMManager(config)
+        self.token_verifier = TokenVerifier(
+            config['jwt_secret'],
+            algorithms=config.get('jwt_algorithms', ['HS256']),
+            max_entries=config.get('auth_cache_size', 10000),
+            default_ttl=config.get('auth_cache_ttl_seconds', 300.0),
+            revocation_refresh_seconds=config.get('token_revocation_refresh_seconds', 30.0)
+        )
+        self.admission = AdmissionController(
+            RateLimiter(
+                default_limit_per_hour=config.get('default_rate_limit_per_hour', 1000),
+                burst_seconds=config.get('rate_limit_burst_seconds', 300.0),
+                refresh_seconds=config.get('rate_limit_refresh_seconds', 60.0)
+            ),
+            ConcurrencyLimiter(
+                limit=config.get('max_concurrent_downloads', 64),
+                max_queue=config.get('download_queue_size', 256),
+                latency_budget=config.get('download_queue_budget_seconds', 2.0)
+            ),
+            rate_limit_enabled=config.get('rate_limit_enabled', True),
+            registry=self.esim_manager.instrumentation.registry,
+            # Batch operations draw on their own per-client budget. Its burst
+            # (operations/hour * burst_seconds / 3600) caps the batch size that can
+            # ever be admitted, so it must be at least batch_max_operations; the
+            # defaults allow ten full 10000-operation batches per hour.
+            batch_limiter=RateLimiter(
+                default_limit_per_hour=config.get('batch_rate_limit_operations_per_hour', 100000),
+                burst_seconds=config.get('batch_rate_limit_burst_seconds', 3600.0),
+                namespace='esim:batch'
+            )
+        )
+        # Batch downloads share the download slots but queue rather than being shed
+        self.esim_manager.download_gate = lambda: self.admission.download_slot(wait=True)
+        # EID-affinity routing between workers sharing shard_dir
+        self.shard_router: Optional[ShardRouter] = None
+        if config.get('shard_dir'):
+            self.shard_router = ShardRouter(
+                self.esim_manager,
+                config['shard_dir'],
+                worker_id=config.get('shard_worker_id'),
+                vnodes=config.get('shard_vnodes', 128),
+                refresh_interval=config.get('shard_refresh_seconds', 1.0),
+                forward_timeout=config.get('shard_forward_timeout_seconds', 30.0)
+            )
         self.logger = logging.getLogger(__name__)
+        batch_capacity = self.admission.batch_limiter.capacity_for('')
+        if self.admission.rate_limit_enabled and batch_capacity < config.get('batch_max_operations', 10000):
+            self.logger.warning(
+                f"Batch rate limit burst of {int(batch_capacity)} operations is below batch_max_operations; "
+                f"larger batches will be rejected with 413"
+            )
         self._setup_middleware()
         self._setup_routes()
     
@@ -77,35 +159,66 @@ class ESIMAPIServer:
         @self.app.on_event("startup")
         async def startup_event():
             await self.esim_manager.initialize()
+            self.token_verifier.revocation_loader = self.esim_manager.store.list_revoked_token_hashes
+            await self.token_verifier.start()
+            self.admission.rate_limiter.limits_loader = self.esim_manager.store.list_client_rate_limits
+            if self.config.get('rate_limit_shared', False):
+                self.admission.rate_limiter.redis_client = self.esim_manager.redis_client
+                self.admission.batch_limiter.redis_client = self.esim_manager.redis_client
+            await self.admission.rate_limiter.start()
+            if self.shard_router:
+                await self.shard_router.start()
             self.logger.info("eSIM Manager API Server started")
         
+        @self.app.on_event("shutdown")
+        async def shutdown_event():
+            if self.shard_router:
+                await self.shard_router.stop()
+            await self.token_verifier.stop()
+            await self.admission.rate_limiter.stop()
+            await self.esim_manager.shutdown()
+            self.logger.info("eSIM Manager API Server stopped")
+        
         @self.app.get("/health")
         async def health_check():
             """Health check endpoint"""
             return {"status": "healthy", "timestamp": datetime.utcnow().isoformat()}
         
+        if self.esim_manager.instrumentation.enabled:
+            @self.app.get("/metrics", include_in_schema=False)
+            async def metrics():
+                """Prometheus scrape endpoint"""
+                body, content_type = self.esim_manager.instrumentation.render()
+                return Response(content=body, media_type=content_type)
+        
         @self.app.post("/api/v1/profiles/download", response_model=ProfileResponse)
         async def download_profile(
             request: ProfileDownloadRequest,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            claims: Dict[str, Any] = Depends(self._authenticate),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
         ):
             """
             SGP.22 Profile Download Endpoint
             Downloads and installs eSIM profile on eUICC
             """
             try:
-                # Validate JWT token
-                await self._validate_token(credentials.credentials)
-                
                 # Execute profile download
-                result = await self.esim_manager.download_profile(
-                    request.eid,
-                    request.activation_code,
-                    request.confirmation_code
-                )
+                async def download():
+                    async with self.admission.download_slot():
+                        return await self._dispatch(
+                            request.eid,
+                            "download_profile",
+                            request.eid,
+                            request.activation_code,
+                            request.confirmation_code
+                        )
+                
+                result = await self._idempotent("download", request, claims, idempotency_key, download)
                 
                 return ProfileResponse(**result)
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"Profile download API error: {str(e)}")
                 raise HTTPException(
@@ -116,19 +229,25 @@ class ESIMAPIServer:
         @self.app.post("/api/v1/profiles/enable", response_model=ProfileResponse)
         async def enable_profile(
             request: ProfileOperationRequest,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            claims: Dict[str, Any] = Depends(self._authenticate),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
         ):
             """Enable eSIM profile"""
             try:
-                await self._validate_token(credentials.credentials)
-                
-                result = await self.esim_manager.enable_profile(
-                    request.eid,
-                    request.iccid
+                result = await self._idempotent(
+                    "enable", request, claims, idempotency_key,
+                    lambda: self._dispatch(
+                        request.eid,
+                        "enable_profile",
+                        request.eid,
+                        request.iccid
+                    )
                 )
                 
                 return ProfileResponse(**result)
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"Profile enable API error: {str(e)}")
                 raise HTTPException(
@@ -139,19 +258,25 @@ class ESIMAPIServer:
         @self.app.post("/api/v1/profiles/disable", response_model=ProfileResponse)
         async def disable_profile(
             request: ProfileOperationRequest,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            claims: Dict[str, Any] = Depends(self._authenticate),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
         ):
             """Disable eSIM profile"""
             try:
-                await self._validate_token(credentials.credentials)
-                
-                result = await self.esim_manager.disable_profile(
-                    request.eid,
-                    request.iccid
+                result = await self._idempotent(
+                    "disable", request, claims, idempotency_key,
+                    lambda: self._dispatch(
+                        request.eid,
+                        "disable_profile",
+                        request.eid,
+                        request.iccid
+                    )
                 )
                 
                 return ProfileResponse(**result)
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"Profile disable API error: {str(e)}")
                 raise HTTPException(
@@ -162,19 +287,25 @@ class ESIMAPIServer:
         @self.app.delete("/api/v1/profiles/delete", response_model=ProfileResponse)
         async def delete_profile(
             request: ProfileOperationRequest,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            claims: Dict[str, Any] = Depends(self._authenticate),
+            idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
         ):
             """Delete eSIM profile"""
             try:
-                await self._validate_token(credentials.credentials)
-                
-                result = await self.esim_manager.delete_profile(
-                    request.eid,
-                    request.iccid
+                result = await self._idempotent(
+                    "delete", request, claims, idempotency_key,
+                    lambda: self._dispatch(
+                        request.eid,
+                        "delete_profile",
+                        request.eid,
+                        request.iccid
+                    )
                 )
                 
                 return ProfileResponse(**result)
                 
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"Profile delete API error: {str(e)}")
                 raise HTTPException(
@@ -182,25 +313,76 @@ class ESIMAPIServer:
                     detail=str(e)
                 )
         
+        @self.app.post("/api/v1/profiles/batch", response_model=BatchOperationResponse)
+        async def batch_operations(
+            request: BatchOperationRequest,
+            claims: Dict[str, Any] = Depends(self._authenticate)
+        ):
+            """
+            Bulk profile lifecycle endpoint
+            Executes mixed operations with one result per item; each operation
+            is charged to the client's batch rate limit budget
+            """
+            max_operations = self.config.get('batch_max_operations', 10000)
+            if len(request.operations) > max_operations:
+                raise HTTPException(
+                    status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    detail=f"Batch exceeds {max_operations} operations"
+                )
+            
+            # The request was charged on authentication; its operations draw on the batch budget
+            client = claims.get('client_id') or claims.get('sub') or ''
+            await self.admission.admit_batch(client, len(request.operations))
+            
+            max_concurrency = self.config.get('batch_max_concurrency', 256)
+            concurrency = min(request.concurrency or max_concurrency, max_concurrency)
+            
+            try:
+                execute_batch = self.shard_router.execute_batch if self.shard_router else self.esim_manager.execute_batch
+                results = await execute_batch(
+                    [item.model_dump() for item in request.operations],
+                    concurrency=concurrency
+                )
+                succeeded = sum(1 for r in results if r['result'] == OperationResult.OK.value)
+                
+                return BatchOperationResponse(
+                    results=[BatchOperationResult(**r) for r in results],
+                    succeeded=succeeded,
+                    failed=len(results) - succeeded
+                )
+                
+            except Exception as e:
+                self.logger.error(f"Batch operations API error: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=str(e)
+                )
+        
         @self.app.get("/api/v1/euicc/{eid}/info", response_model=EUICCInfoResponse)
         async def get_euicc_info(
             eid: str,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            claims: Dict[str, Any] = Depends(self._authenticate)
         ):
             """Get eUICC information and installed profiles"""
             try:
-                await self._validate_token(credentials.credentials)
-                
                 # Get eUICC info and profiles
-                euicc_info = await self.esim_manager._get_euicc_info(eid)
-                profiles = await self.esim_manager._get_profiles_by_eid(eid)
-                
-                return EUICCInfoResponse(
-                    eid=eid,
-                    profiles=profiles,
-                    euicc_info=euicc_info
-                )
+                euicc_info = await self._dispatch(eid, "_get_euicc_info", eid)
+                if not euicc_info:
+                    raise HTTPException(
+                        status_code=status.HTTP_404_NOT_FOUND,
+                        detail="eUICC not found"
+                    )
+                profiles = await self._dispatch(eid, "_get_profiles_by_eid", eid)
                 
+                # Rows are already wire dicts; returning a response skips re-validating them
+                return ORJSONResponse({
+                    "eid": eid,
+                    "profiles": profiles,
+                    "euicc_info": euicc_info.to_dict()
+                })
+            
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"eUICC info API error: {str(e)}")
                 raise HTTPException(
@@ -208,50 +390,220 @@ class ESIMAPIServer:
                     detail=str(e)
                 )
         
+        @self.app.get("/api/v1/stats")
+        async def fleet_stats(claims: Dict[str, Any] = Depends(self._authenticate)):
+            """
+            Profile counts by state, service provider and profile class
+            Served from incrementally maintained counters; reconciled_at is the last
+            correction against the database
+            """
+            if self.shard_router:
+                try:
+                    return ORJSONResponse(await self.shard_router.fleet_stats_snapshot())
+                except ShardForwardError as e:
+                    raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+            return ORJSONResponse(self.esim_manager.fleet_stats.snapshot())
+        
         @self.app.get("/api/v1/profiles")
         async def list_profiles(
             eid: Optional[str] = None,
             state: Optional[str] = None,
-            credentials: HTTPAuthorizationCredentials = Security(security)
+            limit: Optional[int] = Query(None, ge=1, description="Page size"),
+            cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+            claims: Dict[str, Any] = Depends(self._authenticate)
         ):
-            """List eSIM profiles with optional filtering"""
+            """
+            List eSIM profiles with optional filtering
+            Returns every match unless limit or cursor is given; then one keyset page
+            ordered by (eid, iccid) plus next_cursor for the following page
+            """
             try:
-                await self._validate_token(credentials.credentials)
+                self._validate_state(state)
+                
+                if limit is None and cursor is None:
+                    return ORJSONResponse({"profiles": await self.esim_manager._list_profiles(eid, state)})
                 
-                profiles = await self.esim_manager._list_profiles(eid, state)
+                max_page_size = self.config.get('list_max_page_size', 1000)
+                page_size = min(limit or self.config.get('list_page_size', 100), max_page_size)
+                after = self._decode_cursor(cursor) if cursor else None
                 
-                return {"profiles": profiles}
+                # Fetch one extra row to know whether another page exists
+                profiles = await self.esim_manager._list_profiles_page(eid, state, after, page_size + 1)
+                next_cursor = None
+                if len(profiles) > page_size:
+                    profiles = profiles[:page_size]
+                    next_cursor = self._encode_cursor(profiles[-1]['eid'], profiles[-1]['iccid'])
                 
+                return ORJSONResponse({"profiles": profiles, "next_cursor": next_cursor})
+            
+            except HTTPException:
+                raise
             except Exception as e:
                 self.logger.error(f"List profiles API error: {str(e)}")
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=str(e)
                 )
-    
-    async def _validate_token(self, token: str):
-        """Validate JWT authentication token"""
-        try:
-            payload = jwt.decode(
-                token,
-                self.config['jwt_secret'],
-                algorithms=['HS256']
-            )
+        
+        @self.app.get("/api/v1/profiles/stream")
+        async def stream_profiles(
+            eid: Optional[str] = None,
+            state: Optional[str] = None,
+            claims: Dict[str, Any] = Depends(self._authenticate)
+        ):
+            """
+            Export matching profiles as newline-delimited JSON
+            Rows are streamed page by page, so memory stays constant for any fleet size
+            """
+            self._validate_state(state)
             
-            # Additional validation logic
-            if payload.get('exp', 0) < datetime.utcnow().timestamp():
+            # Rows are sent in chunks; one ASGI message per row costs more than encoding it
+            chunk_rows = self.config.get('stream_chunk_rows', 500)
+            
+            async def ndjson_rows():
+                chunk = []
+                async for profile in self.esim_manager._iter_profiles(eid, state):
+                    chunk.append(orjson.dumps(profile))
+                    if len(chunk) >= chunk_rows:
+                        yield b"\n".join(chunk) + b"\n"
+                        chunk = []
+                if chunk:
+                    yield b"\n".join(chunk) + b"\n"
+            
+            return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+        
+        @self.app.get("/api/v1/profiles/changes")
+        async def profile_changes(
+            eid: Optional[str] = None,
+            state: Optional[str] = None,
+            after: Optional[str] = None,
+            last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+            claims: Dict[str, Any] = Depends(self._authenticate)
+        ):
+            """
+            Server-sent events for profile state changes
+            Filter by eid and comma-separated states; resume after an event id with
+            Last-Event-ID or after. A reset event means changes were missed and the
+            client should re-read the profiles it tracks.
+            """
+            feed = self.esim_manager.change_feed
+            if feed is None:
                 raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token expired"
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Change feed is disabled"
                 )
-                
-        except jwt.InvalidTokenError:
+            states = set(state.split(",")) if state else None
+            for requested_state in states or ():
+                self._validate_state(requested_state)
+            
+            subscription = feed.subscribe(eid, states, last_event_id or after)
+            heartbeat = self.config.get('change_feed_heartbeat_seconds', 15.0)
+            chunk_events = self.config.get('stream_chunk_rows', 500)
+            
+            def sse(event: Dict[str, Any]) -> bytes:
+                return b"id: %s\nevent: profile_change\ndata: %s\n\n" % (feed.cursor(event).encode(), orjson.dumps(event))
+            
+            async def events():
+                try:
+                    while True:
+                        try:
+                            event = await subscription.get(heartbeat)
+                        except ChangeFeedGap as e:
+                            yield b"event: reset\ndata: %s\n\n" % orjson.dumps({"detail": str(e)})
+                            continue
+                        if event is None:
+                            yield b": keepalive\n\n"
+                            continue
+                        
+                        # Send whatever else is already buffered in the same chunk
+                        chunk = [sse(event)]
+                        while subscription.pending and len(chunk) < chunk_events:
+                            chunk.append(sse(await subscription.get()))
+                        yield b"".join(chunk)
+                finally:
+                    subscription.close()
+            
+            return StreamingResponse(
+                events(),
+                media_type="text/event-stream",
+                headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+            )
+    
+    @staticmethod
+    def _validate_state(state: Optional[str]):
+        """Reject unknown profile state filters"""
+        if state and state not in {s.value for s in ProfileState}:
             raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid profile state: {state}"
             )
+    
+    @staticmethod
+    def _encode_cursor(eid: str, iccid: str) -> str:
+        """Opaque keyset cursor for the last (eid, iccid) of a page"""
+        return base64.urlsafe_b64encode(json.dumps([eid, iccid]).encode()).decode()
+    
+    @staticmethod
+    def _decode_cursor(cursor: str):
+        try:
+            eid, iccid = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return str(eid), str(iccid)
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+    
+    async def _dispatch(self, eid: str, method: str, *args) -> Any:
+        """Run a manager call, on the worker that owns eid when sharding is enabled"""
+        if self.shard_router:
+            try:
+                return await self.shard_router.call(eid, method, *args)
+            except ShardForwardError as e:
+                raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+        return await getattr(self.esim_manager, method)(*args)
+    
+    async def _idempotent(self,
+                          operation: str,
+                          request: BaseModel,
+                          claims: Dict[str, Any],
+                          idempotency_key: Optional[str],
+                          call) -> Dict[str, Any]:
+        """
+        Run a lifecycle call through the idempotency store
+        With an Idempotency-Key header the key is scoped to the calling client;
+        without one, concurrent identical requests share one execution.
+        """
+        payload = json.dumps({"operation": operation, **request.model_dump()}, sort_keys=True)
+        fingerprint = hashlib.sha256(payload.encode()).hexdigest()
+        if idempotency_key:
+            client = claims.get('client_id') or claims.get('sub') or ''
+            key, derived = f"{operation}:{client}:{idempotency_key}", False
+        elif self.config.get('idempotency_derive_keys', True):
+            key, derived = f"{operation}:{fingerprint}", True
+        else:
+            return await call()
+        
+        try:
+            return await self.esim_manager.idempotency.execute(key, fingerprint, call, derived)
+        except IdempotencyConflictError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+    
+    async def _authenticate(
+        self,
+        request: Request,
+        credentials: HTTPAuthorizationCredentials = Security(security)
+    ) -> Dict[str, Any]:
+        """Authentication and rate limiting dependency shared by all protected routes"""
+        claims = await self.token_verifier.verify(credentials.credentials)
+        client = claims.get('client_id') or claims.get('sub')
+        await self.admission.admit(client or '')
+        # Attributes journaled operations to the calling client
+        current_actor.set(client)
+        if self.esim_manager.instrumentation.enabled:
+            current_traceparent.set(request.headers.get('traceparent'))
+        return claims
 
-# Rate limiting and security decorators would be added here
 # Integration with Redis for session management
 # API versioning support
 # Webhook endpoints for MNO notifications
\ No newline at end of file
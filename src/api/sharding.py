@@ -0,0 +1,422 @@
+"""
+EID-Affinity Sharding
+Consistent-hash ownership of EIDs across API worker processes with Unix-socket forwarding
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+import orjson
+from src.core.instrumentation import current_traceparent
+from src.core.journal import current_actor
+from src.core.esim_manager import ESIMManager, EUICCInfo, OperationResult, ProfileState
+
+_FRAME_HEADER = struct.Struct(">I")
+
+# Fleet statistics are counted by whichever worker owns this key
+FLEET_STATS_KEY = "__fleet_stats__"
+
+class ShardForwardError(Exception):
+    """A forwarded call was sent but its outcome on the owning worker is unknown"""
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hash ring with virtual nodes; adding or removing a worker moves ~1/N of the keys"""
+    
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = 128):
+        self.vnodes = vnodes
+        self.nodes = sorted(set(nodes))
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node) for node in self.nodes for replica in range(vnodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [node for _, node in points]
+    
+    def owner(self, key: str) -> Optional[str]:
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+class _PeerConnection:
+    """Multiplexed request/response connection to one peer worker"""
+    
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._reader_task = asyncio.create_task(self._read_responses())
+    
+    @property
+    def closed(self) -> bool:
+        return self._reader_task.done()
+    
+    async def request(self, method: str, args: List[Any], timeout: float) -> Any:
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._send({
+                "id": request_id,
+                "method": method,
+                "args": args,
+                # The owner journals and traces the call on behalf of the original request
+                "actor": current_actor.get(),
+                "traceparent": current_traceparent.get()
+            })
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(request_id, None)
+    
+    async def notify(self, method: str, args: List[Any]):
+        await self._send({"id": None, "method": method, "args": args})
+    
+    async def close(self):
+        self._reader_task.cancel()
+        self.writer.close()
+    
+    async def _send(self, message: Dict[str, Any]):
+        payload = orjson.dumps(message)
+        self.writer.write(_FRAME_HEADER.pack(len(payload)) + payload)
+        await self.writer.drain()
+    
+    async def _read_responses(self):
+        try:
+            while True:
+                message = await _read_frame(self.reader)
+                future = self._pending.get(message["id"])
+                if future is None or future.done():
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message["result"])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Shard peer connection closed"))
+
+async def _read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    header = await reader.readexactly(_FRAME_HEADER.size)
+    return orjson.loads(await reader.readexactly(_FRAME_HEADER.unpack(header)[0]))
+
+def _encode_euicc_info(info: Optional[EUICCInfo]) -> Optional[Dict[str, Any]]:
+    return info.to_dict() if info is not None else None
+
+def _decode_euicc_info(data: Optional[Dict[str, Any]]) -> Optional[EUICCInfo]:
+    return EUICCInfo.from_dict(data) if data is not None else None
+
+def _identity(value: Any) -> Any:
+    return value
+
+class ShardRouter:
+    """
+    Routes EID-scoped manager calls to the worker that owns the EID
+    Every worker listens on {shard_dir}/{worker_id}.sock; the live sockets in
+    shard_dir are the ring membership, rescanned every refresh_interval. Calls
+    for EIDs owned elsewhere are sent to the owner as length-prefixed JSON
+    frames over a persistent Unix-socket connection, so each EID's cache
+    entries, lock and lifecycle state live in exactly one process.
+    
+    When membership changes the ring is rebuilt and the local lookup cache is
+    cleared, since EIDs that come back to this worker may have been changed
+    by another owner meanwhile. A call whose owner cannot be connected to
+    triggers a rescan and is re-routed, running locally only if it still
+    cannot be sent. Once a request has been sent it is never re-run here: a
+    timeout or lost connection raises ShardForwardError, because the owner
+    may still be executing it. Membership views converge within one refresh
+    interval; during that window two workers may both act for an EID, so
+    store constraints remain the final guard.
+    """
+    
+    # Manager methods a peer may invoke: name -> (result encoder, result decoder)
+    FORWARDED = {
+        "download_profile": (_identity, _identity),
+        "enable_profile": (_identity, _identity),
+        "disable_profile": (_identity, _identity),
+        "delete_profile": (_identity, _identity),
+        "execute_batch": (_identity, _identity),
+        "_get_euicc_info": (_encode_euicc_info, _decode_euicc_info),
+        "_get_profiles_by_eid": (_identity, _identity),
+    }
+    
+    def __init__(self,
+                 manager: ESIMManager,
+                 shard_dir: str,
+                 worker_id: Optional[str] = None,
+                 vnodes: int = 128,
+                 refresh_interval: float = 1.0,
+                 forward_timeout: float = 30.0):
+        self.manager = manager
+        self.shard_dir = Path(shard_dir)
+        self.worker_id = worker_id or str(os.getpid())
+        self.vnodes = vnodes
+        self.refresh_interval = refresh_interval
+        self.forward_timeout = forward_timeout
+        self.logger = logging.getLogger(__name__)
+        self.ring = HashRing([self.worker_id], vnodes)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Dict[str, _PeerConnection] = {}
+        self._connecting: Dict[str, asyncio.Future] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.local_calls = 0
+        self.forwarded_calls = 0
+        self.served_calls = 0
+        self.forward_failures = 0
+        self.rebalances = 0
+    
+    @property
+    def socket_path(self) -> Path:
+        return self.shard_dir / f"{self.worker_id}.sock"
+    
+    async def start(self):
+        """Listen for peers, join the ring and keep membership refreshed"""
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        self._server = await asyncio.start_unix_server(self._serve_peer, path=str(self.socket_path))
+        await self.refresh_membership()
+        self._refresh_task = asyncio.create_task(self._refresh_loop())
+    
+    async def stop(self):
+        """Leave the ring; peers drop this worker on their next rescan"""
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+        for peer in self._peers.values():
+            await peer.close()
+        self._peers.clear()
+    
+    def owns(self, eid: str) -> bool:
+        return self.ring.owner(eid) == self.worker_id
+    
+    async def call(self, eid: str, method: str, *args) -> Any:
+        """Run a manager method for eid on its owning worker"""
+        owner = self.ring.owner(eid)
+        if owner != self.worker_id:
+            peer = await self._connect_owner(eid, owner)
+            if peer is not None:
+                result = await self._request(peer, owner, method, list(args))
+                self.forwarded_calls += 1
+                return self.FORWARDED[method][1](result)
+        
+        self.local_calls += 1
+        return await getattr(self.manager, method)(*args)
+    
+    async def execute_batch(self, operations: List[Dict[str, Any]], concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Split a batch by owning worker, run the parts in parallel and merge results by index"""
+        parts: Dict[str, List[int]] = {}
+        for index, operation in enumerate(operations):
+            parts.setdefault(self.ring.owner(str(operation.get('eid'))), []).append(index)
+        
+        async def run_part(indexes: List[int]) -> List[Dict[str, Any]]:
+            eid = str(operations[indexes[0]].get('eid'))
+            try:
+                results = await self.call(eid, "execute_batch", [operations[i] for i in indexes], concurrency)
+            except ShardForwardError as e:
+                results = [
+                    {"operation": operations[i].get('operation'), "eid": operations[i].get('eid'),
+                     "result": OperationResult.ERROR.value, "error": str(e)}
+                    for i in indexes
+                ]
+            return [{**result, "index": index} for index, result in zip(indexes, results)]
+        
+        merged: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        for results in await asyncio.gather(*(run_part(indexes) for indexes in parts.values())):
+            for result in results:
+                merged[result["index"]] = result
+        return merged
+    
+    async def fleet_stats_snapshot(self) -> Dict[str, Any]:
+        """Fleet statistics from the worker counting them"""
+        owner = self.ring.owner(FLEET_STATS_KEY)
+        if owner != self.worker_id:
+            peer = await self._connect_owner(FLEET_STATS_KEY, owner)
+            if peer is not None:
+                return await self._request(peer, owner, "fleet_stats_snapshot", [])
+        return self.manager.fleet_stats.snapshot()
+    
+    async def refresh_membership(self):
+        """Rescan shard_dir and rebuild the ring if the live worker set changed"""
+        members = {self.worker_id}
+        peers = [path.stem for path in self.shard_dir.glob("*.sock") if path.stem != self.worker_id]
+        for worker_id, alive in zip(peers, await asyncio.gather(*(self._probe(worker_id) for worker_id in peers))):
+            if alive:
+                members.add(worker_id)
+        
+        # Drop connections to workers that left or stopped answering
+        for worker_id in set(self._peers) - members:
+            await self._peers.pop(worker_id).close()
+        
+        if sorted(members) != self.ring.nodes:
+            self.ring = HashRing(members, self.vnodes)
+            self.rebalances += 1
+            self.manager.cache.local.clear()
+            self._route_fleet_stats()
+            self.logger.info(f"Shard ring rebalanced: {len(members)} workers")
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'worker_id': self.worker_id,
+            'workers': len(self.ring.nodes),
+            'local_calls': self.local_calls,
+            'forwarded_calls': self.forwarded_calls,
+            'served_calls': self.served_calls,
+            'forward_failures': self.forward_failures,
+            'rebalances': self.rebalances
+        }
+    
+    def _route_fleet_stats(self):
+        """Send fleet counter updates to the worker that owns them"""
+        fleet_stats = self.manager.fleet_stats
+        if fleet_stats is None:
+            return
+        owner = self.ring.owner(FLEET_STATS_KEY)
+        if owner == self.worker_id:
+            fleet_stats.publish_to(None)
+        else:
+            fleet_stats.publish_to(lambda *args: asyncio.create_task(
+                self._notify(owner, "record_transition", [arg.value if isinstance(arg, ProfileState) else arg for arg in args])
+            ))
+    
+    async def _connect_owner(self, key: str, owner: str) -> Optional[_PeerConnection]:
+        """Connection to the owner of key; None if this worker owns it or no owner can be reached"""
+        for _ in range(2):
+            try:
+                return await self._connect(owner)
+            except OSError as e:
+                # Nothing was sent; re-route after dropping unreachable workers
+                self.forward_failures += 1
+                self.logger.warning(f"Connecting to worker {owner} failed: {str(e)}")
+                await self.refresh_membership()
+                owner = self.ring.owner(key)
+                if owner == self.worker_id:
+                    return None
+        self.logger.warning(f"No reachable owner for {key}, running locally")
+        return None
+    
+    async def _request(self, peer: _PeerConnection, owner: str, method: str, args: List[Any]) -> Any:
+        try:
+            return await peer.request(method, args, self.forward_timeout)
+        except (ConnectionError, asyncio.TimeoutError) as e:
+            self.forward_failures += 1
+            raise ShardForwardError(
+                f"Worker {owner} did not answer {method}; the operation may still complete there"
+            ) from e
+    
+    async def _notify(self, worker_id: str, method: str, args: List[Any]):
+        try:
+            await (await self._connect(worker_id)).notify(method, args)
+        except (OSError, ConnectionError) as e:
+            self.logger.warning(f"Notifying worker {worker_id} failed: {str(e)}")
+    
+    async def _connect(self, worker_id: str) -> _PeerConnection:
+        peer = self._peers.get(worker_id)
+        if peer is not None and not peer.closed:
+            return peer
+        
+        # Concurrent callers share one connection attempt
+        pending = self._connecting.get(worker_id)
+        if pending is None:
+            pending = self._connecting[worker_id] = asyncio.ensure_future(self._open(worker_id))
+            pending.add_done_callback(lambda _: self._connecting.pop(worker_id, None))
+        return await asyncio.shield(pending)
+    
+    async def _open(self, worker_id: str) -> _PeerConnection:
+        reader, writer = await asyncio.open_unix_connection(str(self.shard_dir / f"{worker_id}.sock"))
+        peer = self._peers[worker_id] = _PeerConnection(reader, writer)
+        return peer
+    
+    async def _probe(self, worker_id: str) -> bool:
+        """
+        Whether a socket in shard_dir belongs to a live worker; stale sockets are removed
+        Probes open a fresh connection: an established peer connection can outlive
+        the worker's listener, and only the listener shows it still accepts work.
+        """
+        path = self.shard_dir / f"{worker_id}.sock"
+        try:
+            inode = path.stat().st_ino
+            _, writer = await asyncio.wait_for(asyncio.open_unix_connection(str(path)), self.refresh_interval)
+        except FileNotFoundError:
+            return False
+        except ConnectionRefusedError:
+            # Unless the worker has just restarted and bound a new socket
+            if path.exists() and path.stat().st_ino == inode:
+                path.unlink(missing_ok=True)
+            return False
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+    
+    async def _serve_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        tasks = set()
+        try:
+            while True:
+                message = await _read_frame(reader)
+                task = asyncio.create_task(self._handle(message, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _handle(self, message: Dict[str, Any], writer: asyncio.StreamWriter):
+        method, args = message["method"], message["args"]
+        # Each message is handled in its own task, so these stay scoped to this call
+        current_actor.set(message.get("actor"))
+        current_traceparent.set(message.get("traceparent"))
+        try:
+            if method == "record_transition":
+                provider, profile_class, previous_state, state = args
+                self.manager.fleet_stats.record_transition(
+                    provider, profile_class,
+                    ProfileState(previous_state) if previous_state else None, ProfileState(state)
+                )
+                return
+            if method == "fleet_stats_snapshot":
+                response = {"id": message["id"], "result": self.manager.fleet_stats.snapshot()}
+            elif method in self.FORWARDED:
+                # Forwarded calls always run here, never hop again
+                self.served_calls += 1
+                result = await getattr(self.manager, method)(*args)
+                response = {"id": message["id"], "result": self.FORWARDED[method][0](result)}
+            else:
+                response = {"id": message["id"], "error": f"Unknown shard method: {method}"}
+        except Exception as e:
+            response = {"id": message["id"], "error": str(e)}
+        
+        if message["id"] is not None:
+            payload = orjson.dumps(response)
+            writer.write(_FRAME_HEADER.pack(len(payload)) + payload)
+            await writer.drain()
+    
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh_membership()
+            except Exception as e:
+                self.logger.error(f"Shard membership refresh failed: {str(e)}")
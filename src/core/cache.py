@@ -0,0 +1,225 @@
+"""
+Lookup Cache for eSIM Manager
+Read-through LRU+TTL cache with an optional Redis second tier
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Marker distinguishing "not cached" from a cached None (negative entry)
+_MISSING = object()
+
+class LRUTTLCache:
+    """Bounded in-process cache with least-recently-used eviction and per-entry expiry"""
+    
+    def __init__(self, max_size: int = 100000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+    
+    def get(self, key: Hashable) -> Any:
+        """Return the cached value or _MISSING"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Insert or replace an entry, evicting the least recently used"""
+        self._entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+    
+    def delete(self, key: Hashable):
+        self._entries.pop(key, None)
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class ReadThroughCache:
+    """
+    Two-tier read-through cache
+    Tier 1 is an in-process LRUTTLCache; tier 2 is an optional Redis client
+    (redis.asyncio compatible get/set/delete). Redis failures degrade to the
+    backing loader instead of failing the lookup. Concurrent misses on a key
+    share one load, and invalidate() retires a load in flight so a value read
+    before a write is never cached after it.
+    """
+    
+    def __init__(self,
+                 max_size: int = 100000,
+                 ttl: float = 60.0,
+                 negative_ttl: float = 5.0,
+                 redis_client: Any = None,
+                 redis_ttl: Optional[float] = None,
+                 namespace: str = "esim"):
+        self.local = LRUTTLCache(max_size, ttl)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.redis_client = redis_client
+        self.redis_ttl = redis_ttl or ttl
+        self.namespace = namespace
+        self.logger = logging.getLogger(__name__)
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.stale_loads = 0
+        self.redis_errors = 0
+    
+    async def get_or_load(self,
+                          key: str,
+                          loader: Callable[[], Awaitable[Any]],
+                          codec: Any = None,
+                          cache_none: bool = False) -> Any:
+        """
+        Return the cached value for key, loading and caching it on a miss
+        codec provides to_dict()/from_dict() for the Redis tier; None results
+        are only cached (for negative_ttl) when cache_none is set.
+        """
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.collapsed += 1
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The loading caller was cancelled, not us - try again
+                return await self.get_or_load(key, loader, codec, cache_none)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await self._load(key, loader, codec, cache_none, future)
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure does not log a warning
+                future.exception()
+            raise
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        
+        future.set_result(value)
+        return value
+    
+    async def invalidate(self, *keys: str):
+        """Drop keys from both tiers and retire their in-flight loads"""
+        for key in keys:
+            self.local.delete(key)
+            self._pending.pop(key, None)
+        
+        if self.redis_client is not None and keys:
+            await self._redis_delete(keys)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        lookups = self.hits + self.redis_hits + self.misses + self.collapsed
+        return {
+            'size': len(self.local),
+            'hits': self.hits,
+            'redis_hits': self.redis_hits,
+            'misses': self.misses,
+            'collapsed': self.collapsed,
+            'stale_loads': self.stale_loads,
+            'redis_errors': self.redis_errors,
+            'hit_rate': (self.hits + self.redis_hits + self.collapsed) / lookups if lookups else 0.0
+        }
+    
+    async def _load(self,
+                    key: str,
+                    loader: Callable[[], Awaitable[Any]],
+                    codec: Any,
+                    cache_none: bool,
+                    flight: asyncio.Future) -> Any:
+        """Fetch key from Redis or the loader, caching it only if flight is still the key's current load"""
+        if self.redis_client is not None:
+            value = await self._redis_get(key, codec)
+            if value is not _MISSING:
+                self.redis_hits += 1
+                if self._pending.get(key) is flight:
+                    self.local.set(key, value, self.negative_ttl if value is None else None)
+                return value
+        
+        self.misses += 1
+        value = await loader()
+        if value is None and not cache_none:
+            return value
+        if self._pending.get(key) is not flight:
+            # Invalidated while loading; the value may predate the write
+            self.stale_loads += 1
+            return value
+        
+        ttl = self.negative_ttl if value is None else self.ttl
+        self.local.set(key, value, ttl)
+        if self.redis_client is not None:
+            await self._redis_set(key, value, codec, ttl if value is None else self.redis_ttl)
+            if self._pending.get(key) is not flight:
+                # The invalidation's delete may have reached Redis before this write
+                self.stale_loads += 1
+                await self._redis_delete((key,))
+        
+        return value
+    
+    def _redis_key(self, key: str) -> str:
+        return f"{self.namespace}:cache:{key}"
+    
+    async def _redis_get(self, key: str, codec: Any) -> Any:
+        try:
+            raw = await self.redis_client.get(self._redis_key(key))
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis cache read failed: {str(e)}")
+            return _MISSING
+        
+        if raw is None:
+            return _MISSING
+        
+        data = json.loads(raw)
+        if data is None or codec is None:
+            return data
+        return codec.from_dict(data)
+    
+    async def _redis_delete(self, keys: Tuple[str, ...]):
+        try:
+            await self.redis_client.delete(*(self._redis_key(key) for key in keys))
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis cache invalidation failed: {str(e)}")
+    
+    async def _redis_set(self, key: str, value: Any, codec: Any, ttl: float):
+        data = value.to_dict() if value is not None and codec is not None else value
+        try:
+            await self.redis_client.set(
+                self._redis_key(key),
+                json.dumps(data),
+                px=max(1, int(ttl * 1000))
+            )
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis cache write failed: {str(e)}")
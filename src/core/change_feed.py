@@ -0,0 +1,271 @@
+"""
+Profile Change Feed
+Broadcast bus of profile state transitions with bounded per-subscriber buffers and resumable offsets
+"""
+
+import asyncio
+import logging
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional, Set
+import orjson
+
+class ChangeFeedGap(Exception):
+    """Events between the subscriber's offset and the retained history were lost"""
+
+class Subscription:
+    """
+    One consumer of the change feed
+    Matching events are queued up to buffer entries. A subscriber that falls
+    further behind is detached and later caught up from the feed's shared
+    history, so a slow consumer costs at most its buffer while it lags.
+    """
+    
+    def __init__(self,
+                 feed: 'ChangeFeed',
+                 eid: Optional[str],
+                 states: Optional[Set[str]],
+                 buffer: int,
+                 after: Optional[int] = None):
+        self.feed = feed
+        self.eid = eid
+        self.states = states
+        self.buffer = buffer
+        self.last_offset = after
+        self.pending: Deque[Dict[str, Any]] = deque()
+        self.detached = after is not None
+        self.lagged = 0
+        self._wakeup = asyncio.Event()
+    
+    def matches(self, event: Dict[str, Any]) -> bool:
+        return ((self.eid is None or event["eid"] == self.eid)
+                and (self.states is None or event["profile_state"] in self.states))
+    
+    async def get(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Next matching event, or None if none arrived within timeout; raises ChangeFeedGap once per gap"""
+        while not self.pending:
+            if self.detached:
+                self.feed._catch_up(self)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        
+        event = self.pending.popleft()
+        self.last_offset = event["offset"]
+        return event
+    
+    def close(self):
+        self.feed._subscribers.discard(self)
+    
+    def _push(self, event: Dict[str, Any]):
+        if len(self.pending) >= self.buffer:
+            # Drop the backlog; the next get() replays it from history
+            if self.last_offset is None:
+                self.last_offset = self.pending[0]["offset"] - 1
+            self.pending.clear()
+            self.detached = True
+            self.lagged += 1
+            self.feed._subscribers.discard(self)
+            self.feed.lagged += 1
+        else:
+            self.pending.append(event)
+        self._wakeup.set()
+
+class ChangeFeed:
+    """
+    In-process broadcast bus of profile lifecycle transitions
+    Every event gets an increasing offset and is kept in a bounded history, so
+    subscribers can resume after an offset. Filtering happens before
+    buffering. publish() never blocks the lifecycle path.
+    
+    With a Redis client, offsets come from a shared counter and events are fanned
+    out over pub/sub, so every worker's subscribers see every worker's events.
+    Offsets are tagged with an epoch; resuming from another epoch (a restarted
+    process, or a worker that lost its Redis subscription) raises ChangeFeedGap
+    instead of silently skipping events.
+    """
+    
+    def __init__(self,
+                 history_size: int = 10000,
+                 subscriber_buffer: int = 1000,
+                 redis_client: Any = None,
+                 namespace: str = "esim"):
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+        self.subscriber_buffer = subscriber_buffer
+        self.redis_client = redis_client
+        self.channel = f"{namespace}:profile-changes"
+        self.sequence_key = f"{namespace}:profile-changes:offset"
+        self.epoch = "shared" if redis_client is not None else os.urandom(4).hex()
+        self.logger = logging.getLogger(__name__)
+        self._subscribers: Set[Subscription] = set()
+        self._offset = 0
+        self._outbox: Optional[asyncio.Queue] = None
+        self._pubsub: Any = None
+        self._tasks: List[asyncio.Task] = []
+        self._running = False
+        self.published = 0
+        self.lagged = 0
+        self.gaps = 0
+        self.redis_errors = 0
+    
+    async def start(self):
+        if self.redis_client is not None:
+            self._outbox = asyncio.Queue()
+            self._running = True
+            # Subscribe before returning so no event published after start() is missed
+            try:
+                self._pubsub = await self._open_subscription()
+            except Exception as e:
+                self.redis_errors += 1
+                self.logger.warning(f"Change feed subscription failed: {str(e)}")
+            self._tasks = [
+                asyncio.create_task(self._publish_loop()),
+                asyncio.create_task(self._subscribe_loop())
+            ]
+    
+    async def stop(self, timeout: float = 5.0):
+        """Publish events still in the outbox, then stop the loops"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self._outbox.join(), timeout)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Change feed stopped with {self._outbox.qsize()} events unpublished")
+        
+        # wait_for() may swallow a cancel that races a delivered message, so the loops also check the flag
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+        self._subscribers.clear()
+    
+    def publish(self,
+                eid: str,
+                iccid: str,
+                operation: str,
+                previous_state: Optional[str],
+                state: str):
+        """Announce one profile transition"""
+        event = {
+            "eid": eid,
+            "iccid": iccid,
+            "operation": operation,
+            "previous_state": previous_state,
+            "profile_state": state,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+        if self._outbox is not None:
+            self._outbox.put_nowait(event)
+        else:
+            self._offset += 1
+            self._deliver({"offset": self._offset, **event})
+    
+    def subscribe(self,
+                  eid: Optional[str] = None,
+                  states: Optional[Set[str]] = None,
+                  cursor: Optional[str] = None) -> Subscription:
+        """Subscribe to matching events, replaying retained ones after cursor"""
+        after = self._parse_cursor(cursor) if cursor else None
+        subscription = Subscription(self, eid, states, self.subscriber_buffer, after)
+        if after is None:
+            self._subscribers.add(subscription)
+        return subscription
+    
+    def cursor(self, event: Dict[str, Any]) -> str:
+        """Resume token for an event (SSE id)"""
+        return f"{self.epoch}-{event['offset']}"
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'history': len(self.history),
+            'lagged': self.lagged,
+            'gaps': self.gaps,
+            'redis_errors': self.redis_errors
+        }
+    
+    def _parse_cursor(self, cursor: str) -> int:
+        epoch, _, offset = cursor.rpartition("-")
+        if epoch != self.epoch or not offset.isdigit():
+            return -1
+        return int(offset)
+    
+    def _deliver(self, event: Dict[str, Any]):
+        self.published += 1
+        self.history.append(event)
+        for subscription in list(self._subscribers):
+            if subscription.matches(event):
+                subscription._push(event)
+    
+    def _catch_up(self, subscription: Subscription):
+        """Queue retained events after the subscriber's offset and rejoin live delivery"""
+        after = subscription.last_offset
+        subscription.detached = False
+        self._subscribers.add(subscription)
+        if after is None:
+            return
+        
+        oldest = self.history[0]["offset"] if self.history else self._offset + 1
+        if after < 0 or after < oldest - 1 or after > self._offset:
+            self.gaps += 1
+            subscription.last_offset = None
+            raise ChangeFeedGap(f"Change feed history does not reach back to offset {after}")
+        subscription.pending.extend(
+            event for event in self.history if event["offset"] > after and subscription.matches(event)
+        )
+    
+    def _reset_epoch(self):
+        """Events may have been missed; resumes from earlier cursors must resync"""
+        self.epoch = os.urandom(4).hex()
+    
+    async def _publish_loop(self):
+        while self._running:
+            event = await self._outbox.get()
+            try:
+                offset = await self.redis_client.incr(self.sequence_key)
+                await self.redis_client.publish(self.channel, orjson.dumps({"offset": offset, **event}))
+            except Exception as e:
+                # Keep local subscribers informed; other workers miss this event
+                self.redis_errors += 1
+                self.logger.warning(f"Change feed publish failed: {str(e)}")
+                self._reset_epoch()
+                self._offset += 1
+                self._deliver({"offset": self._offset, **event})
+            finally:
+                self._outbox.task_done()
+    
+    async def _open_subscription(self) -> Any:
+        pubsub = self.redis_client.pubsub()
+        await pubsub.subscribe(self.channel)
+        return pubsub
+    
+    async def _subscribe_loop(self):
+        while self._running:
+            try:
+                if self._pubsub is None:
+                    self._pubsub = await self._open_subscription()
+                while self._running:
+                    message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                    if message is not None:
+                        event = orjson.loads(message["data"])
+                        self._offset = max(self._offset, event["offset"])
+                        self._deliver(event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.redis_errors += 1
+                self.logger.warning(f"Change feed subscription failed: {str(e)}")
+                self._reset_epoch()
+                await asyncio.sleep(1.0)
+            finally:
+                if self._pubsub is not None:
+                    await self._pubsub.aclose()
+                    self._pubsub = None
@@ -0,0 +1,82 @@
+"""
+Per-EID Operation Serializer
+Serializes lifecycle operations on one eUICC while different EIDs run in parallel
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Any, AsyncIterator
+
+class _EIDLockEntry:
+    """Lock plus the number of tasks holding or waiting on it"""
+    __slots__ = ('lock', 'users')
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+class EIDLockManager:
+    """
+    Sharded registry of per-EID asyncio locks
+    Entries are reference counted and evicted as soon as they go idle, so memory
+    tracks the number of in-flight EIDs rather than the fleet size. Sharding keeps
+    each dictionary small, avoiding long rehash pauses under millions of keys.
+    """
+    
+    def __init__(self, shards: int = 64):
+        self._shards: List[Dict[str, _EIDLockEntry]] = [{} for _ in range(shards)]
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+    
+    def _shard(self, eid: str) -> Dict[str, _EIDLockEntry]:
+        return self._shards[hash(eid) % len(self._shards)]
+    
+    @asynccontextmanager
+    async def acquire(self, eid: str) -> AsyncIterator[None]:
+        """Hold the lock for an EID for the duration of the block"""
+        shard = self._shard(eid)
+        entry = shard.get(eid)
+        if entry is None:
+            entry = shard[eid] = _EIDLockEntry()
+        
+        entry.users += 1
+        try:
+            if entry.lock.locked():
+                started = time.perf_counter()
+                await entry.lock.acquire()
+                waited = time.perf_counter() - started
+                self.contended += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+            else:
+                await entry.lock.acquire()
+            self.acquisitions += 1
+            
+            try:
+                yield
+            finally:
+                entry.lock.release()
+                
+        finally:
+            entry.users -= 1
+            if entry.users == 0 and shard.get(eid) is entry:
+                del shard[eid]
+    
+    def is_locked(self, eid: str) -> bool:
+        """Check whether an operation is currently running for an EID"""
+        entry = self._shard(eid).get(eid)
+        return entry is not None and entry.lock.locked()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Contention and wait-time metrics"""
+        return {
+            'active_eids': sum(len(shard) for shard in self._shards),
+            'acquisitions': self.acquisitions,
+            'contended': self.contended,
+            'wait_seconds_total': self.wait_seconds_total,
+            'wait_seconds_max': self.wait_seconds_max,
+            'wait_seconds_avg': self.wait_seconds_total / self.contended if self.contended else 0.0
+        }
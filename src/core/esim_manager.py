@@ -4,15 +4,27 @@ Production-ready eSIM/eUICC management platform
 """
 
 import asyncio
+import contextlib
 import logging
-from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Any, AsyncContextManager, AsyncIterator, Awaitable, Callable, Tuple
+from dataclasses import dataclass, asdict
 from enum import Enum
 import uuid
 from datetime import datetime, timedelta
 import json
 import hashlib
 import hmac
+import base64
+import os
+import tempfile
+import functools
+import sys
+from collections import deque
+from src.core.cache import ReadThroughCache
+from src.core.eid_lock import EIDLockManager
+from src.core.idempotency import IdempotencyStore
+from src.core.instrumentation import PipelineInstrumentation
+from src.security.session_cache import SecureChannelSessionCache
 
 # GSMA Standards Implementation
 class ProfileState(Enum):
@@ -28,23 +40,258 @@ class OperationResult(Enum):
     POSTPONED = "postponed"
     ERROR = "error"
 
-@dataclass
+def _journaled(operation: str):
+    """Record a profile_operations and audit_log row for each lifecycle call"""
+    def decorator(method):
+        @functools.wraps(method)
+        async def wrapper(self, eid: str, *args, **kwargs):
+            started_at = datetime.utcnow()
+            result = await method(self, eid, *args, **kwargs)
+            if self.journal:
+                iccid = result.get("iccid")
+                if iccid is None and operation != "download":
+                    iccid = kwargs.get("iccid", args[0] if args else None)
+                self.journal.record_operation(eid, iccid, operation, result, started_at)
+            return result
+        return wrapper
+    return decorator
+
+async def _run_stages(*stages) -> List[Any]:
+    """
+    Run independent pipeline stages concurrently
+    Returns their results in order. The first failure cancels the stages
+    still running and is re-raised once they have unwound.
+    """
+    tasks = [asyncio.ensure_future(stage) for stage in stages]
+    try:
+        return await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+def _discard_spool(path: str):
+    """Remove a spooled bound profile package"""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+class _Unloaded:
+    """Marker for profile details (icon, notification configuration) not yet fetched"""
+    __slots__ = ()
+    
+    def __repr__(self) -> str:
+        return "UNLOADED"
+
+UNLOADED: Any = _Unloaded()
+
+ProfileDetails = Tuple[Optional[bytes], Dict[str, Any]]
+ProfileDetailsLoader = Callable[[], Awaitable[Optional[ProfileDetails]]]
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Icons and notification configurations repeat across an operator's profiles;
+# equal values share one object, up to this many distinct values per table
+_DETAIL_INTERN_LIMIT = 4096
+_interned_icons: Dict[bytes, bytes] = {}
+_interned_notification_info: Dict[str, Dict[str, Any]] = {}
+# Base64 wire form of interned icons, so each distinct icon is encoded once
+_encoded_icons: Dict[bytes, str] = {}
+
+def _intern_str(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+def _intern_icon(icon: Optional[bytes]) -> Optional[bytes]:
+    if icon is None:
+        return None
+    shared = _interned_icons.get(icon)
+    if shared is not None:
+        return shared
+    if len(_interned_icons) < _DETAIL_INTERN_LIMIT:
+        _interned_icons[icon] = icon
+    return icon
+
+def _intern_notification_info(info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    key = json.dumps(info or {}, sort_keys=True)
+    shared = _interned_notification_info.get(key)
+    if shared is not None:
+        return shared
+    if len(_interned_notification_info) < _DETAIL_INTERN_LIMIT:
+        _interned_notification_info[key] = info or {}
+    return info or {}
+
+def _encode_icon(icon: Optional[bytes]) -> Optional[str]:
+    if icon is None:
+        return None
+    encoded = _encoded_icons.get(icon)
+    if encoded is None:
+        encoded = base64.b64encode(icon).decode()
+        if len(_encoded_icons) < _DETAIL_INTERN_LIMIT:
+            _encoded_icons[icon] = encoded
+    return encoded
+
+def _to_micros(value: datetime) -> int:
+    """Naive UTC datetime to integer microseconds since the epoch"""
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1000000 + delta.microseconds
+
+def _from_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+class ProfileDetailsNotLoaded(LookupError):
+    """A profile's icon or notification configuration was read before load_details()"""
+
 class ESIMProfile:
-    """eSIM Profile Data Model - SGP.22 Compliant"""
-    iccid: str
-    isdp_aid: str
-    profile_state: ProfileState
-    profile_nickname: Optional[str]
-    service_provider_name: str
-    profile_name: str
-    icon_type: Optional[str]
-    icon: Optional[bytes]
-    profile_class: str
-    notification_configuration_info: Dict[str, Any]
-    profile_owner: Optional[str]
-    dp_aid: str
-    created_at: datetime
-    updated_at: datetime
+    """
+    eSIM Profile Data Model - SGP.22 Compliant
+    Slotted for compactness: repeated strings are interned, the state is the
+    shared ProfileState member and timestamps are held as integer microseconds.
+    The icon and notification configuration may be left UNLOADED by the store
+    and fetched through details_loader on the first load_details() call.
+    Instances are treated as immutable (see with_state); interned details are
+    shared and must not be mutated.
+    """
+    __slots__ = (
+        'iccid', 'isdp_aid', 'profile_state', 'profile_nickname', 'service_provider_name',
+        'profile_name', 'icon_type', 'profile_class', 'profile_owner', 'dp_aid',
+        '_created_at', '_updated_at', '_icon', '_notification_info', 'details_loader'
+    )
+    
+    def __init__(self,
+                 iccid: str,
+                 isdp_aid: str,
+                 profile_state: ProfileState,
+                 profile_nickname: Optional[str],
+                 service_provider_name: str,
+                 profile_name: str,
+                 icon_type: Optional[str],
+                 icon: Optional[bytes],
+                 profile_class: str,
+                 notification_configuration_info: Dict[str, Any],
+                 profile_owner: Optional[str],
+                 dp_aid: str,
+                 created_at: datetime,
+                 updated_at: datetime,
+                 details_loader: Optional[ProfileDetailsLoader] = None):
+        self.iccid = iccid
+        self.isdp_aid = isdp_aid
+        self.profile_state = profile_state
+        self.profile_nickname = profile_nickname
+        self.service_provider_name = _intern_str(service_provider_name)
+        self.profile_name = _intern_str(profile_name)
+        self.icon_type = _intern_str(icon_type)
+        self.profile_class = _intern_str(profile_class)
+        self.profile_owner = _intern_str(profile_owner)
+        self.dp_aid = _intern_str(dp_aid)
+        self._created_at = _to_micros(created_at)
+        self._updated_at = self._created_at if updated_at == created_at else _to_micros(updated_at)
+        self.details_loader = details_loader
+        if icon is UNLOADED or notification_configuration_info is UNLOADED:
+            self._icon = self._notification_info = UNLOADED
+        else:
+            self._icon = _intern_icon(icon)
+            self._notification_info = _intern_notification_info(notification_configuration_info)
+    
+    @property
+    def created_at(self) -> datetime:
+        return _from_micros(self._created_at)
+    
+    @property
+    def updated_at(self) -> datetime:
+        return _from_micros(self._updated_at)
+    
+    @property
+    def details_loaded(self) -> bool:
+        return self._icon is not UNLOADED
+    
+    @property
+    def icon(self) -> Optional[bytes]:
+        if self._icon is UNLOADED:
+            raise ProfileDetailsNotLoaded(f"Icon of profile {self.iccid} not loaded")
+        return self._icon
+    
+    @property
+    def notification_configuration_info(self) -> Dict[str, Any]:
+        if self._icon is UNLOADED:
+            raise ProfileDetailsNotLoaded(f"Notification configuration of profile {self.iccid} not loaded")
+        return self._notification_info
+    
+    async def load_details(self) -> 'ESIMProfile':
+        """Fetch the icon and notification configuration on first use; returns self"""
+        if self._icon is UNLOADED:
+            details = await self.details_loader() if self.details_loader is not None else None
+            icon, info = details if details is not None else (None, {})
+            self._icon = _intern_icon(icon)
+            self._notification_info = _intern_notification_info(info)
+            self.details_loader = None
+        return self
+    
+    def with_state(self, state: ProfileState, updated_at: datetime) -> 'ESIMProfile':
+        """Copy with a new state, sharing every other value"""
+        profile = object.__new__(ESIMProfile)
+        for name in ESIMProfile.__slots__:
+            setattr(profile, name, getattr(self, name))
+        profile.profile_state = state
+        profile._updated_at = _to_micros(updated_at)
+        return profile
+    
+    def to_dict(self, eid: Optional[str] = None) -> Dict[str, Any]:
+        """
+        JSON-compatible representation, led by eid when given
+        Unloaded details are left out; from_dict() restores them as UNLOADED.
+        """
+        data = {'eid': eid} if eid is not None else {}
+        data['iccid'] = self.iccid
+        data['isdp_aid'] = self.isdp_aid
+        data['profile_state'] = self.profile_state.value
+        data['profile_nickname'] = self.profile_nickname
+        data['service_provider_name'] = self.service_provider_name
+        data['profile_name'] = self.profile_name
+        data['icon_type'] = self.icon_type
+        if self._icon is not UNLOADED:
+            data['icon'] = _encode_icon(self._icon)
+        data['profile_class'] = self.profile_class
+        if self._icon is not UNLOADED:
+            data['notification_configuration_info'] = self._notification_info
+        data['profile_owner'] = self.profile_owner
+        data['dp_aid'] = self.dp_aid
+        data['created_at'] = _from_micros(self._created_at).isoformat()
+        data['updated_at'] = _from_micros(self._updated_at).isoformat()
+        return data
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ESIMProfile':
+        """Rebuild a profile from to_dict() output"""
+        details = 'icon' in data
+        return cls(
+            iccid=data['iccid'],
+            isdp_aid=data['isdp_aid'],
+            profile_state=ProfileState(data['profile_state']),
+            profile_nickname=data['profile_nickname'],
+            service_provider_name=data['service_provider_name'],
+            profile_name=data['profile_name'],
+            icon_type=data['icon_type'],
+            icon=(base64.b64decode(data['icon']) if data['icon'] is not None else None) if details else UNLOADED,
+            profile_class=data['profile_class'],
+            notification_configuration_info=data['notification_configuration_info'] if details else UNLOADED,
+            profile_owner=data['profile_owner'],
+            dp_aid=data['dp_aid'],
+            created_at=datetime.fromisoformat(data['created_at']),
+            updated_at=datetime.fromisoformat(data['updated_at'])
+        )
+    
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ESIMProfile):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (f"ESIMProfile(iccid={self.iccid!r}, profile_state={self.profile_state}, "
+                f"service_provider_name={self.service_provider_name!r}, details_loaded={self.details_loaded})")
 
 @dataclass
 class EUICCInfo:
@@ -54,6 +301,15 @@ class EUICCInfo:
     euicc_configured_addresses: List[str]
     default_dp_address: Optional[str]
     root_ds_address: str
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-compatible representation"""
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'EUICCInfo':
+        """Rebuild eUICC info from to_dict() output"""
+        return cls(**data)
 
 class ESIMManager:
     """
@@ -61,12 +317,55 @@ class ESIMManager:
     Handles profile lifecycle, security, and MNO integration
     """
     
+    # Fields each batch operation type must carry
+    _BATCH_REQUIRED_FIELDS = {
+        "download": ("eid", "activation_code"),
+        "enable": ("eid", "iccid"),
+        "disable": ("eid", "iccid"),
+        "delete": ("eid", "iccid"),
+    }
+    
+    # Lifecycle operation announced on the change feed for each target state
+    _STATE_OPERATIONS = {
+        ProfileState.ENABLED: "enable",
+        ProfileState.DISABLED: "disable",
+        ProfileState.DELETED: "delete",
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.logger = logging.getLogger(__name__)
         self.db_pool = None
         self.redis_client = None
         self.hsm_client = None
+        self.store = None
+        self.crypto = None
+        self.key_pool = None
+        self.smdp_client = None
+        self.notifications = None
+        self.journal = None
+        self.fleet_stats = None
+        self.change_feed = None
+        # Async context manager factory bounding concurrent batch downloads, set by the API layer
+        self.download_gate: Optional[Callable[[], AsyncContextManager]] = None
+        self.eid_locks = EIDLockManager(config.get('eid_lock_shards', 64))
+        self.instrumentation = PipelineInstrumentation(config.get('metrics_enabled', False))
+        self.channel_sessions = SecureChannelSessionCache(
+            ttl=config.get('secure_channel_ttl_seconds', 300.0),
+            max_uses=config.get('secure_channel_max_uses', 1000),
+            max_sessions=config.get('secure_channel_max_sessions', 1024)
+        )
+        self.cache = ReadThroughCache(
+            max_size=config.get('cache_max_size', 100000),
+            ttl=config.get('cache_ttl_seconds', 60.0),
+            negative_ttl=config.get('cache_negative_ttl_seconds', 5.0),
+            redis_ttl=config.get('cache_redis_ttl_seconds')
+        )
+        self.idempotency = IdempotencyStore(
+            max_size=config.get('idempotency_max_keys', 100000),
+            ttl=config.get('idempotency_ttl_seconds', 86400.0),
+            lock_ttl=config.get('idempotency_lock_ttl_seconds', 60.0)
+        )
         
     async def initialize(self):
         """Initialize all system components"""
@@ -74,7 +373,32 @@ class ESIMManager:
         await self._init_redis()
         await self._init_hsm()
         await self._init_security()
+        await self._init_smdp()
+        await self._init_notifications()
+        await self._init_journal()
+        await self._init_fleet_stats()
+        await self._init_change_feed()
+    
+    async def shutdown(self):
+        """Stop background workers and release resources"""
+        if self.change_feed:
+            await self.change_feed.stop(self.config.get('change_feed_drain_seconds', 5.0))
+        if self.fleet_stats:
+            await self.fleet_stats.stop()
+        if self.journal:
+            await self.journal.stop()
+        if self.notifications:
+            await self.notifications.stop(self.config.get('notification_drain_seconds', 5.0))
+        if self.key_pool:
+            await self.key_pool.stop()
+        if self.crypto:
+            self.crypto.close()
+        if self.smdp_client:
+            await self.smdp_client.close()
+        if self.store:
+            await self.store.close()
         
+    @_journaled("download")
     async def download_profile(self, 
                              eid: str, 
                              activation_code: str,
@@ -83,132 +407,570 @@ class ESIMManager:
         SGP.22 ES10b.DownloadProfile
         Download and install eSIM profile on eUICC
         """
+        trace = self.instrumentation.trace("download")
+        
+        async def validate_eid():
+            with trace.stage("validate_eid"):
+                if not await self._get_euicc_info(eid):
+                    raise ValueError("Invalid EID")
+        
+        async def open_channel():
+            with trace.stage("parse_activation_code"):
+                profile_info = await self._parse_activation_code(activation_code)
+            with trace.stage("secure_channel"):
+                channel = await self._establish_secure_channel(profile_info['smdp_address'])
+            return profile_info, channel
+        
         try:
-            # Validate eUICC
-            euicc_info = await self._get_euicc_info(eid)
-            if not euicc_info:
-                return {"result": OperationResult.ERROR.value, "error": "Invalid EID"}
-            
-            # Parse activation code
-            profile_info = await self._parse_activation_code(activation_code)
-            
-            # Establish secure channel with SM-DP+
-            secure_channel = await self._establish_secure_channel(
-                profile_info['smdp_address']
-            )
-            
-            # Download profile from SM-DP+
-            profile_data = await self._download_from_smdp(
-                secure_channel, 
-                profile_info,
-                confirmation_code
-            )
-            
-            # Install profile on eUICC
-            installation_result = await self._install_profile(
-                eid, 
-                profile_data
-            )
-            
-            # Update database
-            await self._store_profile_info(eid, profile_data, installation_result)
-            
-            # Send notifications
-            await self._send_profile_notification(
-                eid, 
-                profile_data['iccid'],
-                "download",
-                installation_result
-            )
-            
-            return {
-                "result": OperationResult.OK.value,
-                "iccid": profile_data['iccid'],
-                "profile_state": ProfileState.DISABLED.value
-            }
-            
+            async with self.eid_locks.acquire(eid):
+                # The channel only needs the SM-DP+ address, so it is set up while
+                # the eUICC is validated; nothing is downloaded for an invalid EID
+                _, (profile_info, secure_channel) = await _run_stages(validate_eid(), open_channel())
+                
+                # Download profile from SM-DP+
+                with trace.stage("smdp_download"):
+                    profile_data = await self._download_from_smdp(
+                        secure_channel, 
+                        profile_info,
+                        confirmation_code
+                    )
+                
+                # Install profile on eUICC; the spooled package is not needed afterwards
+                try:
+                    with trace.stage("install"):
+                        installation_result = await self._install_profile(
+                            eid, 
+                            profile_data
+                        )
+                finally:
+                    _discard_spool(profile_data['bpp_path'])
+                
+                # Persist and notify concurrently
+                async def store():
+                    with trace.stage("store"):
+                        await self._store_profile_info(eid, profile_data, installation_result)
+                
+                async def notify():
+                    with trace.stage("notify"):
+                        await self._send_profile_notification(
+                            eid, 
+                            profile_data['iccid'],
+                            "download",
+                            installation_result,
+                            profile_data['notification_configuration_info']
+                        )
+                
+                await _run_stages(store(), notify())
+                
+                return trace.finish({
+                    "result": OperationResult.OK.value,
+                    "iccid": profile_data['iccid'],
+                    "profile_state": ProfileState.DISABLED.value
+                })
+                
         except Exception as e:
-            self.logger.error(f"Profile download failed: {str(e)}")
-            return {"result": OperationResult.ERROR.value, "error": str(e)}
+            self.logger.error(f"Profile download failed: {str(e)} {trace.summary()}")
+            return trace.finish({"result": OperationResult.ERROR.value, "error": str(e)})
     
+    @_journaled("enable")
     async def enable_profile(self, eid: str, iccid: str) -> Dict[str, Any]:
         """SGP.22 ES10b.EnableProfile"""
         try:
-            profile = await self._get_profile(eid, iccid)
-            if not profile:
-                return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
-            
-            if profile.profile_state != ProfileState.DISABLED:
-                return {"result": OperationResult.ERROR.value, "error": "Profile not in disabled state"}
-            
-            # Disable currently enabled profile
-            current_enabled = await self._get_enabled_profile(eid)
-            if current_enabled:
-                await self._disable_profile_internal(eid, current_enabled.iccid)
-            
-            # Enable target profile
-            enable_result = await self._enable_profile_internal(eid, iccid)
-            await self._update_profile_state(eid, iccid, ProfileState.ENABLED)
-            await self._send_profile_notification(eid, iccid, "enable", enable_result)
-            
-            return {"result": OperationResult.OK.value}
-            
+            async with self.eid_locks.acquire(eid):
+                profile = await self._get_profile(eid, iccid)
+                if not profile:
+                    return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
+                
+                if profile.profile_state != ProfileState.DISABLED:
+                    return {"result": OperationResult.ERROR.value, "error": "Profile not in disabled state"}
+                
+                # Disable currently enabled profile
+                current_enabled = await self._get_enabled_profile(eid)
+                if current_enabled:
+                    await self._disable_profile_internal(eid, current_enabled.iccid)
+                    await self._update_profile_state(eid, current_enabled.iccid, ProfileState.DISABLED)
+                
+                # Enable target profile
+                enable_result = await self._enable_profile_internal(eid, iccid)
+                await self._update_profile_state(eid, iccid, ProfileState.ENABLED)
+                await self._send_profile_notification(eid, iccid, "enable", enable_result)
+                
+                return {"result": OperationResult.OK.value}
+                
         except Exception as e:
             self.logger.error(f"Profile enable failed: {str(e)}")
             return {"result": OperationResult.ERROR.value, "error": str(e)}
     
+    @_journaled("disable")
     async def disable_profile(self, eid: str, iccid: str) -> Dict[str, Any]:
         """SGP.22 ES10b.DisableProfile"""
         try:
-            profile = await self._get_profile(eid, iccid)
-            if not profile:
-                return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
-            
-            disable_result = await self._disable_profile_internal(eid, iccid)
-            await self._update_profile_state(eid, iccid, ProfileState.DISABLED)
-            await self._send_profile_notification(eid, iccid, "disable", disable_result)
-            
-            return {"result": OperationResult.OK.value}
-            
+            async with self.eid_locks.acquire(eid):
+                profile = await self._get_profile(eid, iccid)
+                if not profile:
+                    return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
+                
+                disable_result = await self._disable_profile_internal(eid, iccid)
+                await self._update_profile_state(eid, iccid, ProfileState.DISABLED)
+                await self._send_profile_notification(eid, iccid, "disable", disable_result)
+                
+                return {"result": OperationResult.OK.value}
+                
         except Exception as e:
             self.logger.error(f"Profile disable failed: {str(e)}")
             return {"result": OperationResult.ERROR.value, "error": str(e)}
     
+    @_journaled("delete")
     async def delete_profile(self, eid: str, iccid: str) -> Dict[str, Any]:
         """SGP.22 ES10b.DeleteProfile"""
         try:
-            profile = await self._get_profile(eid, iccid)
-            if not profile:
-                return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
-            
-            if profile.profile_state == ProfileState.ENABLED:
-                await self._disable_profile_internal(eid, iccid)
-            
-            delete_result = await self._delete_profile_internal(eid, iccid)
-            await self._update_profile_state(eid, iccid, ProfileState.DELETED)
-            await self._send_profile_notification(eid, iccid, "delete", delete_result)
-            
-            return {"result": OperationResult.OK.value}
-            
+            async with self.eid_locks.acquire(eid):
+                profile = await self._get_profile(eid, iccid)
+                if not profile:
+                    return {"result": OperationResult.ERROR.value, "error": "Profile not found"}
+                
+                if profile.profile_state == ProfileState.ENABLED:
+                    await self._disable_profile_internal(eid, iccid)
+                
+                delete_result = await self._delete_profile_internal(eid, iccid)
+                await self._update_profile_state(eid, iccid, ProfileState.DELETED)
+                await self._send_profile_notification(eid, iccid, "delete", delete_result)
+                
+                return {"result": OperationResult.OK.value}
+                
         except Exception as e:
             self.logger.error(f"Profile delete failed: {str(e)}")
             return {"result": OperationResult.ERROR.value, "error": str(e)}
 
+    async def execute_batch(self,
+                            operations: List[Dict[str, Any]],
+                            concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Execute a batch of mixed lifecycle operations
+        Operations for the same EID run in submission order, different EIDs
+        run in parallel up to the concurrency limit. One result per operation.
+        """
+        limit = concurrency or self.config.get('batch_concurrency', 64)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(operations)
+        
+        # Group operation indexes per EID, preserving submission order
+        groups: Dict[Optional[str], List[int]] = {}
+        for index, operation in enumerate(operations):
+            groups.setdefault(operation.get('eid'), []).append(index)
+        pending = deque(groups.values())
+        
+        async def worker():
+            while pending:
+                for index in pending.popleft():
+                    results[index] = await self._execute_batch_item(index, operations[index])
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(limit, len(pending)))]
+        await asyncio.gather(*workers)
+        
+        return results
+    
+    async def _execute_batch_item(self, index: int, operation: Dict[str, Any]) -> Dict[str, Any]:
+        """Run a single batch operation, never raising"""
+        op = operation.get('operation')
+        eid = operation.get('eid')
+        try:
+            required = self._BATCH_REQUIRED_FIELDS.get(op)
+            missing = [field for field in required or () if not operation.get(field)]
+            
+            if required is None:
+                result = {"result": OperationResult.ERROR.value, "error": f"Unsupported operation: {op}"}
+            elif missing:
+                result = {"result": OperationResult.ERROR.value, "error": f"Missing field: {missing[0]}"}
+            elif op == "download":
+                async with self.download_gate() if self.download_gate else contextlib.nullcontext():
+                    result = await self.download_profile(
+                        eid,
+                        operation['activation_code'],
+                        operation.get('confirmation_code')
+                    )
+            else:
+                handler = getattr(self, f"{op}_profile")
+                result = await handler(eid, operation['iccid'])
+                
+        except Exception as e:
+            self.logger.error(f"Batch operation {index} failed: {str(e)}")
+            result = {"result": OperationResult.ERROR.value, "error": str(e)}
+        
+        return {"index": index, "operation": op, "eid": eid, **result}
+
+    async def register_euicc(self, euicc_info: EUICCInfo):
+        """Register or update an eUICC in the backing store"""
+        await self.store.put_euicc_info(euicc_info)
+        await self.cache.invalidate(f"euicc:{euicc_info.eid}")
+    
+    def get_metrics(self) -> Dict[str, Any]:
+        """Runtime metrics for the manager's in-process components"""
+        return {
+            'eid_locks': self.eid_locks.stats(),
+            'cache': self.cache.stats(),
+            'secure_channels': self.channel_sessions.stats(),
+            'idempotency': self.idempotency.stats(),
+            'smdp_client': self.smdp_client.stats() if self.smdp_client else None,
+            'notifications': self.notifications.stats() if self.notifications else None,
+            'journal': self.journal.stats() if self.journal else None,
+            'fleet_stats': self.fleet_stats.stats() if self.fleet_stats else None,
+            'change_feed': self.change_feed.stats() if self.change_feed else None,
+            'crypto': self.crypto.stats() if self.crypto else None,
+            'key_pool': self.key_pool.stats() if self.key_pool else None
+        }
+
     # Internal implementation methods
-    async def _init_database(self): pass
-    async def _init_redis(self): pass
+    async def _init_database(self):
+        """Open the configured profile storage backend"""
+        from src.core.profile_store import create_profile_store
+        self.store = create_profile_store(self.config)
+        await self.store.initialize()
+        self.db_pool = getattr(self.store, 'pool', None)
+    
+    async def _init_redis(self):
+        """Connect the optional Redis tier shared by the lookup cache and idempotency store"""
+        redis_url = self.config.get('redis_url')
+        if redis_url == 'memory://':
+            from src.core.redis_stub import InMemoryRedis
+            self.redis_client = InMemoryRedis()
+        elif redis_url:
+            import redis.asyncio as redis
+            self.redis_client = redis.from_url(redis_url)
+        
+        if self.redis_client is not None:
+            self.cache.redis_client = self.redis_client
+            self.idempotency.redis_client = self.redis_client
+    
     async def _init_hsm(self): pass
-    async def _init_security(self): pass
-    async def _get_euicc_info(self, eid: str): pass
-    async def _parse_activation_code(self, code: str): pass
-    async def _establish_secure_channel(self, address: str): pass
-    async def _download_from_smdp(self, channel, info, code): pass
+    async def _init_security(self):
+        """Set up the non-blocking crypto facade when a CA is configured"""
+        if self.config.get('ca_cert_path'):
+            from src.security.crypto_manager import AsyncCryptoManager, CryptoManager
+            self.crypto = AsyncCryptoManager(
+                CryptoManager(self.config),
+                executor=self.config.get('crypto_executor', 'thread'),
+                max_workers=self.config.get('crypto_max_workers'),
+                max_pending=self.config.get('crypto_max_pending', 64),
+                max_wait_seconds=self.config.get('crypto_max_wait_seconds')
+            )
+            
+            if self.config.get('key_pool_enabled', True):
+                from src.security.key_pool import DEFAULT_KEY_SPECS, KeyPool
+                self.key_pool = KeyPool(
+                    self.crypto,
+                    specs=self.config.get('key_pool_specs', DEFAULT_KEY_SPECS),
+                    low_watermark=self.config.get('key_pool_low_watermark', 8),
+                    high_watermark=self.config.get('key_pool_high_watermark', 32),
+                    refill_concurrency=self.config.get('key_pool_refill_concurrency', 2)
+                )
+                await self.key_pool.start()
+    
+    async def _init_smdp(self):
+        """Create the shared pooled ES9+ client"""
+        from src.core.smdp_client import SMDPClient
+        self.smdp_client = SMDPClient(
+            max_connections=self.config.get('smdp_max_connections', 256),
+            max_per_host=self.config.get('smdp_max_per_host', 32),
+            host_limits=self.config.get('smdp_host_limits'),
+            timeout=self.config.get('smdp_timeout_seconds', 30.0),
+            connect_timeout=self.config.get('smdp_connect_timeout_seconds', 5.0),
+            retries=self.config.get('smdp_retries', 3)
+        )
+        await self.smdp_client.start()
+    
+    async def _init_notifications(self):
+        """Start the background notification delivery pipeline"""
+        from src.core.notifications import NotificationDispatcher
+        self.notifications = NotificationDispatcher(
+            self.store,
+            self._deliver_notifications,
+            batch_size=self.config.get('notification_batch_size', 50),
+            batch_delay=self.config.get('notification_batch_delay_seconds', 0.05),
+            coalesce_window=self.config.get('notification_coalesce_seconds', 2.0),
+            max_retries=self.config.get('notification_max_retries', 3),
+            backoff_base=self.config.get('notification_backoff_seconds', 1.0)
+        )
+        await self.notifications.start()
+    
+    async def _init_journal(self):
+        """Start the write-behind operation/audit journal"""
+        from src.core.journal import WriteBehindJournal
+        self.journal = WriteBehindJournal(
+            self.store,
+            max_batch=self.config.get('journal_max_batch', 1000),
+            flush_interval=self.config.get('journal_flush_interval_seconds', 0.5),
+            spill_path=self.config.get('journal_spill_path'),
+            max_buffered=self.config.get('journal_max_buffered', 100000)
+        )
+        await self.journal.start()
+    
+    async def _init_fleet_stats(self):
+        """Load fleet counters from the store and start their reconciliation job"""
+        from src.core.fleet_stats import FleetStatistics
+        self.fleet_stats = FleetStatistics(
+            self.store.count_profiles_by_group,
+            reconcile_interval=self.config.get('stats_reconcile_interval_seconds', 300.0)
+        )
+        await self.fleet_stats.start()
+    
+    async def _init_change_feed(self):
+        """Start the profile change feed, fanned out over Redis when configured"""
+        if not self.config.get('change_feed_enabled', True):
+            return
+        from src.core.change_feed import ChangeFeed
+        self.change_feed = ChangeFeed(
+            history_size=self.config.get('change_feed_history_size', 10000),
+            subscriber_buffer=self.config.get('change_feed_subscriber_buffer', 1000),
+            redis_client=self.redis_client if self.config.get('change_feed_shared', True) else None
+        )
+        await self.change_feed.start()
+    
+    # Cached lookups - read through to the backing store hooks below
+    async def _get_euicc_info(self, eid: str):
+        return await self.cache.get_or_load(
+            f"euicc:{eid}", lambda: self._fetch_euicc_info(eid),
+            codec=EUICCInfo, cache_none=True
+        )
+    
+    async def _get_profile(self, eid: str, iccid: str):
+        profile = await self.cache.get_or_load(
+            f"profile:{eid}:{iccid}", lambda: self._fetch_profile(eid, iccid),
+            codec=ESIMProfile
+        )
+        return self._bind_details_loader(eid, profile)
+    
+    async def _get_enabled_profile(self, eid: str):
+        profile = await self.cache.get_or_load(
+            f"enabled:{eid}", lambda: self._fetch_enabled_profile(eid),
+            codec=ESIMProfile, cache_none=True
+        )
+        return self._bind_details_loader(eid, profile)
+    
+    def _bind_details_loader(self, eid: str, profile: Optional[ESIMProfile]) -> Optional[ESIMProfile]:
+        """Profiles decoded from the Redis tier lose their loader; point them back at the store"""
+        if profile is not None and not profile.details_loaded and profile.details_loader is None:
+            profile.details_loader = functools.partial(self.store.get_profile_details, eid, profile.iccid)
+        return profile
+    
+    # Write paths - invalidate cached lookups after the backing store changes
+    async def _store_profile_info(self, eid: str, data, result):
+        previous_state = await self._write_profile_info(eid, data, result)
+        await self.cache.invalidate(f"profile:{eid}:{data['iccid']}", f"enabled:{eid}")
+        if self.fleet_stats:
+            self.fleet_stats.record_transition(
+                data.get('service_provider_name', ''), data.get('profile_class', 'operational'),
+                previous_state, ProfileState.DISABLED
+            )
+        if self.change_feed:
+            self.change_feed.publish(
+                eid, data['iccid'], "download",
+                previous_state.value if previous_state else None, ProfileState.DISABLED.value
+            )
+    
+    async def _update_profile_state(self, eid: str, iccid: str, state: ProfileState):
+        # Counter groups come from the cached profile the lifecycle method has just read
+        profile = await self._get_profile(eid, iccid) if self.fleet_stats else None
+        previous_state = await self._write_profile_state(eid, iccid, state)
+        await self.cache.invalidate(f"profile:{eid}:{iccid}", f"enabled:{eid}")
+        if profile is not None:
+            self.fleet_stats.record_transition(
+                profile.service_provider_name, profile.profile_class, previous_state, state
+            )
+        if self.change_feed and previous_state != state:
+            self.change_feed.publish(
+                eid, iccid, self._STATE_OPERATIONS[state],
+                previous_state.value if previous_state else None, state.value
+            )
+    
+    async def _list_profiles(self, eid: Optional[str] = None, state: Optional[str] = None) -> List[Dict[str, Any]]:
+        """List profiles as API dicts, optionally filtered by EID and state"""
+        rows = await self.store.list_profiles(eid, ProfileState(state) if state else None)
+        return [profile.to_dict(row_eid) for row_eid, profile in rows]
+    
+    async def _list_profiles_page(self,
+                                  eid: Optional[str] = None,
+                                  state: Optional[str] = None,
+                                  after: Optional[Tuple[str, str]] = None,
+                                  limit: int = 100) -> List[Dict[str, Any]]:
+        """Keyset page of profiles ordered by (eid, iccid)"""
+        rows = await self.store.list_profiles_page(
+            eid, ProfileState(state) if state else None, after, limit
+        )
+        return [profile.to_dict(row_eid) for row_eid, profile in rows]
+    
+    async def _iter_profiles(self,
+                             eid: Optional[str] = None,
+                             state: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Stream all matching profiles as API dicts in constant memory"""
+        batch_size = self.config.get('profile_stream_batch_size', 1000)
+        async for row_eid, profile in self.store.iter_profiles(
+            eid, ProfileState(state) if state else None, batch_size
+        ):
+            yield profile.to_dict(row_eid)
+    
+    async def _get_profiles_by_eid(self, eid: str) -> List[Dict[str, Any]]:
+        """Profiles installed on an eUICC as API dicts"""
+        profiles = await self.store.get_profiles_by_eid(eid)
+        return [profile.to_dict(eid) for profile in profiles]
+    
+    # Backing store hooks
+    async def _fetch_euicc_info(self, eid: str):
+        return await self.store.get_euicc_info(eid)
+    
+    async def _fetch_profile(self, eid: str, iccid: str):
+        return await self.store.get_profile(eid, iccid)
+    
+    async def _fetch_enabled_profile(self, eid: str):
+        return await self.store.get_enabled_profile(eid)
+    
+    async def _write_profile_info(self, eid: str, data, result) -> Optional[ProfileState]:
+        return await self.store.store_profile(eid, self._profile_from_package(data))
+    
+    async def _write_profile_state(self, eid: str, iccid: str, state: ProfileState) -> Optional[ProfileState]:
+        return await self.store.update_profile_state(eid, iccid, state)
+    
+    def _profile_from_package(self, data: Dict[str, Any]) -> ESIMProfile:
+        """Build the stored profile record for a freshly installed package"""
+        now = datetime.utcnow()
+        return ESIMProfile(
+            iccid=data['iccid'],
+            isdp_aid=data.get('isdp_aid', ''),
+            profile_state=ProfileState.DISABLED,
+            profile_nickname=data.get('profile_nickname'),
+            service_provider_name=data.get('service_provider_name', ''),
+            profile_name=data.get('profile_name', ''),
+            icon_type=data.get('icon_type'),
+            icon=data.get('icon'),
+            profile_class=data.get('profile_class', 'operational'),
+            notification_configuration_info=data.get('notification_configuration_info') or {},
+            profile_owner=data.get('profile_owner'),
+            dp_aid=data.get('dp_aid', ''),
+            created_at=now,
+            updated_at=now
+        )
+    
+    async def _parse_activation_code(self, code: str) -> Dict[str, Any]:
+        """Parse an SGP.22 activation code: [LPA:]1$SM-DP+ address$matching ID[$OID[$CC flag]]"""
+        if code.startswith("LPA:"):
+            code = code[4:]
+        parts = code.split("$")
+        if len(parts) < 3 or parts[0] != "1" or not parts[1]:
+            raise ValueError("Invalid activation code")
+        
+        return {
+            "smdp_address": parts[1],
+            "matching_id": parts[2] or None,
+            "smdp_oid": parts[3] if len(parts) > 3 and parts[3] else None,
+            "confirmation_code_required": len(parts) > 4 and parts[4] == "1"
+        }
+    async def _establish_secure_channel(self, address: str):
+        """Reuse a cached session to the SM-DP+ or establish a new one"""
+        return await self.channel_sessions.acquire(
+            address,
+            self.config.get('secure_channel_context', 'SCP03'),
+            lambda: self._open_secure_channel(address)
+        )
+    
+    def _invalidate_secure_channel(self, address: str):
+        """Drop the cached channel so the next download to the SM-DP+ establishes a new one"""
+        self.channel_sessions.invalidate(address, self.config.get('secure_channel_context', 'SCP03'))
+    
+    async def _open_secure_channel(self, address: str) -> Dict[str, Any]:
+        """
+        Channel state shared by downloads from one SM-DP+: the pooled ES9+ connection
+        Nothing transaction-scoped lives here; each download authenticates on its own
+        """
+        await self.smdp_client.start()
+        return {"smdp_address": address}
+    
+    async def _download_from_smdp(self, channel, info, code) -> Dict[str, Any]:
+        """
+        Run one ES9+ transaction and stream the bound profile package to the spool directory
+        InitiateAuthentication yields a fresh transactionId for every download
+        """
+        from src.core.smdp_client import SMDPError
+        address = channel["smdp_address"]
+        spool_dir = self.config.get('smdp_spool_dir') or tempfile.gettempdir()
+        bpp_path = os.path.join(spool_dir, f"{uuid.uuid4().hex}.bpp")
+        try:
+            session = await self.smdp_client.initiate_authentication(
+                address,
+                base64.b64encode(os.urandom(16)).decode()
+            )
+            transaction_id = session["transactionId"]
+            auth = await self.smdp_client.authenticate_client(
+                address,
+                transaction_id,
+                matching_id=info.get("matching_id")
+            )
+            metadata = auth.get("profileMetadata", {})
+            
+            try:
+                bpp_size = await self.smdp_client.get_bound_profile_package(
+                    address, transaction_id, bpp_path, confirmation_code=code
+                )
+            except BaseException:
+                # Failed or cancelled downloads leave no partial package behind
+                _discard_spool(bpp_path)
+                raise
+        except SMDPError as e:
+            # A rejected authentication or session is not handed to the next download;
+            # transient failures (already retried by the client) keep the channel
+            if not e.retryable:
+                self._invalidate_secure_channel(address)
+            raise
+        
+        return {
+            "iccid": metadata["iccid"],
+            "service_provider_name": metadata.get("serviceProviderName", ""),
+            "profile_name": metadata.get("profileName", ""),
+            "profile_nickname": metadata.get("profileNickname"),
+            "profile_class": metadata.get("profileClass", "operational"),
+            "profile_owner": metadata.get("profileOwner"),
+            "icon_type": metadata.get("iconType"),
+            "icon": base64.b64decode(metadata["icon"]) if metadata.get("icon") else None,
+            "notification_configuration_info": metadata.get("notificationConfigurationInfo") or {},
+            "isdp_aid": metadata.get("isdpAid", ""),
+            "dp_aid": metadata.get("dpAid", ""),
+            "bpp_path": bpp_path,
+            "bpp_size": bpp_size
+        }
     async def _install_profile(self, eid: str, data): pass
-    async def _store_profile_info(self, eid: str, data, result): pass
-    async def _send_profile_notification(self, eid: str, iccid: str, op: str, result): pass
-    async def _get_profile(self, eid: str, iccid: str): pass
-    async def _get_enabled_profile(self, eid: str): pass
+    async def _send_profile_notification(self,
+                                         eid: str,
+                                         iccid: str,
+                                         op: str,
+                                         result,
+                                         notification_info: Optional[Dict[str, Any]] = None):
+        """Queue a lifecycle notification; delivery happens off the request path"""
+        info = notification_info
+        if info is None:
+            profile = await self._get_profile(eid, iccid)
+            info = (await profile.load_details()).notification_configuration_info if profile else {}
+        address = (info or {}).get('notification_address') or self.config.get('default_notification_address')
+        if not address:
+            self.logger.debug(f"No notification address for {iccid}, skipping {op} notification")
+            return
+        
+        await self.notifications.publish(eid, iccid, op, {
+            "operation": op,
+            "result": result,
+            "timestamp": datetime.utcnow().isoformat()
+        }, address)
+    
+    async def _deliver_notifications(self, address: str, events) -> List[str]:
+        """Send a batch over the pooled ES9+ client; returns the failed event ids"""
+        results = await asyncio.gather(*(
+            self.smdp_client.handle_notification(address, {
+                "eventId": event.event_id,
+                "eid": event.eid,
+                "iccid": event.iccid,
+                "notificationEvent": event.event_type,
+                **event.event_data
+            })
+            for event in events
+        ), return_exceptions=True)
+        return [event.event_id for event, r in zip(events, results) if isinstance(r, Exception)]
     async def _enable_profile_internal(self, eid: str, iccid: str): pass
     async def _disable_profile_internal(self, eid: str, iccid: str): pass
     async def _delete_profile_internal(self, eid: str, iccid: str): pass
-    async def _update_profile_state(self, eid: str, iccid: str, state: ProfileState): pass
\ No newline at end of file
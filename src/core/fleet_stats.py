@@ -0,0 +1,154 @@
+"""
+Fleet Statistics
+Incrementally maintained profile counts by state, service provider and profile class
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from src.core.esim_manager import ProfileState
+
+# (profile_state, service_provider_name, profile_class)
+GroupKey = Tuple[str, str, str]
+CountsLoader = Callable[[], Awaitable[Dict[GroupKey, int]]]
+TransitionPublisher = Callable[[str, str, Optional[ProfileState], ProfileState], Any]
+
+class FleetStatistics:
+    """
+    Profile counters for dashboards
+    The manager records every stored profile and state transition, so reads
+    never touch the store. Reads return a snapshot that is rebuilt only after
+    a change, in time proportional to the number of groups rather than the
+    fleet size. A background job periodically replaces the counters with a
+    GROUP BY over the store to correct drift (writes made outside this
+    process, failed writes, restarts).
+    
+    With a publisher set, transitions are handed to it instead of being
+    counted here, so several workers can feed one set of counters.
+    """
+    
+    def __init__(self,
+                 counts_loader: Optional[CountsLoader] = None,
+                 reconcile_interval: float = 300.0):
+        self.counts_loader = counts_loader
+        self.publisher: Optional[TransitionPublisher] = None
+        self.reconcile_interval = reconcile_interval
+        self.logger = logging.getLogger(__name__)
+        self.counts: Dict[GroupKey, int] = {}
+        self.reconciled_at: Optional[datetime] = None
+        self.reconciliations = 0
+        self.last_drift = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._reconcile_task: Optional[asyncio.Task] = None
+    
+    async def start(self):
+        """Load the initial counts and keep them reconciled"""
+        await self.reconcile()
+        if self.reconcile_interval > 0:
+            self._reconcile_task = asyncio.create_task(self._reconcile_loop())
+    
+    async def stop(self):
+        if self._reconcile_task:
+            self._reconcile_task.cancel()
+            try:
+                await self._reconcile_task
+            except asyncio.CancelledError:
+                pass
+            self._reconcile_task = None
+    
+    def publish_to(self, publisher: Optional[TransitionPublisher]):
+        """Hand transitions to publisher; None counts them here again, reloading from the store"""
+        taking_over = self.publisher is not None and publisher is None
+        self.publisher = publisher
+        if taking_over:
+            # Not a drift: nothing was counted here while publishing
+            self.counts = {}
+            self.reconciliations = 0
+            self._snapshot = None
+            asyncio.create_task(self.reconcile())
+    
+    def record_transition(self,
+                          service_provider_name: str,
+                          profile_class: str,
+                          previous_state: Optional[ProfileState],
+                          state: ProfileState):
+        """Move one profile between states; previous_state None counts a new profile"""
+        if previous_state == state:
+            return
+        if self.publisher is not None:
+            self.publisher(service_provider_name, profile_class, previous_state, state)
+            return
+        if previous_state is not None:
+            self._add((previous_state.value, service_provider_name, profile_class), -1)
+        self._add((state.value, service_provider_name, profile_class), 1)
+    
+    async def reconcile(self):
+        """Replace the counters with the store's, logging how far they had drifted"""
+        if self.counts_loader is None or self.publisher is not None:
+            return
+        try:
+            counts = {key: count for key, count in (await self.counts_loader()).items() if count}
+        except Exception as e:
+            self.logger.error(f"Fleet statistics reconciliation failed: {str(e)}")
+            return
+        
+        drift = sum(abs(counts.get(key, 0) - self.counts.get(key, 0)) for key in counts.keys() | self.counts.keys())
+        if drift and self.reconciliations:
+            self.logger.warning(f"Fleet statistics drifted by {drift} profiles; reconciled")
+        self.counts = counts
+        self.last_drift = drift
+        self.reconciled_at = datetime.utcnow()
+        self.reconciliations += 1
+        self._snapshot = None
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Totals by state, service provider and profile class, plus every group"""
+        if self._snapshot is None:
+            by_state: Dict[str, int] = {}
+            by_provider: Dict[str, Dict[str, int]] = {}
+            by_class: Dict[str, Dict[str, int]] = {}
+            groups = []
+            for (state, provider, profile_class), count in sorted(self.counts.items()):
+                by_state[state] = by_state.get(state, 0) + count
+                provider_counts = by_provider.setdefault(provider, {})
+                provider_counts[state] = provider_counts.get(state, 0) + count
+                class_counts = by_class.setdefault(profile_class, {})
+                class_counts[state] = class_counts.get(state, 0) + count
+                groups.append({
+                    "profile_state": state,
+                    "service_provider_name": provider,
+                    "profile_class": profile_class,
+                    "count": count
+                })
+            
+            self._snapshot = {
+                "total": sum(by_state.values()),
+                "by_state": by_state,
+                "by_service_provider": by_provider,
+                "by_profile_class": by_class,
+                "groups": groups,
+                "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None
+            }
+        return self._snapshot
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'groups': len(self.counts),
+            'reconciliations': self.reconciliations,
+            'last_drift': self.last_drift,
+            'reconciled_at': self.reconciled_at.isoformat() if self.reconciled_at else None
+        }
+    
+    def _add(self, key: GroupKey, delta: int):
+        count = self.counts.get(key, 0) + delta
+        if count:
+            self.counts[key] = count
+        else:
+            self.counts.pop(key, None)
+        self._snapshot = None
+    
+    async def _reconcile_loop(self):
+        while True:
+            await asyncio.sleep(self.reconcile_interval)
+            await self.reconcile()
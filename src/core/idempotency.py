@@ -0,0 +1,178 @@
+"""
+Idempotent Request Execution
+Single-flight de-duplication and result replay for lifecycle requests
+"""
+
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Awaitable, Callable, Dict
+from src.core.cache import LRUTTLCache, _MISSING
+
+class IdempotencyConflictError(Exception):
+    """An idempotency key was reused with a different request payload"""
+
+class IdempotencyStore:
+    """
+    Idempotency key registry
+    Concurrent calls with the same key share one execution. Successful
+    results are replayed for ttl seconds from a bounded in-process LRU; with
+    a Redis client, results are also shared between workers and a short NX lock
+    keeps identical requests on different workers from executing twice.
+    Failed results are only shared with concurrent duplicates, so a client
+    retry after an error runs again.
+    
+    Keys derived from the request (no Idempotency-Key header) are local only
+    and only join executions still in flight. Their results are never replayed
+    afterwards: the profile may have changed since through a batch, another
+    worker or the database, and a later identical request must run again.
+    """
+    
+    def __init__(self,
+                 max_size: int = 100000,
+                 ttl: float = 86400.0,
+                 lock_ttl: float = 60.0,
+                 poll_interval: float = 0.05,
+                 redis_client: Any = None,
+                 namespace: str = "esim"):
+        self.results = LRUTTLCache(max_size, ttl)
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.logger = logging.getLogger(__name__)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.executions = 0
+        self.joined = 0
+        self.replayed = 0
+        self.redis_errors = 0
+    
+    async def execute(self,
+                      key: str,
+                      fingerprint: str,
+                      func: Callable[[], Awaitable[Dict[str, Any]]],
+                      derived: bool = False) -> Dict[str, Any]:
+        """Run func once per key, sharing or replaying its result for duplicates"""
+        while True:
+            if not derived:
+                replay = self._local_replay(key, fingerprint)
+                if replay is not _MISSING:
+                    self.replayed += 1
+                    return replay
+            
+            future = self._inflight.get(key)
+            if future is None:
+                break
+            
+            self.joined += 1
+            outcome = await asyncio.shield(future)
+            if outcome is not None:
+                self._check_fingerprint(outcome[0], fingerprint)
+                return outcome[1]
+            # The executing call raised or was cancelled; take over
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._execute(key, fingerprint, func, derived)
+            future.set_result((fingerprint, result))
+            return result
+        finally:
+            if not future.done():
+                future.set_result(None)
+            del self._inflight[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'stored_results': len(self.results),
+            'inflight': len(self._inflight),
+            'executions': self.executions,
+            'joined': self.joined,
+            'replayed': self.replayed,
+            'redis_errors': self.redis_errors
+        }
+    
+    async def _execute(self, key, fingerprint, func, derived) -> Dict[str, Any]:
+        use_redis = self.redis_client is not None and not derived
+        lock_token = None
+        if use_redis:
+            replay, lock_token = await self._redis_claim(key)
+            if replay is not None:
+                self._check_fingerprint(replay['fingerprint'], fingerprint)
+                self.replayed += 1
+                self._remember(key, fingerprint, replay['result'], derived)
+                return replay['result']
+        
+        try:
+            self.executions += 1
+            result = await func()
+            self._remember(key, fingerprint, result, derived)
+            if use_redis and result.get("result") != "error":
+                await self._redis_call(self.redis_client.set(
+                    self._result_key(key),
+                    json.dumps({'fingerprint': fingerprint, 'result': result}),
+                    px=int(self.ttl * 1000)
+                ))
+            return result
+        finally:
+            if lock_token is not None:
+                await self._redis_release(key, lock_token)
+    
+    def _local_replay(self, key: str, fingerprint: str) -> Any:
+        entry = self.results.get(key)
+        if entry is _MISSING:
+            return _MISSING
+        
+        self._check_fingerprint(entry[0], fingerprint)
+        return entry[1]
+    
+    def _remember(self, key: str, fingerprint: str, result: Dict[str, Any], derived: bool):
+        if not derived and result.get("result") != "error":
+            self.results.set(key, (fingerprint, result))
+    
+    def _check_fingerprint(self, stored: str, fingerprint: str):
+        if stored != fingerprint:
+            raise IdempotencyConflictError("Idempotency key reused with a different request")
+    
+    def _result_key(self, key: str) -> str:
+        return f"{self.namespace}:idem:{key}"
+    
+    def _lock_key(self, key: str) -> str:
+        return f"{self.namespace}:idem-lock:{key}"
+    
+    async def _redis_claim(self, key: str):
+        """(stored result, None) if another worker finished, else (None, lock token) once claimed"""
+        token = os.urandom(8).hex()
+        waited = 0.0
+        while True:
+            raw = await self._redis_call(self.redis_client.get(self._result_key(key)))
+            if raw is not None:
+                return json.loads(raw), None
+            
+            claimed = await self._redis_call(self.redis_client.set(
+                self._lock_key(key), token, px=int(self.lock_ttl * 1000), nx=True
+            ), default=True)
+            if claimed:
+                return None, token
+            
+            # Another worker is executing this key; wait for its result or its lock to lapse
+            if waited >= self.lock_ttl:
+                return None, None
+            await asyncio.sleep(self.poll_interval)
+            waited += self.poll_interval
+    
+    async def _redis_release(self, key: str, token: str):
+        current = await self._redis_call(self.redis_client.get(self._lock_key(key)))
+        if current is not None and (current.decode() if isinstance(current, bytes) else current) == token:
+            await self._redis_call(self.redis_client.delete(self._lock_key(key)))
+    
+    async def _redis_call(self, awaitable, default: Any = None) -> Any:
+        """Redis failures degrade to local-only de-duplication"""
+        try:
+            return await awaitable
+        except Exception as e:
+            self.redis_errors += 1
+            self.logger.warning(f"Redis idempotency call failed: {str(e)}")
+            return default
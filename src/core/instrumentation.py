@@ -0,0 +1,183 @@
+"""
+Pipeline Instrumentation
+Per-stage Prometheus timings and trace context for profile lifecycle operations
+"""
+
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+# W3C traceparent of the request being served, set by the API layer
+current_traceparent: ContextVar[Optional[str]] = ContextVar('current_traceparent', default=None)
+
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class _NoopStage:
+    """Stage context used when instrumentation is disabled"""
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class _NoopTrace:
+    """Trace used when instrumentation is disabled; every call is a constant-time no-op"""
+    __slots__ = ()
+    trace_id = None
+    
+    def stage(self, name: str) -> _NoopStage:
+        return _NOOP_STAGE
+    
+    def finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        return result
+    
+    def summary(self) -> str:
+        return ""
+
+_NOOP_STAGE = _NoopStage()
+_NOOP_TRACE = _NoopTrace()
+
+class _Stage:
+    """Times one stage of an operation trace"""
+    __slots__ = ('trace', 'name', 'started')
+    
+    def __init__(self, trace: 'OperationTrace', name: str):
+        self.trace = trace
+        self.name = name
+    
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.trace.current_stage = self.name
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.trace._record_stage(self.name, self.started, time.perf_counter(), exc_type)
+        return False
+
+class OperationTrace:
+    """
+    Trace context for one lifecycle operation
+    Carries the W3C trace id of the originating request (or a fresh one) and
+    the timing of every stage, so a failure can be logged with its full stage
+    breakdown.
+    """
+    
+    def __init__(self, instrumentation: 'PipelineInstrumentation', operation: str):
+        self.instrumentation = instrumentation
+        self.operation = operation
+        self.trace_id, self.parent_id = _parse_traceparent(current_traceparent.get())
+        self.span_id = os.urandom(8).hex()
+        self.started = time.perf_counter()
+        self.current_stage: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.spans: List[Tuple[str, float, float, str]] = []
+    
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+    
+    def finish(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Record the operation outcome; returns result unchanged"""
+        outcome = result.get("result", "error")
+        if outcome == "error" and self.failed_stage is None and self.current_stage is not None:
+            # A stage completed but the operation was rejected on its output
+            self.failed_stage = self.current_stage
+            self.instrumentation._count_error(self.operation, self.current_stage, "rejected")
+        self.instrumentation._observe_operation(self.operation, outcome, time.perf_counter() - self.started)
+        return result
+    
+    def summary(self) -> str:
+        """One-line stage breakdown: name@start_ms+duration_ms[result]"""
+        stages = " ".join(
+            f"{name}@{(start - self.started) * 1000:.1f}+{duration * 1000:.1f}ms[{result}]"
+            for name, start, duration, result in self.spans
+        )
+        return f"trace_id={self.trace_id} span_id={self.span_id} {stages}"
+    
+    def _record_stage(self, name: str, started: float, ended: float, exc_type):
+        result = "ok" if exc_type is None else "error"
+        self.spans.append((name, started, ended - started, result))
+        self.instrumentation._observe_stage(self.operation, name, result, ended - started)
+        if exc_type is not None and self.failed_stage is None:
+            self.failed_stage = name
+            self.instrumentation._count_error(self.operation, name, exc_type.__name__)
+
+class PipelineInstrumentation:
+    """
+    Prometheus instrumentation for lifecycle pipelines
+    Stage and operation latencies are histograms labelled by operation, stage
+    and result; failures are counted per stage with the exception type (or
+    "rejected" for validation failures). Metrics live in a private registry
+    served by the API's /metrics endpoint. When disabled, trace() hands out
+    a shared no-op trace and prometheus_client is never imported.
+    """
+    
+    def __init__(self, enabled: bool = False, namespace: str = "esim"):
+        self.enabled = enabled
+        self.logger = logging.getLogger(__name__)
+        self.registry = None
+        self._stage_children: Dict[Tuple[str, str, str], Any] = {}
+        self._operation_children: Dict[Tuple[str, str], Any] = {}
+        self._error_children: Dict[Tuple[str, str, str], Any] = {}
+        
+        if enabled:
+            from prometheus_client import CollectorRegistry, Counter, Histogram
+            self.registry = CollectorRegistry()
+            self.stage_seconds = Histogram(
+                'operation_stage_seconds', 'Latency of each lifecycle pipeline stage',
+                ['operation', 'stage', 'result'], namespace=namespace,
+                buckets=STAGE_BUCKETS, registry=self.registry
+            )
+            self.operation_seconds = Histogram(
+                'operation_seconds', 'End-to-end latency of lifecycle operations',
+                ['operation', 'result'], namespace=namespace,
+                buckets=STAGE_BUCKETS, registry=self.registry
+            )
+            self.stage_errors = Counter(
+                'operation_stage_errors', 'Lifecycle pipeline failures by stage',
+                ['operation', 'stage', 'error'], namespace=namespace, registry=self.registry
+            )
+    
+    def trace(self, operation: str):
+        """Start tracing one operation"""
+        if not self.enabled:
+            return _NOOP_TRACE
+        return OperationTrace(self, operation)
+    
+    def render(self) -> Tuple[bytes, str]:
+        """Prometheus exposition body and content type"""
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+    
+    # Label children are cached; labels() costs more than the observation itself
+    def _observe_stage(self, operation: str, stage: str, result: str, seconds: float):
+        key = (operation, stage, result)
+        child = self._stage_children.get(key)
+        if child is None:
+            child = self._stage_children[key] = self.stage_seconds.labels(*key)
+        child.observe(seconds)
+    
+    def _observe_operation(self, operation: str, result: str, seconds: float):
+        key = (operation, result)
+        child = self._operation_children.get(key)
+        if child is None:
+            child = self._operation_children[key] = self.operation_seconds.labels(*key)
+        child.observe(seconds)
+    
+    def _count_error(self, operation: str, stage: str, error: str):
+        key = (operation, stage, error)
+        child = self._error_children.get(key)
+        if child is None:
+            child = self._error_children[key] = self.stage_errors.labels(*key)
+        child.inc()
+
+def _parse_traceparent(header: Optional[str]) -> Tuple[str, Optional[str]]:
+    """(trace_id, parent span id) from a W3C traceparent header, or a new trace id"""
+    if header:
+        parts = header.strip().split("-")
+        if len(parts) >= 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and parts[1] != "0" * 32:
+            return parts[1], parts[2]
+    return os.urandom(16).hex(), None
@@ -0,0 +1,229 @@
+"""
+Write-Behind Operation Journal
+Buffers profile_operations and audit_log rows and persists them in bulk
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+import uuid
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# Client/user the current request acts for, set by the API layer
+current_actor: ContextVar[Optional[str]] = ContextVar('current_actor', default=None)
+
+class WriteBehindJournal:
+    """
+    Write-behind journal for the operation and audit trail
+    Records are buffered in memory and flushed to the store with one bulk
+    insert per table when max_batch records are pending or every
+    flush_interval seconds. With spill_path set, each record is also appended
+    to a local JSON-lines segment; segments are deleted once their records
+    are flushed and replayed on start after a crash. Rows carry their own ids,
+    so replays are idempotent.
+    
+    While the store is failing, at most max_buffered records stay in memory.
+    The oldest records past that are left to their spill segments, which are
+    kept until the next start replays them, or dropped when there is no
+    spill_path.
+    """
+    
+    def __init__(self,
+                 store: Any,
+                 max_batch: int = 1000,
+                 flush_interval: float = 0.5,
+                 spill_path: Optional[str] = None,
+                 max_buffered: int = 100000):
+        self.store = store
+        self.max_batch = max_batch
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.logger = logging.getLogger(__name__)
+        self._buffer: List[Tuple[str, Dict[str, Any]]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_needed = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._segment = None
+        self._segment_number = 0
+        # Segments up to this number hold records evicted from memory
+        self._retained_segments = 0
+        self.recorded = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.flush_failures = 0
+        self.spilled = 0
+        self.dropped = 0
+    
+    async def start(self):
+        """Replay unflushed spill segments and start the flush loop"""
+        if self.spill_path:
+            self._replay_segments()
+            self._open_segment()
+        self._task = asyncio.create_task(self._flush_loop())
+    
+    async def stop(self):
+        """Stop the flush loop and drain everything still buffered"""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        
+        await self.flush()
+        if self._segment:
+            self._segment.close()
+            self._segment = None
+            if not self._buffer:
+                self._delete_segments(self._segment_number)
+    
+    def record_operation(self,
+                         eid: str,
+                         iccid: Optional[str],
+                         operation_type: str,
+                         result: Dict[str, Any],
+                         started_at: datetime):
+        """Journal a lifecycle operation and its audit entry"""
+        now = datetime.utcnow().isoformat()
+        success = result.get("result") == "ok"
+        actor = current_actor.get()
+        
+        self._append("profile_operations", {
+            "operation_id": uuid.uuid4().hex,
+            "eid": eid,
+            "iccid": iccid,
+            "operation_type": operation_type,
+            "operation_status": "completed" if success else "failed",
+            "operation_result": result,
+            "error_message": result.get("error"),
+            "initiated_by": actor,
+            "started_at": started_at.isoformat(),
+            "completed_at": now
+        })
+        self._append("audit_log", {
+            "id": str(uuid.uuid4()),
+            "client_id": actor,
+            "action": f"profile.{operation_type}",
+            "resource_type": "esim_profile",
+            "resource_id": iccid,
+            "new_values": {"eid": eid, "profile_state": result.get("profile_state")},
+            "success": success,
+            "error_message": result.get("error"),
+            "created_at": now
+        })
+    
+    async def flush(self):
+        """Write all buffered records to the store"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            
+            batch, self._buffer = self._buffer, []
+            flushed_segment = self._segment_number
+            if self._segment:
+                self._open_segment()
+            
+            operations = [row for table, row in batch if table == "profile_operations"]
+            audit = [row for table, row in batch if table == "audit_log"]
+            try:
+                if operations:
+                    await self.store.insert_profile_operations(operations)
+                if audit:
+                    await self.store.insert_audit_records(audit)
+            except Exception as e:
+                # Keep the records (and their segments) for the next attempt
+                self.flush_failures += 1
+                self._buffer = batch + self._buffer
+                self.logger.error(f"Journal flush of {len(batch)} records failed: {str(e)}")
+                self._shed_overflow()
+                return
+            
+            self.flushes += 1
+            self.flushed += len(batch)
+            if self.spill_path:
+                self._delete_segments(flushed_segment)
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'buffered': len(self._buffer),
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'flushes': self.flushes,
+            'flush_failures': self.flush_failures,
+            'spilled': self.spilled,
+            'dropped': self.dropped
+        }
+    
+    def _shed_overflow(self):
+        """Evict the oldest records past max_buffered"""
+        overflow = len(self._buffer) - self.max_buffered
+        if overflow <= 0:
+            return
+        
+        del self._buffer[:overflow]
+        if self.spill_path:
+            # Every evicted record is in a segment up to the current one
+            self._retained_segments = self._segment_number
+            self.spilled += overflow
+            self.logger.error(f"Journal buffer full: {overflow} records left in spill segments until restart")
+        else:
+            self.dropped += overflow
+            self.logger.error(f"Journal buffer full: dropped {overflow} records")
+    
+    def _append(self, table: str, row: Dict[str, Any]):
+        self._buffer.append((table, row))
+        self.recorded += 1
+        if self._segment:
+            self._segment.write(json.dumps([table, row]) + "\n")
+            self._segment.flush()
+        if len(self._buffer) >= self.max_batch:
+            self._flush_needed.set()
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_needed.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_needed.clear()
+            await self.flush()
+    
+    def _open_segment(self):
+        if self._segment:
+            self._segment.close()
+        self._segment_number += 1
+        self._segment = open(f"{self.spill_path}.{self._segment_number}", "a")
+    
+    def _segments(self) -> List[Tuple[int, str]]:
+        segments = []
+        for path in glob.glob(f"{glob.escape(self.spill_path)}.*"):
+            suffix = path.rsplit(".", 1)[-1]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        return sorted(segments)
+    
+    def _replay_segments(self):
+        for number, path in self._segments():
+            self._segment_number = max(self._segment_number, number)
+            with open(path) as f:
+                for line in f:
+                    try:
+                        table, row = json.loads(line)
+                    except ValueError:
+                        # Torn final write from a crash
+                        continue
+                    self._buffer.append((table, row))
+        
+        if self._buffer:
+            self.logger.warning(f"Replayed {len(self._buffer)} unflushed journal records")
+    
+    def _delete_segments(self, up_to: int):
+        for number, path in self._segments():
+            if self._retained_segments < number <= up_to:
+                os.remove(path)
@@ -0,0 +1,249 @@
+"""
+Profile Notification Pipeline
+Durable, batched and coalescing delivery of lifecycle notifications off the request path
+"""
+
+import asyncio
+import logging
+import random
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+# Operations whose pending notification a later state change may replace
+SUPERSEDABLE_EVENTS = {"enable", "disable"}
+SUPERSEDING_EVENTS = {"enable", "disable", "delete"}
+
+@dataclass
+class NotificationEvent:
+    """Row of the notification_events table"""
+    event_id: str
+    eid: str
+    iccid: Optional[str]
+    event_type: str
+    event_data: Dict[str, Any]
+    notification_address: str
+    delivery_status: str = "pending"
+    retry_count: int = 0
+    max_retries: int = 3
+    next_retry_at: Optional[datetime] = None
+    delivered_at: Optional[datetime] = None
+    created_at: datetime = field(default_factory=datetime.utcnow)
+
+# Delivers a batch for one address; returns the event_ids that failed (None/empty = all delivered)
+NotificationSender = Callable[[str, List[NotificationEvent]], Awaitable[Optional[Iterable[str]]]]
+
+class NotificationDispatcher:
+    """
+    Asynchronous notification delivery
+    publish() persists the event and returns; one worker per notification
+    address delivers due events in batches, retrying failures with jittered
+    exponential backoff. A pending enable/disable event that is superseded by a
+    later state change for the same profile within coalesce_window is dropped
+    from the queue and recorded with delivery_status 'superseded'.
+    """
+    
+    def __init__(self,
+                 store: Any,
+                 sender: NotificationSender,
+                 batch_size: int = 50,
+                 batch_delay: float = 0.05,
+                 coalesce_window: float = 2.0,
+                 max_retries: int = 3,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 300.0,
+                 max_concurrent_batches: int = 16):
+        self.store = store
+        self.sender = sender
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.coalesce_window = timedelta(seconds=coalesce_window)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.logger = logging.getLogger(__name__)
+        self._send_slots = asyncio.Semaphore(max_concurrent_batches)
+        self._pending: Dict[str, "OrderedDict[str, NotificationEvent]"] = {}
+        self._latest: Dict[Tuple[str, Optional[str]], NotificationEvent] = {}
+        self._wakeups: Dict[str, asyncio.Event] = {}
+        self._workers: Dict[str, asyncio.Task] = {}
+        self._running = False
+        self.published = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retried = 0
+        self.superseded = 0
+        self.lag_seconds_total = 0.0
+        self.lag_seconds_max = 0.0
+    
+    async def start(self):
+        """Start delivering, resuming events left pending by a previous process"""
+        self._running = True
+        for event in await self.store.list_pending_notifications():
+            await self._queue(event)
+    
+    async def stop(self, timeout: float = 5.0):
+        """Give queued events a chance to deliver, then stop the workers"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while self.queue_depth() and loop.time() < deadline:
+            await asyncio.sleep(0.05)
+        
+        self._running = False
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+    
+    async def publish(self,
+                      eid: str,
+                      iccid: Optional[str],
+                      event_type: str,
+                      event_data: Dict[str, Any],
+                      notification_address: str) -> NotificationEvent:
+        """Durably record a notification and queue it for delivery"""
+        event = NotificationEvent(
+            event_id=uuid.uuid4().hex,
+            eid=eid,
+            iccid=iccid,
+            event_type=event_type,
+            event_data=event_data,
+            notification_address=notification_address,
+            max_retries=self.max_retries
+        )
+        await self.store.save_notification_event(event)
+        self.published += 1
+        await self._queue(event)
+        return event
+    
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._pending.values())
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue_depth(),
+            'addresses': len(self._pending),
+            'published': self.published,
+            'delivered': self.delivered,
+            'failed': self.failed,
+            'retried': self.retried,
+            'superseded': self.superseded,
+            'delivery_lag_seconds_avg': self.lag_seconds_total / self.delivered if self.delivered else 0.0,
+            'delivery_lag_seconds_max': self.lag_seconds_max
+        }
+    
+    async def _queue(self, event: NotificationEvent):
+        superseded = self._enqueue(event)
+        if superseded is not None:
+            await self._save(superseded)
+    
+    def _enqueue(self, event: NotificationEvent) -> Optional[NotificationEvent]:
+        """Queue an event; returns the pending event it superseded, if any"""
+        address = event.notification_address
+        queue = self._pending.setdefault(address, OrderedDict())
+        
+        key = (event.eid, event.iccid)
+        previous = self._latest.get(key)
+        superseded = None
+        if (previous is not None
+                and event.event_type in SUPERSEDING_EVENTS
+                and previous.event_type in SUPERSEDABLE_EVENTS
+                and previous.retry_count == 0
+                and event.created_at - previous.created_at <= self.coalesce_window
+                and queue.pop(previous.event_id, None) is not None):
+            self.superseded += 1
+            previous.delivery_status = "superseded"
+            previous.next_retry_at = None
+            superseded = previous
+        
+        self._latest[key] = event
+        queue[event.event_id] = event
+        
+        if address not in self._wakeups:
+            self._wakeups[address] = asyncio.Event()
+        self._wakeups[address].set()
+        if self._running and address not in self._workers:
+            self._workers[address] = asyncio.create_task(self._worker(address))
+        return superseded
+    
+    async def _worker(self, address: str):
+        queue = self._pending[address]
+        wakeup = self._wakeups[address]
+        while True:
+            now = datetime.utcnow()
+            due = [e for e in queue.values() if e.next_retry_at is None or e.next_retry_at <= now]
+            
+            if not due:
+                wakeup.clear()
+                retry_times = [e.next_retry_at for e in queue.values() if e.next_retry_at]
+                timeout = (min(retry_times) - now).total_seconds() if retry_times else None
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            if len(due) < self.batch_size and self.batch_delay:
+                # Let a burst accumulate into one batch
+                await asyncio.sleep(self.batch_delay)
+                now = datetime.utcnow()
+                due = [e for e in queue.values() if e.next_retry_at is None or e.next_retry_at <= now]
+            
+            batch = due[:self.batch_size]
+            for event in batch:
+                del queue[event.event_id]
+            await self._deliver(address, batch)
+    
+    async def _deliver(self, address: str, batch: List[NotificationEvent]):
+        try:
+            async with self._send_slots:
+                failed_ids = set(await self.sender(address, batch) or ())
+        except Exception as e:
+            self.logger.warning(f"Notification delivery to {address} failed: {str(e)}")
+            failed_ids = {event.event_id for event in batch}
+        
+        now = datetime.utcnow()
+        for event in batch:
+            if event.event_id in failed_ids:
+                await self._schedule_retry(event, now)
+            else:
+                await self._finish(event, "delivered", now)
+    
+    async def _schedule_retry(self, event: NotificationEvent, now: datetime):
+        event.retry_count += 1
+        if event.retry_count > event.max_retries:
+            await self._finish(event, "failed", now)
+            return
+        
+        self.retried += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (event.retry_count - 1))
+        event.next_retry_at = now + timedelta(seconds=random.uniform(delay / 2, delay))
+        await self._save(event)
+        self._pending[event.notification_address][event.event_id] = event
+    
+    async def _finish(self, event: NotificationEvent, status: str, now: datetime):
+        event.delivery_status = status
+        event.next_retry_at = None
+        event.delivered_at = now if status == "delivered" else None
+        await self._save(event)
+        
+        if status == "delivered":
+            self.delivered += 1
+            lag = (now - event.created_at).total_seconds()
+            self.lag_seconds_total += lag
+            self.lag_seconds_max = max(self.lag_seconds_max, lag)
+        else:
+            self.failed += 1
+            self.logger.error(f"Notification {event.event_id} to {event.notification_address} gave up")
+        
+        key = (event.eid, event.iccid)
+        if self._latest.get(key) is event:
+            del self._latest[key]
+    
+    async def _save(self, event: NotificationEvent):
+        try:
+            await self.store.update_notification_event(event)
+        except Exception as e:
+            self.logger.error(f"Failed to persist notification {event.event_id}: {str(e)}")
@@ -0,0 +1,379 @@
+"""
+Profile Storage Backends
+Pluggable storage interface behind the ESIMManager storage hooks
+"""
+
+import bisect
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from src.core.esim_manager import ESIMProfile, EUICCInfo, ProfileDetails, ProfileState
+from src.core.notifications import NotificationEvent
+
+ProfileKey = Tuple[str, str]
+
+# esim_profiles columns backing ESIMProfile, in constructor argument order
+PROFILE_COLUMNS = (
+    "iccid", "isdp_aid", "profile_state", "profile_nickname", "service_provider_name",
+    "profile_name", "icon_type", "icon", "profile_class", "notification_configuration_info",
+    "profile_owner", "dp_aid", "created_at", "updated_at"
+)
+
+# Bulky columns left out of single-profile lookups and loaded on demand
+PROFILE_DETAIL_COLUMNS = ("icon", "notification_configuration_info")
+PROFILE_SUMMARY_COLUMNS = tuple(c for c in PROFILE_COLUMNS if c not in PROFILE_DETAIL_COLUMNS)
+
+class SortedKeys:
+    """
+    Sorted set of profile keys split into bounded buckets
+    Adding or removing a key moves at most one bucket's worth of entries, and
+    iteration can start after any key in O(log n).
+    """
+    
+    def __init__(self, bucket_size: int = 1000):
+        self.bucket_size = bucket_size
+        self._buckets: List[List[ProfileKey]] = []
+        self._maxes: List[ProfileKey] = []
+        self._len = 0
+    
+    def __len__(self) -> int:
+        return self._len
+    
+    def __iter__(self) -> Iterator[ProfileKey]:
+        return self.after(None)
+    
+    def add(self, key: ProfileKey):
+        """Insert key; it must not be present already"""
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+        
+        index = bisect.bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            index -= 1
+            self._buckets[index].append(key)
+            self._maxes[index] = key
+        else:
+            bisect.insort(self._buckets[index], key)
+        self._len += 1
+        
+        bucket = self._buckets[index]
+        if len(bucket) > 2 * self.bucket_size:
+            self._buckets[index:index + 1] = [bucket[:self.bucket_size], bucket[self.bucket_size:]]
+            self._maxes[index:index + 1] = [bucket[self.bucket_size - 1], bucket[-1]]
+    
+    def discard(self, key: ProfileKey):
+        index = bisect.bisect_left(self._maxes, key)
+        if index == len(self._buckets):
+            return
+        bucket = self._buckets[index]
+        position = bisect.bisect_left(bucket, key)
+        if position == len(bucket) or bucket[position] != key:
+            return
+        
+        del bucket[position]
+        self._len -= 1
+        if not bucket:
+            del self._buckets[index]
+            del self._maxes[index]
+        elif position == len(bucket):
+            self._maxes[index] = bucket[-1]
+    
+    def after(self, start: Optional[ProfileKey]) -> Iterator[ProfileKey]:
+        """Keys greater than start (all keys if None) in order; do not modify while iterating"""
+        index = bisect.bisect_right(self._maxes, start) if start is not None else 0
+        if index == len(self._buckets):
+            return
+        bucket = self._buckets[index]
+        position = bisect.bisect_right(bucket, start) if start is not None else 0
+        for position in range(position, len(bucket)):
+            yield bucket[position]
+        for index in range(index + 1, len(self._buckets)):
+            yield from self._buckets[index]
+
+class ProfileStore(ABC):
+    """
+    Storage interface used by ESIMManager
+    Profiles are keyed by (eid, iccid); listing methods return (eid, profile) pairs.
+    """
+    
+    async def initialize(self):
+        """Open connections / create schema"""
+    
+    async def close(self):
+        """Release backend resources"""
+    
+    async def list_revoked_token_hashes(self) -> Set[str]:
+        """Hashes of inactive or expired api_tokens rows"""
+        return set()
+    
+    async def list_client_rate_limits(self) -> Dict[str, int]:
+        """rate_limit_per_hour by client_id, over the client's active api_tokens rows"""
+        return {}
+    
+    @abstractmethod
+    async def save_notification_event(self, event: NotificationEvent): ...
+    
+    @abstractmethod
+    async def update_notification_event(self, event: NotificationEvent):
+        """Persist delivery_status, retry_count, next_retry_at and delivered_at"""
+    
+    @abstractmethod
+    async def list_pending_notifications(self) -> List[NotificationEvent]: ...
+    
+    @abstractmethod
+    async def insert_profile_operations(self, rows: List[Dict[str, Any]]):
+        """Bulk insert profile_operations rows; rows already present are skipped"""
+    
+    @abstractmethod
+    async def insert_audit_records(self, rows: List[Dict[str, Any]]):
+        """Bulk insert audit_log rows; rows already present are skipped"""
+    
+    @abstractmethod
+    async def get_euicc_info(self, eid: str) -> Optional[EUICCInfo]: ...
+    
+    @abstractmethod
+    async def put_euicc_info(self, info: EUICCInfo): ...
+    
+    @abstractmethod
+    async def get_profile(self, eid: str, iccid: str) -> Optional[ESIMProfile]: ...
+    
+    @abstractmethod
+    async def get_enabled_profile(self, eid: str) -> Optional[ESIMProfile]: ...
+    
+    @abstractmethod
+    async def get_profile_details(self, eid: str, iccid: str) -> Optional[ProfileDetails]:
+        """(icon, notification_configuration_info) of one profile, None if unknown"""
+    
+    @abstractmethod
+    async def get_profiles_by_eid(self, eid: str) -> List[ESIMProfile]: ...
+    
+    @abstractmethod
+    async def get_profiles_by_iccid(self, iccid: str) -> List[Tuple[str, ESIMProfile]]: ...
+    
+    @abstractmethod
+    async def list_profiles(self,
+                            eid: Optional[str] = None,
+                            state: Optional[ProfileState] = None) -> List[Tuple[str, ESIMProfile]]: ...
+    
+    @abstractmethod
+    async def list_profiles_page(self,
+                                 eid: Optional[str] = None,
+                                 state: Optional[ProfileState] = None,
+                                 after: Optional[ProfileKey] = None,
+                                 limit: int = 100) -> List[Tuple[str, ESIMProfile]]:
+        """Keyset page ordered by (eid, iccid), starting strictly after the given key"""
+    
+    async def iter_profiles(self,
+                            eid: Optional[str] = None,
+                            state: Optional[ProfileState] = None,
+                            batch_size: int = 1000) -> AsyncIterator[Tuple[str, ESIMProfile]]:
+        """Stream every matching profile in key order, one page in memory at a time"""
+        after = None
+        while True:
+            page = await self.list_profiles_page(eid, state, after, batch_size)
+            for row in page:
+                yield row
+            if len(page) < batch_size:
+                return
+            after = (page[-1][0], page[-1][1].iccid)
+    
+    @abstractmethod
+    async def store_profile(self, eid: str, profile: ESIMProfile) -> Optional[ProfileState]:
+        """Insert or replace a profile, returning its previous state (None if new)"""
+    
+    @abstractmethod
+    async def count_profiles_by_group(self) -> Dict[Tuple[str, str, str], int]:
+        """Profile counts keyed by (profile_state, service_provider_name, profile_class)"""
+    
+    @abstractmethod
+    async def update_profile_state(self,
+                                   eid: str,
+                                   iccid: str,
+                                   state: ProfileState) -> Optional[ProfileState]:
+        """Set a profile's state, returning the previous state (None if unknown)"""
+
+class InMemoryProfileStore(ProfileStore):
+    """
+    Indexed in-memory profile store
+    Secondary indexes by EID, ICCID and state keep filtered listing O(matches),
+    and the enabled profile of each EID is tracked directly. Profiles are
+    treated as immutable; state changes replace the stored instance. Sorted
+    key sets, one overall and one per state, serve keyset pagination.
+    """
+    
+    def __init__(self, journal_retention: int = 100000):
+        self._euiccs: Dict[str, EUICCInfo] = {}
+        self._profiles: Dict[ProfileKey, ESIMProfile] = {}
+        self._by_eid: Dict[str, Dict[str, None]] = {}
+        self._by_iccid: Dict[str, Set[str]] = {}
+        self._by_state: Dict[ProfileState, SortedKeys] = {state: SortedKeys() for state in ProfileState}
+        self._enabled: Dict[str, str] = {}
+        self._ordered = SortedKeys()
+        self._notifications: Dict[str, NotificationEvent] = {}
+        self.profile_operations: deque = deque(maxlen=journal_retention)
+        self.audit_log: deque = deque(maxlen=journal_retention)
+    
+    async def save_notification_event(self, event: NotificationEvent):
+        self._notifications[event.event_id] = event
+    
+    async def update_notification_event(self, event: NotificationEvent):
+        # Only undelivered events are kept; there is no history to serve in memory
+        if event.delivery_status == "pending":
+            self._notifications[event.event_id] = event
+        else:
+            self._notifications.pop(event.event_id, None)
+    
+    async def list_pending_notifications(self) -> List[NotificationEvent]:
+        return [e for e in self._notifications.values() if e.delivery_status == "pending"]
+    
+    async def insert_profile_operations(self, rows: List[Dict[str, Any]]):
+        self.profile_operations.extend(rows)
+    
+    async def insert_audit_records(self, rows: List[Dict[str, Any]]):
+        self.audit_log.extend(rows)
+    
+    async def get_euicc_info(self, eid: str) -> Optional[EUICCInfo]:
+        return self._euiccs.get(eid)
+    
+    async def put_euicc_info(self, info: EUICCInfo):
+        self._euiccs[info.eid] = info
+    
+    async def get_profile(self, eid: str, iccid: str) -> Optional[ESIMProfile]:
+        return self._profiles.get((eid, iccid))
+    
+    async def get_enabled_profile(self, eid: str) -> Optional[ESIMProfile]:
+        iccid = self._enabled.get(eid)
+        return self._profiles[(eid, iccid)] if iccid is not None else None
+    
+    async def get_profile_details(self, eid: str, iccid: str) -> Optional[ProfileDetails]:
+        profile = self._profiles.get((eid, iccid))
+        return (profile.icon, profile.notification_configuration_info) if profile is not None else None
+    
+    async def get_profiles_by_eid(self, eid: str) -> List[ESIMProfile]:
+        return [self._profiles[(eid, iccid)] for iccid in self._by_eid.get(eid, ())]
+    
+    async def get_profiles_by_iccid(self, iccid: str) -> List[Tuple[str, ESIMProfile]]:
+        return [(eid, self._profiles[(eid, iccid)]) for eid in self._by_iccid.get(iccid, ())]
+    
+    async def list_profiles(self,
+                            eid: Optional[str] = None,
+                            state: Optional[ProfileState] = None) -> List[Tuple[str, ESIMProfile]]:
+        if eid is not None:
+            keys: Iterable[ProfileKey] = ((eid, iccid) for iccid in self._by_eid.get(eid, ()))
+            if state is not None:
+                keys = (key for key in keys if self._profiles[key].profile_state == state)
+        elif state is not None:
+            keys = self._by_state[state]
+        else:
+            keys = self._profiles
+        
+        return [(key[0], self._profiles[key]) for key in keys]
+    
+    async def list_profiles_page(self,
+                                 eid: Optional[str] = None,
+                                 state: Optional[ProfileState] = None,
+                                 after: Optional[ProfileKey] = None,
+                                 limit: int = 100) -> List[Tuple[str, ESIMProfile]]:
+        if eid is not None:
+            start = (eid, after[1]) if after is not None and after[0] == eid else (eid, "")
+            if after is not None and after[0] > eid:
+                return []
+            keys = self._ordered.after(start)
+        else:
+            # Without an EID, a state filter walks only that state's keys
+            keys = (self._by_state[state] if state is not None else self._ordered).after(after)
+        
+        page: List[Tuple[str, ESIMProfile]] = []
+        for key in keys:
+            if len(page) >= limit or (eid is not None and key[0] != eid):
+                break
+            profile = self._profiles[key]
+            if state is None or profile.profile_state == state:
+                page.append((key[0], profile))
+        
+        return page
+    
+    async def store_profile(self, eid: str, profile: ESIMProfile) -> Optional[ProfileState]:
+        key = (eid, profile.iccid)
+        if profile.profile_state == ProfileState.ENABLED:
+            self._check_can_enable(eid, profile.iccid)
+        
+        previous = self._profiles.get(key)
+        if previous is not None:
+            self._unindex_state(key, previous.profile_state)
+        else:
+            self._ordered.add(key)
+        
+        self._profiles[key] = profile
+        self._by_eid.setdefault(eid, {})[profile.iccid] = None
+        self._by_iccid.setdefault(profile.iccid, set()).add(eid)
+        self._index_state(key, profile.profile_state)
+        
+        return previous.profile_state if previous is not None else None
+    
+    async def count_profiles_by_group(self) -> Dict[Tuple[str, str, str], int]:
+        counts: Dict[Tuple[str, str, str], int] = {}
+        for profile in self._profiles.values():
+            key = (profile.profile_state.value, profile.service_provider_name, profile.profile_class)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+    
+    async def update_profile_state(self,
+                                   eid: str,
+                                   iccid: str,
+                                   state: ProfileState) -> Optional[ProfileState]:
+        key = (eid, iccid)
+        profile = self._profiles.get(key)
+        if profile is None:
+            return None
+        
+        previous_state = profile.profile_state
+        if state == ProfileState.ENABLED:
+            self._check_can_enable(eid, iccid)
+        
+        self._unindex_state(key, previous_state)
+        self._profiles[key] = profile.with_state(state, datetime.utcnow())
+        self._index_state(key, state)
+        
+        return previous_state
+    
+    def _check_can_enable(self, eid: str, iccid: str):
+        enabled = self._enabled.get(eid)
+        if enabled is not None and enabled != iccid:
+            raise ValueError(f"eUICC {eid} already has enabled profile {enabled}")
+    
+    def _index_state(self, key: ProfileKey, state: ProfileState):
+        self._by_state[state].add(key)
+        if state == ProfileState.ENABLED:
+            self._enabled[key[0]] = key[1]
+    
+    def _unindex_state(self, key: ProfileKey, state: ProfileState):
+        self._by_state[state].discard(key)
+        if state == ProfileState.ENABLED and self._enabled.get(key[0]) == key[1]:
+            del self._enabled[key[0]]
+
+def create_profile_store(config: Dict[str, Any]) -> ProfileStore:
+    """Instantiate the storage backend selected by config['storage_backend']"""
+    backend = config.get('storage_backend', 'memory')
+    
+    if backend == 'memory':
+        return InMemoryProfileStore(config.get('memory_journal_retention', 100000))
+    
+    if backend == 'postgres':
+        from src.database.postgres_store import PostgresProfileStore
+        return PostgresProfileStore(
+            config['database_url'],
+            min_size=config.get('db_pool_min_size', 5),
+            max_size=config.get('db_pool_max_size', 20),
+            command_timeout=config.get('db_command_timeout_seconds', 10.0)
+        )
+    
+    if backend == 'sqlite':
+        from src.database.sqlite_store import SQLiteProfileStore
+        return SQLiteProfileStore(config.get('sqlite_path', 'esim.db'))
+    
+    raise ValueError(f"Unsupported storage backend: {backend}")
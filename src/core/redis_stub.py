@@ -0,0 +1,98 @@
+"""
+In-Process Redis Stand-In
+Minimal redis.asyncio-compatible key/value store for local runs and tests
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Optional, Set, Tuple
+
+class InMemoryPubSub:
+    """Pub/sub handle returned by InMemoryRedis.pubsub()"""
+    
+    def __init__(self, redis: 'InMemoryRedis'):
+        self.redis = redis
+        self.channels: Set[str] = set()
+        self.messages: asyncio.Queue = asyncio.Queue()
+    
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.channels.add(channel)
+            self.redis._subscribers.setdefault(channel, set()).add(self)
+    
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or tuple(self.channels):
+            self.channels.discard(channel)
+            self.redis._subscribers.get(channel, set()).discard(self)
+    
+    async def get_message(self, ignore_subscribe_messages: bool = False, timeout: float = 0.0) -> Optional[Dict[str, Any]]:
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+    
+    async def aclose(self):
+        await self.unsubscribe()
+
+class InMemoryRedis:
+    """
+    Subset of the redis.asyncio client used by the manager's Redis tiers
+    Supports get, set (with px/nx), incr, incrby, pexpire, delete, publish, pubsub
+    and close. Selected with redis_url='memory://' so the shared-tier code paths
+    run without a server; state is per process.
+    """
+    
+    def __init__(self):
+        self._data: Dict[str, Tuple[Optional[float], Any]] = {}
+        self._subscribers: Dict[str, Set[InMemoryPubSub]] = {}
+    
+    async def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        return value
+    
+    async def set(self, key: str, value: Any, px: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and await self.get(key) is not None:
+            return None
+        
+        expires_at = time.monotonic() + px / 1000 if px else None
+        self._data[key] = (expires_at, value.encode() if isinstance(value, str) else value)
+        return True
+    
+    async def incr(self, key: str) -> int:
+        return await self.incrby(key, 1)
+    
+    async def incrby(self, key: str, amount: int) -> int:
+        current = await self.get(key)
+        expires_at = self._data[key][0] if current is not None else None
+        value = int(current or 0) + amount
+        self._data[key] = (expires_at, str(value).encode())
+        return value
+    
+    async def pexpire(self, key: str, px: int) -> bool:
+        if await self.get(key) is None:
+            return False
+        self._data[key] = (time.monotonic() + px / 1000, self._data[key][1])
+        return True
+    
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self._data.pop(key, None) is not None)
+    
+    async def publish(self, channel: str, message: Any) -> int:
+        subscribers = self._subscribers.get(channel, ())
+        data = message.encode() if isinstance(message, str) else message
+        for pubsub in subscribers:
+            pubsub.messages.put_nowait({"type": "message", "channel": channel.encode(), "data": data})
+        return len(subscribers)
+    
+    def pubsub(self) -> InMemoryPubSub:
+        return InMemoryPubSub(self)
+    
+    async def close(self):
+        self._data.clear()
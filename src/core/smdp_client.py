@@ -0,0 +1,221 @@
+"""
+SM-DP+ ES9+ Client
+Pooled keep-alive HTTP client for profile download sessions
+"""
+
+import asyncio
+import logging
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+import aiohttp
+
+ES9_PATH = "/gsma/rsp2/es9plus"
+ADMIN_PROTOCOL = "gsma/rsp/v2.2.0"
+
+# Called with each bound profile package chunk as it arrives
+ChunkSink = Callable[[bytes], Awaitable[None]]
+
+class SMDPError(Exception):
+    """ES9+ request failed or the SM-DP+ reported a failed execution status"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = False):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+
+class SMDPClient:
+    """
+    Async ES9+ client shared by all downloads
+    One aiohttp session keeps a keep-alive connection pool per host. Concurrent
+    requests per host are capped (host_limits overrides max_per_host), failures
+    are retried with full-jitter exponential backoff, and bound profile packages
+    are streamed to a file or sink instead of being buffered.
+    """
+    
+    def __init__(self,
+                 max_connections: int = 256,
+                 max_per_host: int = 32,
+                 host_limits: Optional[Dict[str, int]] = None,
+                 timeout: float = 30.0,
+                 connect_timeout: float = 5.0,
+                 keepalive_timeout: float = 60.0,
+                 retries: int = 3,
+                 backoff_base: float = 0.2,
+                 backoff_max: float = 5.0,
+                 chunk_size: int = 64 * 1024):
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.host_limits = host_limits or {}
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.chunk_size = chunk_size
+        self.logger = logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self.requests = 0
+        self.retried = 0
+        self.failures = 0
+    
+    async def start(self):
+        if self._session is None:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                limit_per_host=self.max_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={"X-Admin-Protocol": ADMIN_PROTOCOL}
+            )
+    
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+    
+    async def initiate_authentication(self,
+                                      address: str,
+                                      euicc_challenge: str,
+                                      euicc_info1: Optional[str] = None) -> Dict[str, Any]:
+        """ES9+.InitiateAuthentication"""
+        return await self._call(address, "initiateAuthentication", {
+            "euiccChallenge": euicc_challenge,
+            "euiccInfo1": euicc_info1,
+            "smdpAddress": self._host(address)
+        })
+    
+    async def authenticate_client(self,
+                                  address: str,
+                                  transaction_id: str,
+                                  matching_id: Optional[str] = None,
+                                  authenticate_server_response: Optional[str] = None) -> Dict[str, Any]:
+        """ES9+.AuthenticateClient - returns profile metadata"""
+        return await self._call(address, "authenticateClient", {
+            "transactionId": transaction_id,
+            "matchingId": matching_id,
+            "authenticateServerResponse": authenticate_server_response
+        })
+    
+    async def get_bound_profile_package(self,
+                                        address: str,
+                                        transaction_id: str,
+                                        sink: Union[str, ChunkSink],
+                                        confirmation_code: Optional[str] = None) -> int:
+        """
+        ES9+.GetBoundProfilePackage
+        Streams the package to a file path or async chunk sink; returns its size.
+        File downloads restart from scratch on retry; sink downloads are only
+        retried while no chunk has been delivered.
+        """
+        body = {"transactionId": transaction_id, "confirmationCode": confirmation_code}
+        delivered = False
+        
+        async def consume(response: aiohttp.ClientResponse) -> int:
+            nonlocal delivered
+            if response.content_type == "application/json":
+                # A rejected request carries a status header instead of a package
+                self._check_status("getBoundProfilePackage", await response.json(), response.status)
+                raise SMDPError("getBoundProfilePackage returned no package", response.status)
+            size = 0
+            if isinstance(sink, str):
+                with open(sink, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        f.write(chunk)
+                        size += len(chunk)
+            else:
+                async for chunk in response.content.iter_chunked(self.chunk_size):
+                    delivered = True
+                    await sink(chunk)
+                    size += len(chunk)
+            return size
+        
+        return await self._request(
+            address, "getBoundProfilePackage", body, consume,
+            can_retry=lambda: not delivered
+        )
+    
+    async def handle_notification(self, address: str, notification: Dict[str, Any]):
+        """ES9+.HandleNotification"""
+        await self._call(address, "handleNotification", {"pendingNotification": notification})
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'requests': self.requests,
+            'retried': self.retried,
+            'failures': self.failures,
+            'hosts': len(self._host_slots)
+        }
+    
+    async def _call(self, address: str, function: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        async def read_json(response: aiohttp.ClientResponse) -> Dict[str, Any]:
+            if response.status == 204:
+                return {}
+            data = await response.json()
+            self._check_status(function, data, response.status)
+            return data
+        
+        return await self._request(address, function, body, read_json)
+    
+    @staticmethod
+    def _check_status(function: str, data: Dict[str, Any], http_status: int):
+        execution = data.get("header", {}).get("functionExecutionStatus", {})
+        status = execution.get("status")
+        if status and status != "Executed-Success":
+            codes = execution.get("statusCodeData") or {}
+            detail = f" ({codes.get('subjectCode')}/{codes.get('reasonCode')})" if codes else ""
+            raise SMDPError(f"{function} failed: {status}{detail}", http_status)
+    
+    async def _request(self,
+                       address: str,
+                       function: str,
+                       body: Dict[str, Any],
+                       handle: Callable[[aiohttp.ClientResponse], Awaitable[Any]],
+                       can_retry: Callable[[], bool] = lambda: True) -> Any:
+        await self.start()
+        host = self._host(address)
+        url = f"{self._base_url(address)}{ES9_PATH}/{function}"
+        slots = self._host_slots.get(host)
+        if slots is None:
+            slots = self._host_slots[host] = asyncio.Semaphore(self.host_limits.get(host, self.max_per_host))
+        
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                async with slots:
+                    async with self._session.post(url, json=body) as response:
+                        if response.status == 429 or response.status >= 500:
+                            raise SMDPError(f"{function} HTTP {response.status}", response.status, retryable=True)
+                        if response.status >= 400:
+                            raise SMDPError(f"{function} HTTP {response.status}", response.status)
+                        return await handle(response)
+                        
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError, SMDPError) as e:
+                retryable = not isinstance(e, SMDPError) or e.retryable
+                if not retryable or attempt >= self.retries or not can_retry():
+                    self.failures += 1
+                    self.logger.error(f"SM-DP+ {function} to {host} failed: {str(e)}")
+                    if isinstance(e, SMDPError):
+                        raise
+                    raise SMDPError(f"{function} failed: {str(e)}") from e
+                
+                attempt += 1
+                self.retried += 1
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                self.logger.warning(f"SM-DP+ {function} to {host} retry {attempt} in {delay:.2f}s: {str(e)}")
+                await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _base_url(address: str) -> str:
+        """SM-DP+ addresses are bare FQDNs; explicit schemes are kept (stub servers)"""
+        address = address.rstrip('/')
+        return address if "://" in address else f"https://{address}"
+    
+    @staticmethod
+    def _host(address: str) -> str:
+        return address.split("://", 1)[-1].split('/', 1)[0]
@@ -0,0 +1,180 @@
+"""
+Local Stub SM-DP+ Server
+Minimal ES9+ endpoints for load tests and CI without network access
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import random
+import uuid
+from typing import Any, Dict, Optional
+from aiohttp import web
+from src.core.smdp_client import ES9_PATH
+
+class StubSMDPServer:
+    """
+    In-process ES9+ stub
+    Serves InitiateAuthentication, AuthenticateClient, a streamed
+    GetBoundProfilePackage and HandleNotification. latency and failure_rate
+    inject delay and HTTP 503s to exercise client pooling and retries.
+    Each transactionId serves one AuthenticateClient followed by one
+    GetBoundProfilePackage; unknown, reused or out-of-order IDs are rejected.
+    """
+    
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 bpp_size: int = 64 * 1024,
+                 latency: float = 0.0,
+                 failure_rate: float = 0.0):
+        self.host = host
+        self.port = port
+        self.bpp_size = bpp_size
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.transactions: Dict[str, Dict[str, Any]] = {}
+        self.notifications = []
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+    
+    @property
+    def address(self) -> str:
+        """Base address to use as the SM-DP+ address in activation codes"""
+        return f"http://{self.host}:{self.port}"
+    
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post(f"{ES9_PATH}/initiateAuthentication", self._initiate_authentication)
+        app.router.add_post(f"{ES9_PATH}/authenticateClient", self._authenticate_client)
+        app.router.add_post(f"{ES9_PATH}/getBoundProfilePackage", self._get_bound_profile_package)
+        app.router.add_post(f"{ES9_PATH}/handleNotification", self._handle_notification)
+        
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        return self.address
+    
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+    
+    async def _simulate(self):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and random.random() < self.failure_rate:
+            raise web.HTTPServiceUnavailable()
+    
+    @staticmethod
+    def _success(**body) -> web.Response:
+        return web.json_response({
+            "header": {"functionExecutionStatus": {"status": "Executed-Success"}},
+            **body
+        })
+    
+    @staticmethod
+    def _failed(subject_code: str, reason_code: str) -> web.Response:
+        return web.json_response({
+            "header": {"functionExecutionStatus": {
+                "status": "Failed",
+                "statusCodeData": {"subjectCode": subject_code, "reasonCode": reason_code}
+            }}
+        })
+    
+    def _advance(self, transaction_id: Optional[str], expected: str, next_step: str) -> Optional[web.Response]:
+        """Move a transaction from expected to next_step, or return the failure response"""
+        transaction = self.transactions.get(transaction_id)
+        if transaction is None:
+            # SGP.22 8.10.1 / 3.9: TransactionId unknown
+            return self._failed("8.10.1", "3.9")
+        if transaction["step"] != expected:
+            # 8.10.1 / 1.2: not allowed in the current state of the transaction
+            return self._failed("8.10.1", "1.2")
+        transaction["step"] = next_step
+        return None
+    
+    async def _initiate_authentication(self, request: web.Request) -> web.Response:
+        await self._simulate()
+        transaction_id = uuid.uuid4().hex.upper()
+        self.transactions[transaction_id] = {"step": "initiated"}
+        return self._success(
+            transactionId=transaction_id,
+            serverSigned1=base64.b64encode(os.urandom(32)).decode(),
+            serverSignature1=base64.b64encode(os.urandom(64)).decode()
+        )
+    
+    async def _authenticate_client(self, request: web.Request) -> web.Response:
+        await self._simulate()
+        body = await request.json()
+        failed = self._advance(body.get("transactionId"), "initiated", "authenticated")
+        if failed is not None:
+            return failed
+        matching_id = body.get("matchingId") or uuid.uuid4().hex
+        # Deterministic 19-digit ICCID per matching ID
+        iccid = "8995" + str(int(hashlib.sha256(matching_id.encode()).hexdigest(), 16))[:15]
+        return self._success(
+            transactionId=body.get("transactionId"),
+            profileMetadata={
+                "iccid": iccid,
+                "serviceProviderName": "Stub MNO",
+                "profileName": f"Stub profile {matching_id[:8]}",
+                "profileClass": "operational",
+                "isdpAid": "A0000005591010FFFFFFFF8900001100",
+                "dpAid": "A0000005591010FFFFFFFF8900000100"
+            }
+        )
+    
+    async def _get_bound_profile_package(self, request: web.Request) -> web.StreamResponse:
+        await self._simulate()
+        transaction_id = (await request.json()).get("transactionId")
+        failed = self._advance(transaction_id, "authenticated", "downloading")
+        if failed is not None:
+            return failed
+        try:
+            response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+            response.content_length = self.bpp_size
+            await response.prepare(request)
+            
+            remaining = self.bpp_size
+            chunk = os.urandom(min(remaining, 64 * 1024))
+            while remaining > 0:
+                piece = chunk[:remaining]
+                await response.write(piece)
+                remaining -= len(piece)
+            
+            await response.write_eof()
+        except BaseException:
+            # An interrupted download may be requested again
+            self.transactions[transaction_id]["step"] = "authenticated"
+            raise
+        
+        # A completed transaction cannot be replayed
+        self.transactions[transaction_id]["step"] = "completed"
+        return response
+    
+    async def _handle_notification(self, request: web.Request) -> web.Response:
+        await self._simulate()
+        self.notifications.append(await request.json())
+        return web.Response(status=204)
+
+async def _serve(args):
+    server = StubSMDPServer(args.host, args.port, args.bpp_size, args.latency, args.failure_rate)
+    print(f"Stub SM-DP+ listening on {await server.start()}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stub SM-DP+ (ES9+) server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8443)
+    parser.add_argument("--bpp-size", type=int, default=64 * 1024)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    asyncio.run(_serve(parser.parse_args()))
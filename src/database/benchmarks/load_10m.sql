@@ -0,0 +1,54 @@
+-- Synthetic data set for query-plan benchmarks
+-- 2.5M eUICCs with 4 profiles each (10M esim_profiles rows, one enabled per
+-- eUICC) and 10M profile_operations rows spread over the last 12 months.
+-- Load into a scratch database created from schema.sql:
+--   psql -d esim_bench -f src/database/schema.sql
+--   psql -d esim_bench -f src/database/benchmarks/load_10m.sql
+
+\timing on
+SET synchronous_commit = off;
+
+INSERT INTO euicc_info (eid, euicc_info2, root_ds_address)
+SELECT lpad(upper(to_hex(g)), 32, '0'), '{}'::jsonb, 'lpa.ds.gsma.com'
+FROM generate_series(1, 2500000) AS g;
+
+INSERT INTO esim_profiles (iccid, eid, isdp_aid, profile_state, service_provider_name,
+                           profile_name, profile_class, created_at, updated_at)
+SELECT '8901' || lpad((g * 4 + p)::text, 14, '0'),
+       lpad(upper(to_hex(g)), 32, '0'),
+       'A0000005591010FFFFFFFF89000010' || lpad(p::text, 2, '0'),
+       CASE WHEN p = 0 THEN 'enabled' WHEN p = 3 THEN 'deleted' ELSE 'disabled' END,
+       (ARRAY['MPT', 'ATOM', 'OOREDOO', 'MYTEL'])[1 + g % 4],
+       'Profile ' || p,
+       'operational',
+       now() - (g % 365) * interval '1 day',
+       now() - (g % 365) * interval '1 day'
+FROM generate_series(1, 2500000) AS g, generate_series(0, 3) AS p;
+
+INSERT INTO profile_operations (operation_id, eid, iccid, operation_type, operation_status,
+                                operation_result, started_at, completed_at, created_at)
+SELECT md5(g::text),
+       lpad(upper(to_hex(1 + g % 2500000)), 32, '0'),
+       '8901' || lpad(((1 + g % 2500000) * 4 + g % 4)::text, 14, '0'),
+       (ARRAY['download', 'enable', 'disable', 'delete'])[1 + g % 4],
+       CASE WHEN g % 1000 = 0 THEN 'pending' WHEN g % 50 = 0 THEN 'failed' ELSE 'completed' END,
+       '{"result": "ok"}'::jsonb,
+       now() - (g % 525600) * interval '1 minute',
+       now() - (g % 525600) * interval '1 minute',
+       now() - (g % 525600) * interval '1 minute'
+FROM generate_series(1, 10000000) AS g;
+
+INSERT INTO notification_events (event_id, eid, iccid, event_type, event_data, notification_address,
+                                 delivery_status, next_retry_at, created_at)
+SELECT md5('n' || g),
+       lpad(upper(to_hex(1 + g % 2500000)), 32, '0'),
+       NULL,
+       'enable',
+       '{}'::jsonb,
+       'https://smdp.example.com',
+       CASE WHEN g % 500 = 0 THEN 'pending' ELSE 'delivered' END,
+       CASE WHEN g % 500 = 0 THEN now() + (g % 60) * interval '1 second' END,
+       now() - (g % 525600) * interval '1 minute'
+FROM generate_series(1, 5000000) AS g;
+
+VACUUM ANALYZE;
@@ -0,0 +1,54 @@
+-- Query plans for the store's hot statements
+-- Run once on the freshly loaded data set (schema.sql indexes only), then
+-- apply the migrations and run again to compare:
+--   psql -d esim_bench -f src/database/benchmarks/query_plans.sql > before.txt
+--   DATABASE_URL=postgresql:///esim_bench python -m src.database.migrate upgrade
+--   psql -d esim_bench -c 'VACUUM ANALYZE'
+--   psql -d esim_bench -f src/database/benchmarks/query_plans.sql > after.txt
+
+\set eid '''000000000000000000000000000F4240'''
+\set after_iccid '''890100000004000001'''
+
+-- Enabled profile for an EID
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM esim_profiles WHERE eid = :eid AND profile_state = 'enabled' LIMIT 1;
+
+-- Profiles of an EID by state (eid + state keyset page)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM esim_profiles
+WHERE eid = :eid AND profile_state = 'disabled' AND iccid > ''
+ORDER BY iccid LIMIT 100;
+
+-- All profiles in a state (state keyset page, deep cursor)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM esim_profiles
+WHERE profile_state = 'enabled' AND (eid, iccid) > (:eid, :after_iccid)
+ORDER BY eid, iccid LIMIT 100;
+
+-- State update on the enable path
+BEGIN;
+EXPLAIN (ANALYZE, BUFFERS)
+WITH previous AS (
+    SELECT id, profile_state FROM esim_profiles
+    WHERE eid = :eid AND iccid = '890100000004000001'
+    FOR UPDATE
+)
+UPDATE esim_profiles p SET profile_state = 'disabled'
+FROM previous
+WHERE p.id = previous.id
+RETURNING previous.profile_state;
+ROLLBACK;
+
+-- Notification resume scan
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM notification_events WHERE delivery_status = 'pending' ORDER BY created_at;
+
+-- Recent operations for an EID (partition pruning on created_at)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM profile_operations
+WHERE eid = :eid AND created_at >= now() - interval '7 days'
+ORDER BY created_at DESC;
+
+-- Unfinished operations
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT count(*) FROM profile_operations WHERE operation_status IN ('pending', 'in_progress');
@@ -0,0 +1,112 @@
+"""
+Database Migrations
+Applies src/database/migrations on top of schema.sql and runs log partition maintenance
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import List
+import asyncpg
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+# Files starting with this marker run statement by statement outside a
+# transaction (needed for CREATE/DROP INDEX CONCURRENTLY)
+NO_TRANSACTION_MARKER = "-- migrate:no-transaction"
+
+LOG_TABLES = ("profile_operations", "notification_events", "audit_log")
+
+logger = logging.getLogger(__name__)
+
+async def pending_migrations(conn: asyncpg.Connection) -> List[str]:
+    """Versions in MIGRATIONS_DIR not yet applied to the database, in order"""
+    applied = set()
+    if await conn.fetchval("SELECT to_regclass('schema_migrations') IS NOT NULL"):
+        applied = {row['version'] for row in await conn.fetch("SELECT version FROM schema_migrations")}
+    return [path.stem for path in sorted(MIGRATIONS_DIR.glob("*.sql")) if path.stem not in applied]
+
+async def apply_migrations(conn: asyncpg.Connection) -> List[str]:
+    """Apply pending migrations in file name order, returning the versions applied"""
+    await conn.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW())"
+    )
+    
+    versions = []
+    for version in await pending_migrations(conn):
+        sql = (MIGRATIONS_DIR / f"{version}.sql").read_text()
+        logger.info(f"Applying migration {version}")
+        if sql.startswith(NO_TRANSACTION_MARKER):
+            for statement in _split_statements(sql):
+                await conn.execute(statement)
+            await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+        else:
+            async with conn.transaction():
+                await conn.execute(sql)
+                await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+        versions.append(version)
+    
+    return versions
+
+async def maintain_partitions(conn: asyncpg.Connection,
+                              months_ahead: int = 3,
+                              retention_days: int = 365,
+                              notification_retention_days: int = 90,
+                              drop: bool = False) -> List[str]:
+    """
+    Log partition maintenance, meant to run daily
+    Creates upcoming monthly partitions and detaches partitions past retention,
+    archiving them to the log_archive schema unless drop is set.
+    """
+    changed = [row[0] for row in await conn.fetch("SELECT create_log_partitions($1)", months_ahead)]
+    for table in LOG_TABLES:
+        days = notification_retention_days if table == "notification_events" else retention_days
+        rows = await conn.fetch(
+            "SELECT archive_log_partitions($1, make_interval(days => $2), $3)", table, days, drop
+        )
+        changed.extend(f"archived {row[0]}" for row in rows)
+    
+    return changed
+
+def _split_statements(sql: str) -> List[str]:
+    """Split a plain (function-free) SQL file on statement-terminating semicolons"""
+    statements, current = [], []
+    for line in sql.splitlines():
+        if line.lstrip().startswith("--"):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append("\n".join(current).strip())
+            current = []
+    if "".join(current).strip():
+        statements.append("\n".join(current).strip())
+    return statements
+
+async def _main(args: argparse.Namespace):
+    conn = await asyncpg.connect(args.dsn)
+    try:
+        if args.command == "upgrade":
+            for version in await apply_migrations(conn):
+                print(f"applied {version}")
+        else:
+            for change in await maintain_partitions(
+                conn, args.months_ahead, args.retention_days,
+                args.notification_retention_days, args.drop
+            ):
+                print(change)
+    finally:
+        await conn.close()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="eSIM Manager database migrations")
+    parser.add_argument("command", choices=["upgrade", "maintain"])
+    parser.add_argument("--dsn", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--months-ahead", type=int, default=3)
+    parser.add_argument("--retention-days", type=int, default=365)
+    parser.add_argument("--notification-retention-days", type=int, default=90)
+    parser.add_argument("--drop", action="store_true", help="Drop expired partitions instead of archiving")
+    asyncio.run(_main(parser.parse_args()))
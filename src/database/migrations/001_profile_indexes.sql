@@ -0,0 +1,24 @@
+-- migrate:no-transaction
+-- Profile lookup indexes
+-- Built CONCURRENTLY so the migration does not block profile writes; each
+-- statement runs on its own.
+
+-- One enabled profile per eUICC, and the index behind "enabled profile for this EID".
+-- Fails if an eUICC already has more than one enabled profile; resolve with:
+--   SELECT eid, array_agg(iccid) FROM esim_profiles WHERE profile_state = 'enabled' GROUP BY eid HAVING count(*) > 1;
+CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS idx_esim_profiles_one_enabled
+    ON esim_profiles (eid) WHERE profile_state = 'enabled';
+
+-- Profiles of an EID by state, in keyset order (eid + state pages)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_esim_profiles_eid_state
+    ON esim_profiles (eid, profile_state, iccid);
+
+-- Profiles in a state across all EIDs, in keyset order (state pages)
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_esim_profiles_state_key
+    ON esim_profiles (profile_state, eid, iccid);
+
+-- Superseded by the composite indexes above or by unique constraints
+DROP INDEX CONCURRENTLY IF EXISTS idx_esim_profiles_state;
+DROP INDEX CONCURRENTLY IF EXISTS idx_esim_profiles_eid;
+DROP INDEX CONCURRENTLY IF EXISTS idx_euicc_info_eid;
+DROP INDEX CONCURRENTLY IF EXISTS idx_api_tokens_hash;
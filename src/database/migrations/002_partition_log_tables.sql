@@ -0,0 +1,157 @@
+-- Monthly range partitioning for the append-only log tables
+-- profile_operations, notification_events and audit_log are rebuilt as tables
+-- partitioned by created_at. Existing rows are kept in place: each old table is
+-- attached as the <table>_legacy partition covering everything before the first
+-- monthly partition. Primary and unique keys gain created_at, as PostgreSQL
+-- requires for partitioned tables.
+--
+-- Attaching builds the new composite keys on the legacy tables, so this step
+-- holds their locks for a time proportional to their size; run it in a
+-- maintenance window on large installations.
+
+CREATE SCHEMA IF NOT EXISTS log_archive;
+
+-- Exclusive upper bound of a range partition (NULL for MAXVALUE/default)
+CREATE OR REPLACE FUNCTION log_partition_upper_bound(p_partition regclass)
+RETURNS timestamptz AS $$
+    SELECT substring(pg_get_expr(c.relpartbound, c.oid) FROM 'TO \(''([^'']+)''\)')::timestamptz
+    FROM pg_class c
+    WHERE c.oid = p_partition;
+$$ LANGUAGE sql STABLE;
+
+-- Create monthly partitions so every log table is covered through
+-- p_months_ahead months past the current one. Idempotent.
+CREATE OR REPLACE FUNCTION create_log_partitions(p_months_ahead integer DEFAULT 3)
+RETURNS SETOF text AS $$
+DECLARE
+    v_table text;
+    v_name text;
+    v_next timestamp;
+    v_until timestamp := date_trunc('month', now() AT TIME ZONE 'UTC') + make_interval(months => p_months_ahead + 1);
+BEGIN
+    FOREACH v_table IN ARRAY ARRAY['profile_operations', 'notification_events', 'audit_log'] LOOP
+        SELECT max(log_partition_upper_bound(i.inhrelid)) AT TIME ZONE 'UTC' INTO v_next
+        FROM pg_inherits i
+        WHERE i.inhparent = v_table::regclass;
+        v_next := coalesce(v_next, date_trunc('month', now() AT TIME ZONE 'UTC'));
+
+        WHILE v_next < v_until LOOP
+            v_name := format('%s_p%s', v_table, to_char(v_next, 'YYYYMM'));
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+                v_name, v_table,
+                v_next AT TIME ZONE 'UTC', (v_next + interval '1 month') AT TIME ZONE 'UTC'
+            );
+            RETURN NEXT v_name;
+            v_next := v_next + interval '1 month';
+        END LOOP;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Retention job: detach partitions whose whole range is older than p_retention
+-- and move them to the log_archive schema (or drop them). notification_events
+-- partitions that still hold pending deliveries are left attached.
+CREATE OR REPLACE FUNCTION archive_log_partitions(p_table text,
+                                                  p_retention interval,
+                                                  p_drop boolean DEFAULT false)
+RETURNS SETOF text AS $$
+DECLARE
+    v_partition regclass;
+    v_pending boolean;
+BEGIN
+    FOR v_partition IN
+        SELECT i.inhrelid::regclass
+        FROM pg_inherits i
+        WHERE i.inhparent = p_table::regclass
+          AND log_partition_upper_bound(i.inhrelid) <= now() - p_retention
+        ORDER BY log_partition_upper_bound(i.inhrelid)
+    LOOP
+        IF p_table = 'notification_events' THEN
+            EXECUTE format('SELECT EXISTS (SELECT 1 FROM %s WHERE delivery_status = ''pending'')', v_partition)
+            INTO v_pending;
+            CONTINUE WHEN v_pending;
+        END IF;
+
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %s', p_table, v_partition);
+        IF p_drop THEN
+            EXECUTE format('DROP TABLE %s', v_partition);
+        ELSE
+            EXECUTE format('ALTER TABLE %s SET SCHEMA log_archive', v_partition);
+        END IF;
+        RETURN NEXT v_partition::text;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rebuild one log table as a partitioned parent with the old table attached
+CREATE FUNCTION pg_temp.partition_log_table(p_table text, p_unique_column text)
+RETURNS void AS $$
+DECLARE
+    v_legacy text := p_table || '_legacy';
+    v_bound timestamptz := (date_trunc('month', now() AT TIME ZONE 'UTC') + interval '1 month') AT TIME ZONE 'UTC';
+    v_index record;
+BEGIN
+    EXECUTE format('ALTER TABLE %I RENAME TO %I', p_table, v_legacy);
+    FOR v_index IN SELECT indexname FROM pg_indexes WHERE schemaname = 'public' AND tablename = v_legacy LOOP
+        EXECUTE format('ALTER INDEX %I RENAME TO %I', v_index.indexname, v_index.indexname || '_legacy');
+    END LOOP;
+
+    EXECUTE format('UPDATE %I SET created_at = now() WHERE created_at IS NULL', v_legacy);
+    EXECUTE format('ALTER TABLE %I ALTER COLUMN created_at SET NOT NULL', v_legacy);
+
+    EXECUTE format(
+        'CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS) PARTITION BY RANGE (created_at)',
+        p_table, v_legacy
+    );
+    EXECUTE format('ALTER TABLE %I ADD PRIMARY KEY (id, created_at)', p_table);
+    IF p_unique_column IS NOT NULL THEN
+        EXECUTE format('ALTER TABLE %I ADD CONSTRAINT %I UNIQUE (%I, created_at)',
+                       p_table, p_table || '_' || p_unique_column || '_key', p_unique_column);
+    END IF;
+
+    -- A validated bound check lets ATTACH skip its own scan of the legacy rows
+    EXECUTE format('ALTER TABLE %I ADD CONSTRAINT legacy_partition_bound CHECK (created_at < %L) NOT VALID',
+                   v_legacy, v_bound);
+    EXECUTE format('ALTER TABLE %I VALIDATE CONSTRAINT legacy_partition_bound', v_legacy);
+    EXECUTE format('ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (MINVALUE) TO (%L)',
+                   p_table, v_legacy, v_bound);
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT legacy_partition_bound', v_legacy);
+
+    EXECUTE format('GRANT ALL PRIVILEGES ON %I TO esim_admin', p_table);
+    EXECUTE format('GRANT SELECT, INSERT, UPDATE ON %I TO esim_operator', p_table);
+    EXECUTE format('GRANT SELECT ON %I TO esim_readonly', p_table);
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT pg_temp.partition_log_table('profile_operations', 'operation_id');
+SELECT pg_temp.partition_log_table('notification_events', 'event_id');
+SELECT pg_temp.partition_log_table('audit_log', NULL);
+
+ALTER TABLE profile_operations
+    ADD CONSTRAINT profile_operations_mno_id_fkey FOREIGN KEY (mno_id) REFERENCES mobile_network_operators(id);
+
+-- Secondary indexes on the parents; the identical legacy indexes are attached
+-- rather than rebuilt
+CREATE INDEX idx_profile_operations_eid ON profile_operations (eid);
+CREATE INDEX idx_profile_operations_created ON profile_operations (created_at);
+CREATE INDEX idx_notification_events_eid ON notification_events (eid);
+CREATE INDEX idx_audit_log_created ON audit_log (created_at);
+CREATE INDEX idx_audit_log_user ON audit_log (user_id);
+
+-- Status indexes only need the small unfinished subset
+CREATE INDEX idx_profile_operations_open
+    ON profile_operations (operation_status)
+    WHERE operation_status IN ('pending', 'in_progress');
+DROP INDEX idx_profile_operations_status_legacy;
+
+-- Pending-retry index: the dispatcher's resume scan only touches undelivered events
+CREATE INDEX idx_notification_events_pending_retry
+    ON notification_events (next_retry_at NULLS FIRST, created_at)
+    WHERE delivery_status = 'pending';
+DROP INDEX idx_notification_events_status_legacy;
+
+ALTER TABLE profile_operations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE notification_events ENABLE ROW LEVEL SECURITY;
+
+SELECT create_log_partitions(3);
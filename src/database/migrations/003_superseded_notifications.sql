@@ -0,0 +1,11 @@
+-- Notification events replaced by a later state change before delivery are
+-- recorded with delivery_status 'superseded' rather than 'delivered'.
+--
+-- Re-adding the check validates every notification_events partition.
+
+ALTER TABLE notification_events DROP CONSTRAINT notification_events_delivery_status_check;
+-- The legacy partition attached by 002 keeps its own copy of the original check
+ALTER TABLE IF EXISTS notification_events_legacy
+    DROP CONSTRAINT IF EXISTS notification_events_delivery_status_check;
+ALTER TABLE notification_events ADD CONSTRAINT notification_events_delivery_status_check
+    CHECK (delivery_status IN ('pending', 'sent', 'delivered', 'failed', 'superseded'));
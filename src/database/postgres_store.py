@@ -0,0 +1,372 @@
+"""
+PostgreSQL Profile Store
+asyncpg-backed ProfileStore over src/database/schema.sql
+"""
+
+import functools
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+import asyncpg
+from src.core.esim_manager import UNLOADED, ESIMProfile, EUICCInfo, ProfileDetails, ProfileState
+from src.core.notifications import NotificationEvent
+from src.core.profile_store import PROFILE_COLUMNS, PROFILE_SUMMARY_COLUMNS, ProfileKey, ProfileStore
+from src.database.migrate import pending_migrations
+
+_SELECT_PROFILE = f"SELECT eid, {', '.join(PROFILE_COLUMNS)} FROM esim_profiles"
+_SELECT_PROFILE_SUMMARY = f"SELECT eid, {', '.join(PROFILE_SUMMARY_COLUMNS)} FROM esim_profiles"
+
+_NOTIFICATION_COLUMNS = (
+    "event_id", "eid", "iccid", "event_type", "event_data", "notification_address",
+    "delivery_status", "retry_count", "max_retries", "next_retry_at", "delivered_at", "created_at"
+)
+
+# Hot-path statements, prepared once on every pooled connection
+_HOT_STATEMENTS = {
+    "get_profile": f"{_SELECT_PROFILE_SUMMARY} WHERE eid = $1 AND iccid = $2",
+    "get_enabled_profile": f"{_SELECT_PROFILE_SUMMARY} WHERE eid = $1 AND profile_state = 'enabled' LIMIT 1",
+    "profile_details": (
+        "SELECT icon, notification_configuration_info FROM esim_profiles WHERE eid = $1 AND iccid = $2"
+    ),
+    "profiles_by_eid": f"{_SELECT_PROFILE} WHERE eid = $1 ORDER BY iccid",
+    "update_state": """
+        WITH previous AS (
+            SELECT id, profile_state FROM esim_profiles
+            WHERE eid = $1 AND iccid = $2
+            FOR UPDATE
+        )
+        UPDATE esim_profiles p SET
+            profile_state = $3::varchar,
+            activation_date = CASE WHEN $3::varchar = 'enabled' THEN NOW() ELSE p.activation_date END,
+            deactivation_date = CASE WHEN $3::varchar = 'disabled' THEN NOW() ELSE p.deactivation_date END,
+            deletion_date = CASE WHEN $3::varchar = 'deleted' THEN NOW() ELSE p.deletion_date END
+        FROM previous
+        WHERE p.id = previous.id
+        RETURNING previous.profile_state
+    """,
+    "page_by_eid": f"{_SELECT_PROFILE} WHERE eid = $1 AND iccid > $2 ORDER BY iccid LIMIT $3",
+    "page_by_eid_state": (
+        f"{_SELECT_PROFILE} WHERE eid = $1 AND profile_state = $2 AND iccid > $3 "
+        "ORDER BY iccid LIMIT $4"
+    ),
+    "page_by_state": (
+        f"{_SELECT_PROFILE} WHERE profile_state = $1 AND (eid, iccid) > ($2, $3) "
+        "ORDER BY eid, iccid LIMIT $4"
+    ),
+    "page_all": f"{_SELECT_PROFILE} WHERE (eid, iccid) > ($1, $2) ORDER BY eid, iccid LIMIT $3",
+}
+
+# Returns the state the profile had before the upsert (NULL when inserted)
+_UPSERT_PROFILE = f"""
+    WITH previous AS (
+        SELECT profile_state FROM esim_profiles WHERE eid = $1 AND iccid = $2
+    )
+    INSERT INTO esim_profiles (eid, {', '.join(PROFILE_COLUMNS)})
+    VALUES ({', '.join(f'${i}' for i in range(1, len(PROFILE_COLUMNS) + 2))})
+    ON CONFLICT (eid, iccid) DO UPDATE SET
+    {', '.join(f'{c} = EXCLUDED.{c}' for c in PROFILE_COLUMNS if c not in ('iccid', 'created_at'))}
+    RETURNING (SELECT profile_state FROM previous)
+"""
+
+class PostgresProfileStore(ProfileStore):
+    """
+    PostgreSQL profile store on an asyncpg connection pool
+    Hot lookups, state updates and keyset pages use statements prepared once
+    per pooled connection; everything else goes through asyncpg's statement
+    cache. JSONB columns are decoded to dicts and timestamps are exchanged as
+    naive UTC datetimes, matching the rest of the manager. The write paths
+    rely on keys added by src/database/migrations, so initialize() refuses a
+    database that has not had every migration applied.
+    """
+    
+    def __init__(self,
+                 dsn: str,
+                 min_size: int = 5,
+                 max_size: int = 20,
+                 command_timeout: float = 10.0):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self.logger = logging.getLogger(__name__)
+        self.pool: Optional[asyncpg.Pool] = None
+        self._statements: Dict[int, Dict[str, asyncpg.prepared_stmt.PreparedStatement]] = {}
+    
+    async def initialize(self):
+        self.pool = await asyncpg.create_pool(
+            self.dsn,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            command_timeout=self.command_timeout,
+            init=self._init_connection
+        )
+        async with self.pool.acquire() as conn:
+            pending = await pending_migrations(conn)
+        if pending:
+            await self.close()
+            raise RuntimeError(
+                f"Database schema is missing migrations {', '.join(pending)}; "
+                f"apply them with: python -m src.database.migrate upgrade"
+            )
+    
+    async def close(self):
+        if self.pool:
+            await self.pool.close()
+            self.pool = None
+        self._statements.clear()
+    
+    async def list_revoked_token_hashes(self) -> Set[str]:
+        rows = await self.pool.fetch(
+            "SELECT token_hash FROM api_tokens "
+            "WHERE NOT is_active OR (expires_at IS NOT NULL AND expires_at <= NOW())"
+        )
+        return {row['token_hash'] for row in rows}
+    
+    async def list_client_rate_limits(self) -> Dict[str, int]:
+        rows = await self.pool.fetch(
+            "SELECT client_id, MAX(rate_limit_per_hour) AS rate_limit FROM api_tokens "
+            "WHERE is_active AND (expires_at IS NULL OR expires_at > NOW()) "
+            "AND rate_limit_per_hour IS NOT NULL GROUP BY client_id"
+        )
+        return {row['client_id']: row['rate_limit'] for row in rows}
+    
+    async def save_notification_event(self, event: NotificationEvent):
+        await self.pool.execute(
+            f"INSERT INTO notification_events ({', '.join(_NOTIFICATION_COLUMNS)}) "
+            f"VALUES ({', '.join(f'${i}' for i in range(1, len(_NOTIFICATION_COLUMNS) + 1))}) "
+            "ON CONFLICT (event_id, created_at) DO NOTHING",
+            event.event_id, event.eid, event.iccid, event.event_type, event.event_data,
+            event.notification_address, event.delivery_status, event.retry_count,
+            event.max_retries, _utc(event.next_retry_at), _utc(event.delivered_at),
+            _utc(event.created_at)
+        )
+    
+    async def update_notification_event(self, event: NotificationEvent):
+        await self.pool.execute(
+            "UPDATE notification_events SET delivery_status = $2, retry_count = $3, "
+            "next_retry_at = $4, delivered_at = $5 WHERE event_id = $1 AND created_at = $6",
+            event.event_id, event.delivery_status, event.retry_count,
+            _utc(event.next_retry_at), _utc(event.delivered_at), _utc(event.created_at)
+        )
+    
+    async def list_pending_notifications(self) -> List[NotificationEvent]:
+        rows = await self.pool.fetch(
+            f"SELECT {', '.join(_NOTIFICATION_COLUMNS)} FROM notification_events "
+            "WHERE delivery_status = 'pending' ORDER BY created_at"
+        )
+        return [
+            NotificationEvent(**{
+                **dict(row),
+                'next_retry_at': _naive(row['next_retry_at']),
+                'delivered_at': _naive(row['delivered_at']),
+                'created_at': _naive(row['created_at'])
+            })
+            for row in rows
+        ]
+    
+    async def insert_profile_operations(self, rows: List[Dict[str, Any]]):
+        # created_at is the partition key; taking it from the row keeps replays idempotent
+        await self.pool.executemany(
+            "INSERT INTO profile_operations (operation_id, eid, iccid, operation_type, "
+            "operation_status, operation_result, error_message, initiated_by, started_at, "
+            "completed_at, created_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $10) "
+            "ON CONFLICT (operation_id, created_at) DO NOTHING",
+            [
+                (row['operation_id'], row['eid'], row['iccid'], row['operation_type'],
+                 row['operation_status'], row['operation_result'], row['error_message'],
+                 row['initiated_by'], _parse_timestamp(row['started_at']),
+                 _parse_timestamp(row['completed_at']))
+                for row in rows
+            ]
+        )
+    
+    async def insert_audit_records(self, rows: List[Dict[str, Any]]):
+        await self.pool.executemany(
+            "INSERT INTO audit_log (id, client_id, action, resource_type, resource_id, "
+            "new_values, success, error_message, created_at) "
+            "VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9) "
+            "ON CONFLICT (id, created_at) DO NOTHING",
+            [
+                (row['id'], row['client_id'], row['action'], row['resource_type'],
+                 row['resource_id'], row['new_values'], row['success'], row['error_message'],
+                 _parse_timestamp(row['created_at']))
+                for row in rows
+            ]
+        )
+    
+    async def get_euicc_info(self, eid: str) -> Optional[EUICCInfo]:
+        row = await self.pool.fetchrow(
+            "SELECT eid, euicc_info2, euicc_configured_addresses, default_dp_address, root_ds_address "
+            "FROM euicc_info WHERE eid = $1",
+            eid
+        )
+        if row is None:
+            return None
+        return EUICCInfo(
+            eid=row['eid'],
+            euicc_info2=row['euicc_info2'],
+            euicc_configured_addresses=list(row['euicc_configured_addresses'] or []),
+            default_dp_address=row['default_dp_address'],
+            root_ds_address=row['root_ds_address']
+        )
+    
+    async def put_euicc_info(self, info: EUICCInfo):
+        await self.pool.execute(
+            "INSERT INTO euicc_info (eid, euicc_info2, euicc_configured_addresses, "
+            "default_dp_address, root_ds_address) VALUES ($1, $2, $3, $4, $5) "
+            "ON CONFLICT (eid) DO UPDATE SET euicc_info2 = EXCLUDED.euicc_info2, "
+            "euicc_configured_addresses = EXCLUDED.euicc_configured_addresses, "
+            "default_dp_address = EXCLUDED.default_dp_address, "
+            "root_ds_address = EXCLUDED.root_ds_address",
+            info.eid, info.euicc_info2, info.euicc_configured_addresses,
+            info.default_dp_address, info.root_ds_address
+        )
+    
+    # Single-profile lookups feed the manager's cache; their details load on demand
+    async def get_profile(self, eid: str, iccid: str) -> Optional[ESIMProfile]:
+        rows = await self._fetch_prepared("get_profile", eid, iccid)
+        return self._row_to_summary(rows[0]) if rows else None
+    
+    async def get_enabled_profile(self, eid: str) -> Optional[ESIMProfile]:
+        rows = await self._fetch_prepared("get_enabled_profile", eid)
+        return self._row_to_summary(rows[0]) if rows else None
+    
+    async def get_profile_details(self, eid: str, iccid: str) -> Optional[ProfileDetails]:
+        rows = await self._fetch_prepared("profile_details", eid, iccid)
+        if not rows:
+            return None
+        return rows[0]['icon'], rows[0]['notification_configuration_info'] or {}
+    
+    async def get_profiles_by_eid(self, eid: str) -> List[ESIMProfile]:
+        return [_row_to_profile(row) for row in await self._fetch_prepared("profiles_by_eid", eid)]
+    
+    async def get_profiles_by_iccid(self, iccid: str) -> List[Tuple[str, ESIMProfile]]:
+        rows = await self.pool.fetch(f"{_SELECT_PROFILE} WHERE iccid = $1 ORDER BY eid", iccid)
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def list_profiles(self,
+                            eid: Optional[str] = None,
+                            state: Optional[ProfileState] = None) -> List[Tuple[str, ESIMProfile]]:
+        if eid is not None and state is None:
+            rows = await self._fetch_prepared("profiles_by_eid", eid)
+        else:
+            conditions, args = [], []
+            if eid is not None:
+                args.append(eid)
+                conditions.append(f"eid = ${len(args)}")
+            if state is not None:
+                args.append(state.value)
+                conditions.append(f"profile_state = ${len(args)}")
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            rows = await self.pool.fetch(f"{_SELECT_PROFILE}{where} ORDER BY eid, iccid", *args)
+        
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def list_profiles_page(self,
+                                 eid: Optional[str] = None,
+                                 state: Optional[ProfileState] = None,
+                                 after: Optional[ProfileKey] = None,
+                                 limit: int = 100) -> List[Tuple[str, ESIMProfile]]:
+        if eid is not None:
+            if after is not None and after[0] > eid:
+                return []
+            after_iccid = after[1] if after is not None and after[0] == eid else ""
+            if state is not None:
+                rows = await self._fetch_prepared("page_by_eid_state", eid, state.value, after_iccid, limit)
+            else:
+                rows = await self._fetch_prepared("page_by_eid", eid, after_iccid, limit)
+        else:
+            after_eid, after_iccid = after or ("", "")
+            if state is not None:
+                rows = await self._fetch_prepared("page_by_state", state.value, after_eid, after_iccid, limit)
+            else:
+                rows = await self._fetch_prepared("page_all", after_eid, after_iccid, limit)
+        
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def store_profile(self, eid: str, profile: ESIMProfile) -> Optional[ProfileState]:
+        try:
+            previous_state = await self.pool.fetchval(
+                _UPSERT_PROFILE,
+                eid, profile.iccid, profile.isdp_aid, profile.profile_state.value,
+                profile.profile_nickname, profile.service_provider_name, profile.profile_name,
+                profile.icon_type, profile.icon, profile.profile_class,
+                profile.notification_configuration_info, profile.profile_owner, profile.dp_aid,
+                _utc(profile.created_at), _utc(profile.updated_at)
+            )
+        except asyncpg.UniqueViolationError as e:
+            raise ValueError(f"eUICC {eid} already has an enabled profile") from e
+        return ProfileState(previous_state) if previous_state else None
+    
+    async def count_profiles_by_group(self) -> Dict[Tuple[str, str, str], int]:
+        rows = await self.pool.fetch(
+            "SELECT profile_state, service_provider_name, profile_class, COUNT(*) AS profiles "
+            "FROM esim_profiles GROUP BY profile_state, service_provider_name, profile_class"
+        )
+        return {
+            (row['profile_state'], row['service_provider_name'] or '', row['profile_class'] or ''): row['profiles']
+            for row in rows
+        }
+    
+    async def update_profile_state(self,
+                                   eid: str,
+                                   iccid: str,
+                                   state: ProfileState) -> Optional[ProfileState]:
+        try:
+            rows = await self._fetch_prepared("update_state", eid, iccid, state.value)
+        except asyncpg.UniqueViolationError as e:
+            raise ValueError(f"eUICC {eid} already has an enabled profile") from e
+        return ProfileState(rows[0]['profile_state']) if rows else None
+    
+    def _row_to_summary(self, row: asyncpg.Record) -> ESIMProfile:
+        return _row_to_profile(row, functools.partial(self.get_profile_details, row['eid'], row['iccid']))
+    
+    async def _init_connection(self, conn: asyncpg.Connection):
+        """Pool init hook: register codecs and prepare the hot statements"""
+        await conn.set_type_codec('jsonb', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+        pid = conn.get_server_pid()
+        self._statements[pid] = {
+            name: await conn.prepare(query) for name, query in _HOT_STATEMENTS.items()
+        }
+        conn.add_termination_listener(lambda _: self._statements.pop(pid, None))
+    
+    async def _fetch_prepared(self, name: str, *args) -> List[asyncpg.Record]:
+        async with self.pool.acquire() as conn:
+            return await self._statements[conn.get_server_pid()][name].fetch(*args)
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.replace(tzinfo=timezone.utc)
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    return _utc(datetime.fromisoformat(value)) if value else None
+
+def _row_to_profile(row: asyncpg.Record, details_loader=None) -> ESIMProfile:
+    """Full row, or a summary row whose details come from details_loader"""
+    return ESIMProfile(
+        iccid=row['iccid'],
+        isdp_aid=row['isdp_aid'],
+        profile_state=ProfileState(row['profile_state']),
+        profile_nickname=row['profile_nickname'],
+        service_provider_name=row['service_provider_name'],
+        profile_name=row['profile_name'],
+        icon_type=row['icon_type'],
+        icon=row['icon'] if details_loader is None else UNLOADED,
+        profile_class=row['profile_class'],
+        notification_configuration_info=(
+            row['notification_configuration_info'] or {} if details_loader is None else UNLOADED
+        ),
+        profile_owner=row['profile_owner'],
+        dp_aid=row['dp_aid'],
+        created_at=_naive(row['created_at']),
+        updated_at=_naive(row['updated_at']),
+        details_loader=details_loader
+    )
@@ -1,5 +1,8 @@
 -- eSIM Manager Database Schema
 -- PostgreSQL implementation for production-ready eSIM platform
+-- Base schema only: apply src/database/migrations on top with
+--   python -m src.database.migrate upgrade
+-- PostgresProfileStore refuses to start until every migration is applied.
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "uuid-ossp";
@@ -108,7 +111,7 @@ CREATE TABLE notification_events (
     event_type VARCHAR(30) NOT NULL,
     event_data JSONB NOT NULL,
     notification_address VARCHAR(255),
-    delivery_status VARCHAR(20) DEFAULT 'pending' CHECK (delivery_status IN ('pending', 'sent', 'delivered', 'failed')),
+    delivery_status VARCHAR(20) DEFAULT 'pending' CHECK (delivery_status IN ('pending', 'sent', 'delivered', 'failed', 'superseded')),
     retry_count INTEGER DEFAULT 0,
     max_retries INTEGER DEFAULT 3,
     next_retry_at TIMESTAMP WITH TIME ZONE,
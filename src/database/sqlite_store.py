@@ -0,0 +1,429 @@
+"""
+SQLite Profile Store
+Embedded aiosqlite-backed ProfileStore for local runs and benchmarks
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import sqlite3
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+import aiosqlite
+from src.core.esim_manager import UNLOADED, ESIMProfile, EUICCInfo, ProfileDetails, ProfileState
+from src.core.notifications import NotificationEvent
+from src.core.profile_store import PROFILE_COLUMNS, PROFILE_SUMMARY_COLUMNS, ProfileKey, ProfileStore
+
+# SQLite rendition of the tables in schema.sql that the store touches
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS euicc_info (
+    eid TEXT PRIMARY KEY,
+    euicc_info2 TEXT NOT NULL,
+    euicc_configured_addresses TEXT,
+    default_dp_address TEXT,
+    root_ds_address TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS esim_profiles (
+    eid TEXT NOT NULL,
+    iccid TEXT NOT NULL,
+    isdp_aid TEXT NOT NULL,
+    profile_state TEXT NOT NULL CHECK (profile_state IN ('disabled', 'enabled', 'deleted')),
+    profile_nickname TEXT,
+    service_provider_name TEXT NOT NULL,
+    profile_name TEXT NOT NULL,
+    icon_type TEXT,
+    icon BLOB,
+    profile_class TEXT NOT NULL,
+    notification_configuration_info TEXT,
+    profile_owner TEXT,
+    dp_aid TEXT,
+    activation_date TEXT,
+    deactivation_date TEXT,
+    deletion_date TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    PRIMARY KEY (eid, iccid)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_esim_profiles_iccid ON esim_profiles(iccid);
+CREATE INDEX IF NOT EXISTS idx_esim_profiles_state ON esim_profiles(profile_state, eid, iccid);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_esim_profiles_one_enabled
+    ON esim_profiles(eid) WHERE profile_state = 'enabled';
+
+CREATE TABLE IF NOT EXISTS profile_operations (
+    operation_id TEXT PRIMARY KEY,
+    eid TEXT NOT NULL,
+    iccid TEXT,
+    operation_type TEXT NOT NULL,
+    operation_status TEXT NOT NULL,
+    operation_result TEXT,
+    error_message TEXT,
+    initiated_by TEXT,
+    started_at TEXT,
+    completed_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS notification_events (
+    event_id TEXT PRIMARY KEY,
+    eid TEXT NOT NULL,
+    iccid TEXT,
+    event_type TEXT NOT NULL,
+    event_data TEXT NOT NULL,
+    notification_address TEXT,
+    delivery_status TEXT NOT NULL DEFAULT 'pending',
+    retry_count INTEGER NOT NULL DEFAULT 0,
+    max_retries INTEGER NOT NULL DEFAULT 3,
+    next_retry_at TEXT,
+    delivered_at TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_notification_events_pending
+    ON notification_events(delivery_status, created_at);
+
+CREATE TABLE IF NOT EXISTS api_tokens (
+    token_hash TEXT PRIMARY KEY,
+    client_id TEXT NOT NULL,
+    client_name TEXT NOT NULL,
+    scopes TEXT NOT NULL,
+    rate_limit_per_hour INTEGER DEFAULT 1000,
+    is_active INTEGER DEFAULT 1,
+    expires_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS audit_log (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    client_id TEXT,
+    action TEXT NOT NULL,
+    resource_type TEXT NOT NULL,
+    resource_id TEXT,
+    new_values TEXT,
+    success INTEGER NOT NULL,
+    error_message TEXT,
+    created_at TEXT NOT NULL
+);
+"""
+
+_SELECT_PROFILE = f"SELECT eid, {', '.join(PROFILE_COLUMNS)} FROM esim_profiles"
+_SELECT_PROFILE_SUMMARY = f"SELECT eid, {', '.join(PROFILE_SUMMARY_COLUMNS)} FROM esim_profiles"
+
+_NOTIFICATION_COLUMNS = (
+    "event_id", "eid", "iccid", "event_type", "event_data", "notification_address",
+    "delivery_status", "retry_count", "max_retries", "next_retry_at", "delivered_at", "created_at"
+)
+
+_UPSERT_PROFILE = f"""
+    INSERT INTO esim_profiles (eid, {', '.join(PROFILE_COLUMNS)})
+    VALUES ({', '.join('?' for _ in range(len(PROFILE_COLUMNS) + 1))})
+    ON CONFLICT (eid, iccid) DO UPDATE SET
+    {', '.join(f'{c} = excluded.{c}' for c in PROFILE_COLUMNS if c not in ('iccid', 'created_at'))}
+"""
+
+_STATE_DATE_COLUMNS = {
+    ProfileState.ENABLED: "activation_date",
+    ProfileState.DISABLED: "deactivation_date",
+    ProfileState.DELETED: "deletion_date",
+}
+
+class SQLiteProfileStore(ProfileStore):
+    """
+    Embedded SQLite profile store
+    A single WAL-mode connection serves every query; sqlite3's per-connection
+    statement cache keeps the fixed query texts compiled, so hot lookups are
+    prepared once. Read-modify-write sequences are serialised with a lock.
+    Intended for development and benchmarking without external services.
+    """
+    
+    def __init__(self, path: str = "esim.db"):
+        self.path = path
+        self.logger = logging.getLogger(__name__)
+        self.conn: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+    
+    async def initialize(self):
+        self.conn = await aiosqlite.connect(self.path, cached_statements=256)
+        self.conn.row_factory = sqlite3.Row
+        await self.conn.execute("PRAGMA journal_mode=WAL")
+        await self.conn.execute("PRAGMA synchronous=NORMAL")
+        await self.conn.executescript(_SCHEMA)
+        await self.conn.commit()
+    
+    async def close(self):
+        if self.conn:
+            await self.conn.close()
+            self.conn = None
+    
+    async def list_revoked_token_hashes(self) -> Set[str]:
+        rows = await self.conn.execute_fetchall(
+            "SELECT token_hash FROM api_tokens WHERE NOT is_active OR (expires_at IS NOT NULL AND expires_at <= ?)",
+            (datetime.utcnow().isoformat(),)
+        )
+        return {row['token_hash'] for row in rows}
+    
+    async def list_client_rate_limits(self) -> Dict[str, int]:
+        rows = await self.conn.execute_fetchall(
+            "SELECT client_id, MAX(rate_limit_per_hour) AS rate_limit FROM api_tokens "
+            "WHERE is_active AND (expires_at IS NULL OR expires_at > ?) "
+            "AND rate_limit_per_hour IS NOT NULL GROUP BY client_id",
+            (datetime.utcnow().isoformat(),)
+        )
+        return {row['client_id']: row['rate_limit'] for row in rows}
+    
+    async def save_notification_event(self, event: NotificationEvent):
+        await self._write(
+            f"INSERT OR IGNORE INTO notification_events ({', '.join(_NOTIFICATION_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in _NOTIFICATION_COLUMNS)})",
+            (event.event_id, event.eid, event.iccid, event.event_type, json.dumps(event.event_data),
+             event.notification_address, event.delivery_status, event.retry_count, event.max_retries,
+             _isoformat(event.next_retry_at), _isoformat(event.delivered_at), _isoformat(event.created_at))
+        )
+    
+    async def update_notification_event(self, event: NotificationEvent):
+        await self._write(
+            "UPDATE notification_events SET delivery_status = ?, retry_count = ?, "
+            "next_retry_at = ?, delivered_at = ? WHERE event_id = ?",
+            (event.delivery_status, event.retry_count, _isoformat(event.next_retry_at),
+             _isoformat(event.delivered_at), event.event_id)
+        )
+    
+    async def list_pending_notifications(self) -> List[NotificationEvent]:
+        rows = await self.conn.execute_fetchall(
+            f"SELECT {', '.join(_NOTIFICATION_COLUMNS)} FROM notification_events "
+            "WHERE delivery_status = 'pending' ORDER BY created_at"
+        )
+        return [
+            NotificationEvent(**{
+                **dict(row),
+                'event_data': json.loads(row['event_data']),
+                'next_retry_at': _parse(row['next_retry_at']),
+                'delivered_at': _parse(row['delivered_at']),
+                'created_at': _parse(row['created_at'])
+            })
+            for row in rows
+        ]
+    
+    async def insert_profile_operations(self, rows: List[Dict[str, Any]]):
+        async with self._write_lock:
+            await self.conn.executemany(
+                "INSERT OR IGNORE INTO profile_operations (operation_id, eid, iccid, operation_type, "
+                "operation_status, operation_result, error_message, initiated_by, started_at, completed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row['operation_id'], row['eid'], row['iccid'], row['operation_type'],
+                     row['operation_status'], json.dumps(row['operation_result']), row['error_message'],
+                     row['initiated_by'], row['started_at'], row['completed_at'])
+                    for row in rows
+                ]
+            )
+            await self.conn.commit()
+    
+    async def insert_audit_records(self, rows: List[Dict[str, Any]]):
+        async with self._write_lock:
+            await self.conn.executemany(
+                "INSERT OR IGNORE INTO audit_log (id, client_id, action, resource_type, resource_id, "
+                "new_values, success, error_message, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row['id'], row['client_id'], row['action'], row['resource_type'],
+                     row['resource_id'], json.dumps(row['new_values']), row['success'],
+                     row['error_message'], row['created_at'])
+                    for row in rows
+                ]
+            )
+            await self.conn.commit()
+    
+    async def get_euicc_info(self, eid: str) -> Optional[EUICCInfo]:
+        rows = await self.conn.execute_fetchall(
+            "SELECT eid, euicc_info2, euicc_configured_addresses, default_dp_address, root_ds_address "
+            "FROM euicc_info WHERE eid = ?",
+            (eid,)
+        )
+        if not rows:
+            return None
+        row = rows[0]
+        return EUICCInfo(
+            eid=row['eid'],
+            euicc_info2=json.loads(row['euicc_info2']),
+            euicc_configured_addresses=json.loads(row['euicc_configured_addresses'] or "[]"),
+            default_dp_address=row['default_dp_address'],
+            root_ds_address=row['root_ds_address']
+        )
+    
+    async def put_euicc_info(self, info: EUICCInfo):
+        await self._write(
+            "INSERT INTO euicc_info (eid, euicc_info2, euicc_configured_addresses, default_dp_address, "
+            "root_ds_address) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (eid) DO UPDATE SET euicc_info2 = excluded.euicc_info2, "
+            "euicc_configured_addresses = excluded.euicc_configured_addresses, "
+            "default_dp_address = excluded.default_dp_address, root_ds_address = excluded.root_ds_address",
+            (info.eid, json.dumps(info.euicc_info2), json.dumps(info.euicc_configured_addresses),
+             info.default_dp_address, info.root_ds_address)
+        )
+    
+    # Single-profile lookups feed the manager's cache; their details load on demand
+    async def get_profile(self, eid: str, iccid: str) -> Optional[ESIMProfile]:
+        rows = await self.conn.execute_fetchall(
+            f"{_SELECT_PROFILE_SUMMARY} WHERE eid = ? AND iccid = ?", (eid, iccid)
+        )
+        return self._row_to_summary(rows[0]) if rows else None
+    
+    async def get_enabled_profile(self, eid: str) -> Optional[ESIMProfile]:
+        rows = await self.conn.execute_fetchall(
+            f"{_SELECT_PROFILE_SUMMARY} WHERE eid = ? AND profile_state = 'enabled'", (eid,)
+        )
+        return self._row_to_summary(rows[0]) if rows else None
+    
+    async def get_profile_details(self, eid: str, iccid: str) -> Optional[ProfileDetails]:
+        rows = await self.conn.execute_fetchall(
+            "SELECT icon, notification_configuration_info FROM esim_profiles WHERE eid = ? AND iccid = ?",
+            (eid, iccid)
+        )
+        if not rows:
+            return None
+        return rows[0]['icon'], json.loads(rows[0]['notification_configuration_info'] or "{}")
+    
+    async def get_profiles_by_eid(self, eid: str) -> List[ESIMProfile]:
+        rows = await self.conn.execute_fetchall(f"{_SELECT_PROFILE} WHERE eid = ? ORDER BY iccid", (eid,))
+        return [_row_to_profile(row) for row in rows]
+    
+    async def get_profiles_by_iccid(self, iccid: str) -> List[Tuple[str, ESIMProfile]]:
+        rows = await self.conn.execute_fetchall(f"{_SELECT_PROFILE} WHERE iccid = ? ORDER BY eid", (iccid,))
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def list_profiles(self,
+                            eid: Optional[str] = None,
+                            state: Optional[ProfileState] = None) -> List[Tuple[str, ESIMProfile]]:
+        conditions, args = [], []
+        if eid is not None:
+            conditions.append("eid = ?")
+            args.append(eid)
+        if state is not None:
+            conditions.append("profile_state = ?")
+            args.append(state.value)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        
+        rows = await self.conn.execute_fetchall(f"{_SELECT_PROFILE}{where} ORDER BY eid, iccid", args)
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def list_profiles_page(self,
+                                 eid: Optional[str] = None,
+                                 state: Optional[ProfileState] = None,
+                                 after: Optional[ProfileKey] = None,
+                                 limit: int = 100) -> List[Tuple[str, ESIMProfile]]:
+        if eid is not None:
+            if after is not None and after[0] > eid:
+                return []
+            after_iccid = after[1] if after is not None and after[0] == eid else ""
+            conditions, args = ["eid = ?", "iccid > ?"], [eid, after_iccid]
+        else:
+            conditions, args = ["(eid, iccid) > (?, ?)"], list(after or ("", ""))
+        if state is not None:
+            conditions.append("profile_state = ?")
+            args.append(state.value)
+        args.append(limit)
+        
+        rows = await self.conn.execute_fetchall(
+            f"{_SELECT_PROFILE} WHERE {' AND '.join(conditions)} ORDER BY eid, iccid LIMIT ?", args
+        )
+        return [(row['eid'], _row_to_profile(row)) for row in rows]
+    
+    async def store_profile(self, eid: str, profile: ESIMProfile) -> Optional[ProfileState]:
+        async with self._write_lock:
+            rows = await self.conn.execute_fetchall(
+                "SELECT profile_state FROM esim_profiles WHERE eid = ? AND iccid = ?", (eid, profile.iccid)
+            )
+            try:
+                await self.conn.execute(
+                    _UPSERT_PROFILE,
+                    (eid, profile.iccid, profile.isdp_aid, profile.profile_state.value,
+                     profile.profile_nickname, profile.service_provider_name, profile.profile_name,
+                     profile.icon_type, profile.icon, profile.profile_class,
+                     json.dumps(profile.notification_configuration_info), profile.profile_owner,
+                     profile.dp_aid, profile.created_at.isoformat(), profile.updated_at.isoformat())
+                )
+                await self.conn.commit()
+            except sqlite3.IntegrityError as e:
+                await self.conn.rollback()
+                raise ValueError(f"eUICC {eid} already has an enabled profile") from e
+            except Exception:
+                await self.conn.rollback()
+                raise
+            
+            return ProfileState(rows[0]['profile_state']) if rows else None
+    
+    async def count_profiles_by_group(self) -> Dict[Tuple[str, str, str], int]:
+        rows = await self.conn.execute_fetchall(
+            "SELECT profile_state, service_provider_name, profile_class, COUNT(*) AS profiles "
+            "FROM esim_profiles GROUP BY profile_state, service_provider_name, profile_class"
+        )
+        return {
+            (row['profile_state'], row['service_provider_name'] or '', row['profile_class'] or ''): row['profiles']
+            for row in rows
+        }
+    
+    async def update_profile_state(self,
+                                   eid: str,
+                                   iccid: str,
+                                   state: ProfileState) -> Optional[ProfileState]:
+        async with self._write_lock:
+            rows = await self.conn.execute_fetchall(
+                "SELECT profile_state FROM esim_profiles WHERE eid = ? AND iccid = ?", (eid, iccid)
+            )
+            if not rows:
+                return None
+            
+            now = datetime.utcnow().isoformat()
+            try:
+                await self.conn.execute(
+                    f"UPDATE esim_profiles SET profile_state = ?, {_STATE_DATE_COLUMNS[state]} = ?, "
+                    "updated_at = ? WHERE eid = ? AND iccid = ?",
+                    (state.value, now, now, eid, iccid)
+                )
+                await self.conn.commit()
+            except sqlite3.IntegrityError as e:
+                await self.conn.rollback()
+                raise ValueError(f"eUICC {eid} already has an enabled profile") from e
+            
+            return ProfileState(rows[0]['profile_state'])
+    
+    def _row_to_summary(self, row: sqlite3.Row) -> ESIMProfile:
+        return _row_to_profile(row, functools.partial(self.get_profile_details, row['eid'], row['iccid']))
+    
+    async def _write(self, query: str, args: Tuple):
+        async with self._write_lock:
+            try:
+                await self.conn.execute(query, args)
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+def _parse(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def _row_to_profile(row: sqlite3.Row, details_loader=None) -> ESIMProfile:
+    """Full row, or a summary row whose details come from details_loader"""
+    return ESIMProfile(
+        iccid=row['iccid'],
+        isdp_aid=row['isdp_aid'],
+        profile_state=ProfileState(row['profile_state']),
+        profile_nickname=row['profile_nickname'],
+        service_provider_name=row['service_provider_name'],
+        profile_name=row['profile_name'],
+        icon_type=row['icon_type'],
+        icon=row['icon'] if details_loader is None else UNLOADED,
+        profile_class=row['profile_class'],
+        notification_configuration_info=(
+            json.loads(row['notification_configuration_info'] or "{}") if details_loader is None else UNLOADED
+        ),
+        profile_owner=row['profile_owner'],
+        dp_aid=row['dp_aid'],
+        created_at=datetime.fromisoformat(row['created_at']),
+        updated_at=datetime.fromisoformat(row['updated_at']),
+        details_loader=details_loader
+    )
@@ -0,0 +1,96 @@
+"""
+Certificate Chain Verification Engine
+Memoizes verified issuer->subject signature edges for GSMA PKI chains
+"""
+
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes
+
+class CertificateChainVerifier:
+    """
+    Verifies certificate chains (leaf first) with a verified-edge cache
+    An edge is (issuer fingerprint, subject fingerprint) and stays cached until
+    the earlier of the two certificates' not_valid_after, so repeat verification
+    of SM-DP+/EUM/CI chains costs a fingerprint and a dictionary lookup.
+    Signatures are checked with verify_directly_issued_by, which covers RSA
+    PKCS#1 v1.5, RSA-PSS and ECDSA issuers.
+    """
+    
+    def __init__(self, max_edges: int = 10000):
+        self.max_edges = max_edges
+        self.logger = logging.getLogger(__name__)
+        self._edges: "OrderedDict[Tuple[bytes, bytes], datetime]" = OrderedDict()
+        self.edge_hits = 0
+        self.edge_misses = 0
+    
+    def verify_chain(self, cert_chain: List[x509.Certificate], now: Optional[datetime] = None) -> bool:
+        """Verify validity periods and every issuer signature in the chain"""
+        now = now or datetime.utcnow()
+        try:
+            for cert in cert_chain:
+                if now < cert.not_valid_before or now > cert.not_valid_after:
+                    return False
+            
+            fingerprints = [cert.fingerprint(hashes.SHA256()) for cert in cert_chain]
+            for i in range(len(cert_chain) - 1):
+                if not self._verify_edge(cert_chain[i], cert_chain[i + 1],
+                                         fingerprints[i], fingerprints[i + 1], now):
+                    return False
+            
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Certificate chain verification failed: {str(e)}")
+            return False
+    
+    def verify_chains(self,
+                      cert_chains: Iterable[List[x509.Certificate]],
+                      now: Optional[datetime] = None) -> List[bool]:
+        """Verify many chains; shared intermediates are verified only once"""
+        now = now or datetime.utcnow()
+        return [self.verify_chain(chain, now) for chain in cert_chains]
+    
+    def clear(self):
+        self._edges.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.edge_hits + self.edge_misses
+        return {
+            'cached_edges': len(self._edges),
+            'edge_hits': self.edge_hits,
+            'edge_misses': self.edge_misses,
+            'hit_rate': self.edge_hits / lookups if lookups else 0.0
+        }
+    
+    def _verify_edge(self,
+                     cert: x509.Certificate,
+                     issuer_cert: x509.Certificate,
+                     subject_fp: bytes,
+                     issuer_fp: bytes,
+                     now: datetime) -> bool:
+        key = (issuer_fp, subject_fp)
+        expires_at = self._edges.get(key)
+        if expires_at is not None:
+            if now <= expires_at:
+                self.edge_hits += 1
+                self._edges.move_to_end(key)
+                return True
+            del self._edges[key]
+        
+        self.edge_misses += 1
+        try:
+            cert.verify_directly_issued_by(issuer_cert)
+        except Exception as e:
+            self.logger.warning(
+                f"Certificate signature check failed for {cert.subject.rfc4514_string()}: {e!r}"
+            )
+            return False
+        
+        self._edges[key] = min(cert.not_valid_after, issuer_cert.not_valid_after)
+        if len(self._edges) > self.max_edges:
+            self._edges.popitem(last=False)
+        return True
@@ -4,16 +4,19 @@ Implements GSMA security requirements and PKI management
 """
 
 import os
+import asyncio
 import hashlib
 import hmac
-from typing import Dict, List, Optional, Tuple, Any
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Any, Callable, Iterable, Iterator
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding, ec
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from cryptography import x509
 from cryptography.x509.oid import NameOID
+from src.security.chain_verifier import CertificateChainVerifier
+from src.security.streaming_aead import DEFAULT_CHUNK_SIZE, decrypt_stream, encrypt_stream
 import base64
 import secrets
 from datetime import datetime, timedelta
@@ -30,6 +33,7 @@ class CryptoManager:
         self.logger = logging.getLogger(__name__)
         self.ca_cert = None
         self.ca_private_key = None
+        self.chain_verifier = CertificateChainVerifier(config.get('chain_cache_size', 10000))
         self._load_ca_certificates()
     
     def _load_ca_certificates(self):
@@ -129,33 +133,12 @@ class CryptoManager:
         return certificate
     
     def verify_certificate_chain(self, cert_chain: List[x509.Certificate]) -> bool:
-        """Verify certificate chain validity"""
-        try:
-            # Implement certificate chain validation
-            # Check each certificate against its issuer
-            for i in range(len(cert_chain) - 1):
-                cert = cert_chain[i]
-                issuer_cert = cert_chain[i + 1]
-                
-                # Verify signature
-                issuer_public_key = issuer_cert.public_key()
-                issuer_public_key.verify(
-                    cert.signature,
-                    cert.tbs_certificate_bytes,
-                    padding.PKCS1v15(),
-                    cert.signature_hash_algorithm
-                )
-                
-                # Check validity period
-                now = datetime.utcnow()
-                if now < cert.not_valid_before or now > cert.not_valid_after:
-                    return False
-            
-            return True
-            
-        except Exception as e:
-            self.logger.error(f"Certificate chain verification failed: {str(e)}")
-            return False
+        """Verify certificate chain validity (RSA or ECDSA issuers, memoized edges)"""
+        return self.chain_verifier.verify_chain(cert_chain)
+    
+    def verify_certificate_chains(self, cert_chains: List[List[x509.Certificate]]) -> List[bool]:
+        """Verify many certificate chains, reusing verified issuer edges"""
+        return self.chain_verifier.verify_chains(cert_chains)
     
     def encrypt_aes_gcm(self, data: bytes, key: bytes, aad: Optional[bytes] = None) -> Dict[str, bytes]:
         """Encrypt data using AES-GCM (authenticated encryption)"""
@@ -197,6 +180,21 @@ class CryptoManager:
         
         return plaintext
     
+    def encrypt_aes_gcm_stream(self,
+                               chunks: Iterable[bytes],
+                               key: bytes,
+                               aad: Optional[bytes] = None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[memoryview]:
+        """Encrypt a large payload chunk by chunk into the framed AES-GCM format"""
+        return encrypt_stream(chunks, key, aad, chunk_size)
+    
+    def decrypt_aes_gcm_stream(self,
+                               chunks: Iterable[bytes],
+                               key: bytes,
+                               aad: Optional[bytes] = None) -> Iterator[memoryview]:
+        """Decrypt a framed AES-GCM stream, yielding authenticated plaintext"""
+        return decrypt_stream(chunks, key, aad)
+    
     def sign_data(self, data: bytes, private_key: Any) -> bytes:
         """Sign data using RSA-PSS with SHA-256"""
         signature = private_key.sign(
@@ -227,13 +225,7 @@ class CryptoManager:
     
     def derive_key(self, password: bytes, salt: bytes, length: int = 32) -> bytes:
         """Derive encryption key using PBKDF2"""
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=length,
-            salt=salt,
-            iterations=100000
-        )
-        return kdf.derive(password)
+        return _pbkdf2_derive(password, salt, length)
     
     def generate_secure_random(self, length: int) -> bytes:
         """Generate cryptographically secure random bytes"""
@@ -272,6 +264,146 @@ class CryptoManager:
         except Exception:
             return False
 
+def _pbkdf2_derive(password: bytes, salt: bytes, length: int) -> bytes:
+    """
+    PBKDF2-HMAC-SHA256 key derivation (module level so process pools can run it)
+    hashlib releases the GIL while deriving, so worker threads do not stall the
+    event loop; the output is identical to PBKDF2HMAC.
+    """
+    return hashlib.pbkdf2_hmac('sha256', password, salt, 100000, dklen=length)
+
+def _generate_private_key_pem(algorithm: str, parameter: Any) -> bytes:
+    """Generate a private key in a worker process and return it as unencrypted PKCS#8 PEM"""
+    if algorithm == 'rsa':
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=parameter)
+    else:
+        private_key = ec.generate_private_key(parameter)
+    
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption()
+    )
+
+class CryptoBackpressureError(RuntimeError):
+    """Raised when a crypto operation waits too long for a worker slot"""
+
+class AsyncCryptoManager:
+    """
+    Non-blocking facade over CryptoManager
+    CPU-heavy operations run on a worker pool so they never stall the event loop.
+    With executor='process', key generation and PBKDF2 run in worker processes;
+    operations that take live key objects (signing, certificates) always use
+    threads, since key objects cannot cross process boundaries. At most
+    max_pending operations are submitted at once; further callers wait
+    (backpressure) and are counted in the queue depth.
+    """
+    
+    def __init__(self,
+                 crypto_manager: CryptoManager,
+                 executor: str = 'thread',
+                 max_workers: Optional[int] = None,
+                 max_pending: int = 64,
+                 max_wait_seconds: Optional[float] = None):
+        self.crypto_manager = crypto_manager
+        self.logger = logging.getLogger(__name__)
+        self.max_wait_seconds = max_wait_seconds
+        self._threads = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='crypto')
+        self._processes = ProcessPoolExecutor(max_workers=max_workers) if executor == 'process' else None
+        self._slots = asyncio.Semaphore(max_pending)
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+    
+    async def generate_key_pair(self, key_size: int = 2048) -> Tuple[Any, Any]:
+        """Generate RSA key pair off the event loop"""
+        if self._processes:
+            return self._load_key_pair(
+                await self._run(self._processes, _generate_private_key_pem, 'rsa', key_size)
+            )
+        return await self._run(self._threads, self.crypto_manager.generate_key_pair, key_size)
+    
+    async def generate_ecc_key_pair(self, curve=ec.SECP256R1()) -> Tuple[Any, Any]:
+        """Generate ECC key pair off the event loop"""
+        if self._processes:
+            return self._load_key_pair(
+                await self._run(self._processes, _generate_private_key_pem, 'ecc', curve)
+            )
+        return await self._run(self._threads, self.crypto_manager.generate_ecc_key_pair, curve)
+    
+    async def derive_key(self, password: bytes, salt: bytes, length: int = 32) -> bytes:
+        """PBKDF2 key derivation off the event loop"""
+        return await self._run(self._processes or self._threads, _pbkdf2_derive, password, salt, length)
+    
+    async def sign_data(self, data: bytes, private_key: Any) -> bytes:
+        """RSA-PSS signing off the event loop"""
+        return await self._run(self._threads, self.crypto_manager.sign_data, data, private_key)
+    
+    async def verify_signature(self, data: bytes, signature: bytes, public_key: Any) -> bool:
+        """RSA-PSS verification off the event loop"""
+        return await self._run(self._threads, self.crypto_manager.verify_signature, data, signature, public_key)
+    
+    async def create_certificate(self,
+                                 subject_name: str,
+                                 public_key: Any,
+                                 validity_days: int = 365,
+                                 is_ca: bool = False) -> x509.Certificate:
+        """Certificate creation and signing off the event loop"""
+        return await self._run(
+            self._threads, self.crypto_manager.create_certificate,
+            subject_name, public_key, validity_days, is_ca
+        )
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue_depth,
+            'max_queue_depth': self.max_queue_depth,
+            'in_flight': self.in_flight,
+            'completed': self.completed,
+            'rejected': self.rejected
+        }
+    
+    def close(self):
+        """Shut down worker pools"""
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+    
+    async def _run(self, executor: Executor, func: Callable, *args) -> Any:
+        """Submit func to executor once a slot is free"""
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            if self.max_wait_seconds is None:
+                await self._slots.acquire()
+            else:
+                try:
+                    await asyncio.wait_for(self._slots.acquire(), self.max_wait_seconds)
+                except asyncio.TimeoutError:
+                    self.rejected += 1
+                    raise CryptoBackpressureError("Crypto worker pool saturated")
+        finally:
+            self.queue_depth -= 1
+        
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+        finally:
+            self.in_flight -= 1
+            self.completed += 1
+            self._slots.release()
+    
+    @staticmethod
+    def _load_key_pair(private_pem: bytes) -> Tuple[Any, Any]:
+        # The key was just generated by our own worker, so the costly RSA
+        # consistency check adds nothing but event loop latency
+        private_key = serialization.load_pem_private_key(
+            private_pem, password=None, unsafe_skip_rsa_key_validation=True
+        )
+        return private_key, private_key.public_key()
+
 class SecureChannelManager:
     """
     Manages secure channels for eSIM communications
@@ -0,0 +1,146 @@
+"""
+Key Pair Pool for eSIM Platform
+Pre-generated RSA/ECC key pairs with watermark-driven background refill
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Tuple
+from cryptography.hazmat.primitives.asymmetric import ec
+from src.security.crypto_manager import AsyncCryptoManager
+
+# (algorithm, parameter): ('rsa', key size) or ('ecc', curve name)
+KeySpec = Tuple[str, Any]
+
+SUPPORTED_CURVES = {
+    'secp256r1': ec.SECP256R1,
+    'secp384r1': ec.SECP384R1,
+    'brainpoolP256r1': ec.BrainpoolP256R1,
+}
+
+DEFAULT_KEY_SPECS = (('rsa', 2048), ('ecc', 'secp256r1'))
+
+class KeyPool:
+    """
+    Stock of ready key pairs per key size / curve
+    A background worker per spec refills the stock from low_watermark up to
+    high_watermark through AsyncCryptoManager. Callers only generate inline
+    when the stock for their spec is empty (a pool miss).
+    """
+    
+    def __init__(self,
+                 async_crypto: AsyncCryptoManager,
+                 specs: Iterable[KeySpec] = DEFAULT_KEY_SPECS,
+                 low_watermark: int = 8,
+                 high_watermark: int = 32,
+                 refill_concurrency: int = 2):
+        if low_watermark > high_watermark:
+            raise ValueError("low_watermark must not exceed high_watermark")
+        
+        self.async_crypto = async_crypto
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.refill_concurrency = refill_concurrency
+        self.logger = logging.getLogger(__name__)
+        self._stock: Dict[KeySpec, Deque[Tuple[Any, Any]]] = {}
+        self._refill_needed: Dict[KeySpec, asyncio.Event] = {}
+        self._workers: Dict[KeySpec, asyncio.Task] = {}
+        self.hits: Dict[KeySpec, int] = {}
+        self.misses: Dict[KeySpec, int] = {}
+        self.generated: Dict[KeySpec, int] = {}
+        
+        for spec in specs:
+            spec = self._normalize(spec)
+            self._stock[spec] = deque()
+            self._refill_needed[spec] = asyncio.Event()
+            self.hits[spec] = self.misses[spec] = self.generated[spec] = 0
+    
+    async def start(self):
+        """Start one refill worker per spec; the stock fills up in the background"""
+        for spec in self._stock:
+            if spec not in self._workers:
+                self._refill_needed[spec].set()
+                self._workers[spec] = asyncio.create_task(self._refill_worker(spec))
+    
+    async def stop(self):
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        self._workers.clear()
+    
+    async def acquire_rsa(self, key_size: int = 2048) -> Tuple[Any, Any]:
+        """Take an RSA key pair from the pool"""
+        return await self.acquire(('rsa', key_size))
+    
+    async def acquire_ecc(self, curve: str = 'secp256r1') -> Tuple[Any, Any]:
+        """Take an ECC key pair from the pool"""
+        return await self.acquire(('ecc', curve))
+    
+    async def acquire(self, spec: KeySpec) -> Tuple[Any, Any]:
+        """Take a key pair for spec, generating inline only if the pool is empty"""
+        spec = self._normalize(spec)
+        stock = self._stock.get(spec)
+        if stock is None:
+            raise ValueError(f"Key spec not pooled: {spec}")
+        
+        if len(stock) - 1 < self.low_watermark:
+            self._refill_needed[spec].set()
+        
+        if stock:
+            self.hits[spec] += 1
+            return stock.popleft()
+        
+        self.misses[spec] += 1
+        return await self._generate(spec)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Pool depth and miss rate per spec"""
+        stats = {}
+        for spec, stock in self._stock.items():
+            requests = self.hits[spec] + self.misses[spec]
+            stats[f"{spec[0]}-{spec[1]}"] = {
+                'depth': len(stock),
+                'hits': self.hits[spec],
+                'misses': self.misses[spec],
+                'miss_rate': self.misses[spec] / requests if requests else 0.0,
+                'generated': self.generated[spec]
+            }
+        return stats
+    
+    async def _refill_worker(self, spec: KeySpec):
+        stock = self._stock[spec]
+        refill_needed = self._refill_needed[spec]
+        while True:
+            await refill_needed.wait()
+            refill_needed.clear()
+            
+            while len(stock) < self.high_watermark:
+                batch = min(self.refill_concurrency, self.high_watermark - len(stock))
+                try:
+                    key_pairs = await asyncio.gather(*(self._generate(spec) for _ in range(batch)))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    self.logger.error(f"Key pool refill failed for {spec}: {str(e)}")
+                    await asyncio.sleep(1.0)
+                    continue
+                stock.extend(key_pairs)
+    
+    async def _generate(self, spec: KeySpec) -> Tuple[Any, Any]:
+        algorithm, parameter = spec
+        if algorithm == 'rsa':
+            key_pair = await self.async_crypto.generate_key_pair(parameter)
+        else:
+            key_pair = await self.async_crypto.generate_ecc_key_pair(SUPPORTED_CURVES[parameter]())
+        self.generated[spec] += 1
+        return key_pair
+    
+    @staticmethod
+    def _normalize(spec: KeySpec) -> KeySpec:
+        algorithm, parameter = spec
+        if algorithm == 'rsa':
+            return ('rsa', int(parameter))
+        if algorithm == 'ecc' and parameter in SUPPORTED_CURVES:
+            return ('ecc', parameter)
+        raise ValueError(f"Unsupported key spec: {spec}")
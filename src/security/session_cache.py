@@ -0,0 +1,128 @@
+"""
+Secure Channel Session Cache
+Reuses established SM-DP+ secure channels across profile downloads
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+SessionKey = Tuple[str, Hashable]
+
+class SecureChannelSession:
+    """An established channel plus its expiry and use accounting"""
+    __slots__ = ('channel', 'established_at', 'expires_at', 'uses')
+    
+    def __init__(self, channel: Any, ttl: float):
+        self.channel = channel
+        self.established_at = time.monotonic()
+        self.expires_at = self.established_at + ttl
+        self.uses = 0
+
+class SecureChannelSessionCache:
+    """
+    Session cache keyed by (SM-DP+ address, security context)
+    Sessions expire after ttl seconds or max_uses acquisitions. Concurrent
+    callers missing the same key share a single establishment; a failed
+    establishment is propagated to every waiter and never cached.
+    """
+    
+    def __init__(self, ttl: float = 300.0, max_uses: int = 1000, max_sessions: int = 1024):
+        self.ttl = ttl
+        self.max_uses = max_uses
+        self.max_sessions = max_sessions
+        self.logger = logging.getLogger(__name__)
+        self._sessions: "OrderedDict[SessionKey, SecureChannelSession]" = OrderedDict()
+        self._pending: Dict[SessionKey, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.collapsed = 0
+        self.establishments = 0
+        self.establish_failures = 0
+        self.establish_seconds_total = 0.0
+        self.establish_seconds_max = 0.0
+    
+    async def acquire(self,
+                      address: str,
+                      context: Hashable,
+                      establish: Callable[[], Awaitable[Any]]) -> Any:
+        """Return a live channel for (address, context), establishing one if needed"""
+        key = (address, context)
+        session = self._sessions.get(key)
+        if session is not None:
+            if session.expires_at > time.monotonic() and session.uses < self.max_uses:
+                session.uses += 1
+                self.hits += 1
+                self._sessions.move_to_end(key)
+                return session.channel
+            del self._sessions[key]
+        
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.collapsed += 1
+            try:
+                channel = await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise
+                # The establishing caller was cancelled, not us - try again
+                return await self.acquire(address, context, establish)
+            
+            session = self._sessions.get(key)
+            if session is not None and session.channel is channel:
+                session.uses += 1
+            return channel
+        
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        started = time.perf_counter()
+        try:
+            channel = await establish()
+        except BaseException as e:
+            self.establish_failures += 1
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # Mark retrieved so an unawaited failure does not log a warning
+                future.exception()
+            raise
+        finally:
+            del self._pending[key]
+        
+        elapsed = time.perf_counter() - started
+        self.establishments += 1
+        self.establish_seconds_total += elapsed
+        self.establish_seconds_max = max(self.establish_seconds_max, elapsed)
+        
+        session = SecureChannelSession(channel, self.ttl)
+        session.uses = 1
+        self._sessions[key] = session
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        
+        future.set_result(channel)
+        return channel
+    
+    def invalidate(self, address: str, context: Optional[Hashable] = None):
+        """Drop sessions for an address (e.g. after the SM-DP+ rejects one)"""
+        for key in [k for k in self._sessions if k[0] == address and (context is None or k[1] == context)]:
+            del self._sessions[key]
+    
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.collapsed
+        return {
+            'sessions': len(self._sessions),
+            'hits': self.hits,
+            'misses': self.misses,
+            'collapsed': self.collapsed,
+            'hit_rate': (self.hits + self.collapsed) / lookups if lookups else 0.0,
+            'establishments': self.establishments,
+            'establish_failures': self.establish_failures,
+            'establish_seconds_avg': (self.establish_seconds_total / self.establishments
+                                      if self.establishments else 0.0),
+            'establish_seconds_max': self.establish_seconds_max
+        }
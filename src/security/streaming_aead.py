@@ -0,0 +1,242 @@
+"""
+Streaming AES-GCM for Large Payloads
+Framed, chunk-authenticated encryption of bound profile packages and icons
+"""
+
+import os
+import struct
+from typing import AsyncIterable, AsyncIterator, BinaryIO, Iterable, Iterator, Optional, Union
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+# Stream layout:
+#   header = MAGIC(4) | VERSION(1) | chunk_size(4, big endian) | nonce_prefix(7)
+#   frame  = AES-GCM(chunk) | tag(16)
+# Every frame but the last carries exactly chunk_size bytes of plaintext. The
+# frame nonce is nonce_prefix | counter(4) | last_flag(1) and the header is
+# bound into each frame's AAD, so reordering, truncation and header tampering
+# all fail authentication.
+MAGIC = b'EGCM'
+VERSION = 1
+HEADER_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 64 * 1024
+_MAX_FRAMES = 2 ** 32
+# update_into needs block size - 1 bytes of slack beyond the input length
+_SLACK = 15
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+def required_buffer_size(chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Minimum size of a caller-provided output buffer"""
+    return chunk_size + TAG_SIZE + _SLACK
+
+class _FrameSplitter:
+    """
+    Regroups arbitrary input chunks into fixed-size frames without copying
+    Frames are memoryviews into the input where possible; data is only copied
+    when a frame straddles two input chunks. One full frame is held back until
+    more input arrives, since only then is it known not to be the last one.
+    Input buffers must not be mutated after they are pushed.
+    """
+    
+    def __init__(self, size: int):
+        self.size = size
+        self._held: Optional[memoryview] = None
+        self._carry = bytearray()
+    
+    def push(self, data: Buffer) -> Iterator[memoryview]:
+        """Yield every frame that is now known not to be the last"""
+        view = memoryview(data).cast('B')
+        while len(view):
+            if self._held is not None:
+                held, self._held = self._held, None
+                yield held
+            
+            if not self._carry and len(view) >= self.size:
+                self._held = view[:self.size]
+                view = view[self.size:]
+            else:
+                take = min(self.size - len(self._carry), len(view))
+                self._carry += view[:take]
+                view = view[take:]
+                if len(self._carry) == self.size:
+                    self._held = memoryview(self._carry)
+                    self._carry = bytearray()
+    
+    def finish(self) -> memoryview:
+        """Return the final (possibly short or empty) frame"""
+        if self._held is not None:
+            return self._held
+        return memoryview(self._carry)
+
+class AESGCMStreamEncryptor:
+    """
+    Incremental framed AES-GCM encryption
+    update() yields ciphertext frames as soon as they are complete; finalize()
+    returns the last frame. With a caller-provided out buffer (see
+    required_buffer_size) frames are memoryviews into it and are only valid
+    until the next frame is produced; otherwise each frame gets its own buffer.
+    """
+    
+    def __init__(self,
+                 key: bytes,
+                 aad: Optional[bytes] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 out: Optional[Union[bytearray, memoryview]] = None):
+        if out is not None and len(out) < required_buffer_size(chunk_size):
+            raise ValueError("Output buffer too small for chunk size")
+        
+        self._algorithm = algorithms.AES(key)
+        self._nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        self.header = MAGIC + struct.pack('>BI', VERSION, chunk_size) + self._nonce_prefix
+        self._aad = self.header + (aad or b'')
+        self._chunk_size = chunk_size
+        self._out = memoryview(out).cast('B') if out is not None else None
+        self._splitter = _FrameSplitter(chunk_size)
+        self._counter = 0
+        self._finalized = False
+    
+    def update(self, data: Buffer) -> Iterator[memoryview]:
+        for frame in self._splitter.push(data):
+            yield self._seal(frame, last=False)
+    
+    def finalize(self) -> memoryview:
+        if self._finalized:
+            raise ValueError("Stream already finalized")
+        self._finalized = True
+        return self._seal(self._splitter.finish(), last=True)
+    
+    def _seal(self, plaintext: memoryview, last: bool) -> memoryview:
+        nonce = _frame_nonce(self._nonce_prefix, self._counter, last)
+        self._counter += 1
+        
+        out = self._out if self._out is not None else memoryview(bytearray(len(plaintext) + TAG_SIZE + _SLACK))
+        encryptor = Cipher(self._algorithm, modes.GCM(nonce)).encryptor()
+        encryptor.authenticate_additional_data(self._aad)
+        written = encryptor.update_into(plaintext, out)
+        encryptor.finalize()
+        out[written:written + TAG_SIZE] = encryptor.tag
+        return out[:written + TAG_SIZE]
+
+class AESGCMStreamDecryptor:
+    """
+    Incremental decryption of streams produced by AESGCMStreamEncryptor
+    Plaintext is released frame by frame only after that frame's tag verifies.
+    finalize() raises InvalidTag if the stream was truncated or tampered with.
+    """
+    
+    def __init__(self,
+                 key: bytes,
+                 aad: Optional[bytes] = None,
+                 out: Optional[Union[bytearray, memoryview]] = None):
+        self._algorithm = algorithms.AES(key)
+        self._user_aad = aad or b''
+        self._out = memoryview(out).cast('B') if out is not None else None
+        self._header = bytearray()
+        self._splitter: Optional[_FrameSplitter] = None
+        self._counter = 0
+    
+    def update(self, data: Buffer) -> Iterator[memoryview]:
+        view = memoryview(data).cast('B')
+        if self._splitter is None:
+            take = min(HEADER_SIZE - len(self._header), len(view))
+            self._header += view[:take]
+            view = view[take:]
+            if len(self._header) < HEADER_SIZE:
+                return
+            self._start()
+        
+        for frame in self._splitter.push(view):
+            yield self._open(frame, last=False)
+    
+    def finalize(self) -> memoryview:
+        if self._splitter is None:
+            raise ValueError("Truncated stream header")
+        frame = self._splitter.finish()
+        if len(frame) < TAG_SIZE:
+            raise InvalidTag()
+        return self._open(frame, last=True)
+    
+    def _start(self):
+        magic, (version, chunk_size) = self._header[:4], struct.unpack('>BI', self._header[4:9])
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Unsupported stream format")
+        if self._out is not None and len(self._out) < chunk_size + _SLACK:
+            raise ValueError("Output buffer too small for chunk size")
+        
+        self._nonce_prefix = bytes(self._header[9:])
+        self._aad = bytes(self._header) + self._user_aad
+        self._splitter = _FrameSplitter(chunk_size + TAG_SIZE)
+    
+    def _open(self, frame: memoryview, last: bool) -> memoryview:
+        nonce = _frame_nonce(self._nonce_prefix, self._counter, last)
+        self._counter += 1
+        
+        ciphertext, tag = frame[:-TAG_SIZE], bytes(frame[-TAG_SIZE:])
+        out = self._out if self._out is not None else memoryview(bytearray(len(ciphertext) + _SLACK))
+        decryptor = Cipher(self._algorithm, modes.GCM(nonce, tag)).decryptor()
+        decryptor.authenticate_additional_data(self._aad)
+        written = decryptor.update_into(ciphertext, out)
+        decryptor.finalize()
+        return out[:written]
+
+def _frame_nonce(prefix: bytes, counter: int, last: bool) -> bytes:
+    if counter >= _MAX_FRAMES:
+        raise ValueError("Stream exceeds maximum frame count")
+    return prefix + struct.pack('>IB', counter, 1 if last else 0)
+
+def iter_file_chunks(fileobj: BinaryIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Read a binary file in fixed-size chunks (each chunk is a fresh buffer)"""
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def encrypt_stream(chunks: Iterable[Buffer],
+                   key: bytes,
+                   aad: Optional[bytes] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   out: Optional[Union[bytearray, memoryview]] = None) -> Iterator[memoryview]:
+    """Encrypt an iterable of chunks (or [mmap]) into header + frames"""
+    encryptor = AESGCMStreamEncryptor(key, aad, chunk_size, out)
+    yield memoryview(encryptor.header)
+    for chunk in chunks:
+        yield from encryptor.update(chunk)
+    yield encryptor.finalize()
+
+def decrypt_stream(chunks: Iterable[Buffer],
+                   key: bytes,
+                   aad: Optional[bytes] = None,
+                   out: Optional[Union[bytearray, memoryview]] = None) -> Iterator[memoryview]:
+    """Decrypt an iterable of ciphertext chunks, yielding verified plaintext"""
+    decryptor = AESGCMStreamDecryptor(key, aad, out)
+    for chunk in chunks:
+        yield from decryptor.update(chunk)
+    yield decryptor.finalize()
+
+async def encrypt_stream_async(chunks: AsyncIterable[Buffer],
+                               key: bytes,
+                               aad: Optional[bytes] = None,
+                               chunk_size: int = DEFAULT_CHUNK_SIZE,
+                               out: Optional[Union[bytearray, memoryview]] = None) -> AsyncIterator[memoryview]:
+    """Async variant of encrypt_stream"""
+    encryptor = AESGCMStreamEncryptor(key, aad, chunk_size, out)
+    yield memoryview(encryptor.header)
+    async for chunk in chunks:
+        for frame in encryptor.update(chunk):
+            yield frame
+    yield encryptor.finalize()
+
+async def decrypt_stream_async(chunks: AsyncIterable[Buffer],
+                               key: bytes,
+                               aad: Optional[bytes] = None,
+                               out: Optional[Union[bytearray, memoryview]] = None) -> AsyncIterator[memoryview]:
+    """Async variant of decrypt_stream"""
+    decryptor = AESGCMStreamDecryptor(key, aad, out)
+    async for chunk in chunks:
+        for plaintext in decryptor.update(chunk):
+            yield plaintext
+    yield decryptor.finalize()
@@ -0,0 +1,191 @@
+"""
+Tests for the read-through lookup cache
+"""
+
+import asyncio
+import json
+from dataclasses import asdict, dataclass
+from types import SimpleNamespace
+import pytest
+
+from src.core import cache as cache_module
+from src.core.cache import LRUTTLCache, ReadThroughCache, _MISSING
+from src.core.redis_stub import InMemoryRedis
+
+@dataclass
+class Record:
+    name: str
+    
+    def to_dict(self):
+        return asdict(self)
+    
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manually advanced monotonic clock for the cache module"""
+    now = [1000.0]
+    monkeypatch.setattr(cache_module, "time", SimpleNamespace(monotonic=lambda: now[0]))
+    return now
+
+class CountingLoader:
+    def __init__(self, value, delay: float = 0.0):
+        self.value = value
+        self.delay = delay
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        value = self.value
+        await asyncio.sleep(self.delay)
+        return value
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUTTLCache(max_size=2, ttl=60)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    
+    assert lru.get("b") is _MISSING
+    assert lru.get("a") == 1
+    assert lru.get("c") == 3
+    assert len(lru) == 2
+
+def test_lru_entries_expire(clock):
+    lru = LRUTTLCache(max_size=10, ttl=5)
+    lru.set("a", 1)
+    lru.set("b", 2, ttl=20)
+    clock[0] += 6
+    
+    assert lru.get("a") is _MISSING
+    assert lru.get("b") == 2
+
+@pytest.mark.asyncio
+async def test_hit_after_load(clock):
+    cache = ReadThroughCache(ttl=10)
+    loader = CountingLoader("v1")
+    
+    assert await cache.get_or_load("k", loader) == "v1"
+    assert await cache.get_or_load("k", loader) == "v1"
+    assert loader.calls == 1
+    
+    clock[0] += 11
+    assert await cache.get_or_load("k", loader) == "v1"
+    assert loader.calls == 2
+    assert cache.stats()['hits'] == 1
+
+@pytest.mark.asyncio
+async def test_none_is_cached_only_when_requested(clock):
+    cache = ReadThroughCache(ttl=60, negative_ttl=5)
+    loader = CountingLoader(None)
+    
+    await cache.get_or_load("plain", loader)
+    await cache.get_or_load("plain", loader)
+    assert loader.calls == 2
+    
+    loader.calls = 0
+    await cache.get_or_load("negative", loader, cache_none=True)
+    await cache.get_or_load("negative", loader, cache_none=True)
+    assert loader.calls == 1
+    
+    # Negative entries use the short TTL
+    clock[0] += 6
+    await cache.get_or_load("negative", loader, cache_none=True)
+    assert loader.calls == 2
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_load():
+    cache = ReadThroughCache()
+    loader = CountingLoader("v1", delay=0.01)
+    
+    results = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(20)))
+    
+    assert results == ["v1"] * 20
+    assert loader.calls == 1
+    assert cache.stats()['collapsed'] == 19
+
+@pytest.mark.asyncio
+async def test_failed_load_reaches_every_waiter_and_is_not_cached():
+    cache = ReadThroughCache()
+    
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("store unavailable")
+    
+    results = await asyncio.gather(*(cache.get_or_load("k", failing) for _ in range(3)),
+                                   return_exceptions=True)
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert await cache.get_or_load("k", CountingLoader("v1")) == "v1"
+
+@pytest.mark.asyncio
+async def test_waiters_reload_when_the_loading_caller_is_cancelled():
+    cache = ReadThroughCache()
+    loader = CountingLoader("v1", delay=0.02)
+    
+    leader = asyncio.create_task(cache.get_or_load("k", loader))
+    await asyncio.sleep(0)
+    waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(3)]
+    await asyncio.sleep(0.005)
+    leader.cancel()
+    
+    assert await asyncio.gather(*waiters) == ["v1"] * 3
+    assert loader.calls == 2
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("redis", [False, True])
+async def test_invalidate_during_load_does_not_cache_stale_value(redis):
+    cache = ReadThroughCache(redis_client=InMemoryRedis() if redis else None)
+    store = {"k": "v1"}
+    
+    async def load():
+        value = store["k"]
+        await asyncio.sleep(0.02)
+        return value
+    
+    stale = asyncio.create_task(cache.get_or_load("k", load))
+    await asyncio.sleep(0.005)
+    store["k"] = "v2"
+    await cache.invalidate("k")
+    
+    # A lookup after the write starts its own load instead of joining the stale one
+    assert await cache.get_or_load("k", load) == "v2"
+    assert await stale == "v1"
+    assert await cache.get_or_load("k", load) == "v2"
+    assert cache.stats()['stale_loads'] == 1
+
+@pytest.mark.asyncio
+async def test_redis_tier_serves_other_instances():
+    redis = InMemoryRedis()
+    first = ReadThroughCache(redis_client=redis, namespace="t")
+    second = ReadThroughCache(redis_client=redis, namespace="t")
+    loader = CountingLoader(Record("alpha"))
+    
+    assert await first.get_or_load("k", loader, codec=Record) == Record("alpha")
+    assert json.loads(await redis.get("t:cache:k")) == {"name": "alpha"}
+    
+    assert await second.get_or_load("k", loader, codec=Record) == Record("alpha")
+    assert loader.calls == 1
+    assert second.stats()['redis_hits'] == 1
+    
+    await first.invalidate("k")
+    assert await redis.get("t:cache:k") is None
+    
+    loader.value = Record("beta")
+    second.local.clear()
+    assert await second.get_or_load("k", loader, codec=Record) == Record("beta")
+
+@pytest.mark.asyncio
+async def test_redis_failures_fall_back_to_loader():
+    class BrokenRedis:
+        async def get(self, key):
+            raise ConnectionError("down")
+        
+        async def set(self, *args, **kwargs):
+            raise ConnectionError("down")
+    
+    cache = ReadThroughCache(redis_client=BrokenRedis())
+    assert await cache.get_or_load("k", CountingLoader("v1")) == "v1"
+    assert cache.stats()['redis_errors'] == 2
@@ -0,0 +1,71 @@
+"""
+Tests for the profile change feed
+"""
+
+import asyncio
+import pytest
+
+from src.core.change_feed import ChangeFeed, ChangeFeedGap
+from src.core.redis_stub import InMemoryRedis
+
+def publish(feed: ChangeFeed, count: int, eid: str = "E1"):
+    for i in range(count):
+        feed.publish(eid, f"8901{i:015d}", "enable", "disabled", "enabled")
+
+@pytest.mark.asyncio
+async def test_local_feed_filters_and_resumes():
+    feed = ChangeFeed(history_size=100)
+    subscription = feed.subscribe(eid="E1", states={"enabled"})
+    publish(feed, 3)
+    publish(feed, 2, eid="E2")
+    
+    events = [await subscription.get(0) for _ in range(3)]
+    assert [event["offset"] for event in events] == [1, 2, 3]
+    assert await subscription.get(0) is None
+    
+    resumed = feed.subscribe(cursor=feed.cursor(events[0]))
+    assert [(await resumed.get(0))["offset"] for _ in range(4)] == [2, 3, 4, 5]
+
+@pytest.mark.asyncio
+async def test_resume_beyond_history_raises_gap():
+    feed = ChangeFeed(history_size=2)
+    publish(feed, 5)
+    
+    subscription = feed.subscribe(cursor=f"{feed.epoch}-1")
+    with pytest.raises(ChangeFeedGap):
+        await subscription.get(0)
+    with pytest.raises(ChangeFeedGap):
+        await feed.subscribe(cursor="other-epoch-3").get(0)
+
+@pytest.mark.asyncio
+async def test_stop_publishes_queued_events_first():
+    redis = InMemoryRedis()
+    other_worker = redis.pubsub()
+    await other_worker.subscribe("esim:profile-changes")
+    feed = ChangeFeed(redis_client=redis)
+    await feed.start()
+    publish(feed, 50)
+    
+    await feed.stop()
+    
+    assert feed._outbox.empty()
+    received = []
+    while (message := await other_worker.get_message(timeout=0.01)) is not None:
+        received.append(message)
+    assert len(received) == 50
+
+@pytest.mark.asyncio
+async def test_stop_gives_up_on_a_hung_publisher():
+    redis = InMemoryRedis()
+    feed = ChangeFeed(redis_client=redis)
+    await feed.start()
+    
+    async def hang(key):
+        await asyncio.sleep(3600)
+    
+    redis.incr = hang
+    publish(feed, 3)
+    
+    await asyncio.wait_for(feed.stop(timeout=0.05), 1.0)
+    assert feed.published == 0
+    assert feed._outbox.qsize() == 2
@@ -0,0 +1,132 @@
+"""
+Tests for idempotent request execution
+"""
+
+import asyncio
+import pytest
+
+from src.core.idempotency import IdempotencyConflictError, IdempotencyStore
+from src.core.redis_stub import InMemoryRedis
+
+class Operation:
+    """Counts executions and returns a result naming the execution"""
+    
+    def __init__(self, delay: float = 0.01, result: str = "ok"):
+        self.delay = delay
+        self.result = result
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        call = self.calls
+        await asyncio.sleep(self.delay)
+        return {"result": self.result, "call": call}
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_share_one_execution():
+    store = IdempotencyStore()
+    operation = Operation()
+    
+    results = await asyncio.gather(*(store.execute("key", "fp", operation) for _ in range(20)))
+    
+    assert operation.calls == 1
+    assert all(result == {"result": "ok", "call": 1} for result in results)
+    assert store.stats()['joined'] == 19
+
+@pytest.mark.asyncio
+async def test_header_key_result_is_replayed():
+    store = IdempotencyStore()
+    operation = Operation()
+    
+    first = await store.execute("key", "fp", operation)
+    second = await store.execute("key", "fp", operation)
+    
+    assert operation.calls == 1
+    assert second == first
+    assert store.stats()['replayed'] == 1
+
+@pytest.mark.asyncio
+async def test_error_result_is_not_replayed():
+    store = IdempotencyStore()
+    operation = Operation(result="error")
+    
+    await store.execute("key", "fp", operation)
+    await store.execute("key", "fp", operation)
+    
+    assert operation.calls == 2
+
+@pytest.mark.asyncio
+async def test_fingerprint_mismatch_conflicts():
+    store = IdempotencyStore()
+    operation = Operation()
+    
+    # While in flight and once stored
+    first = asyncio.create_task(store.execute("key", "fp", operation))
+    await asyncio.sleep(0)
+    with pytest.raises(IdempotencyConflictError):
+        await store.execute("key", "other", operation)
+    await first
+    with pytest.raises(IdempotencyConflictError):
+        await store.execute("key", "other", operation)
+    assert operation.calls == 1
+
+@pytest.mark.asyncio
+async def test_derived_keys_join_in_flight_but_are_not_replayed():
+    store = IdempotencyStore()
+    operation = Operation()
+    
+    concurrent = await asyncio.gather(*(store.execute("key", "fp", operation, derived=True) for _ in range(5)))
+    assert operation.calls == 1
+    assert all(result["call"] == 1 for result in concurrent)
+    
+    later = await store.execute("key", "fp", operation, derived=True)
+    assert later["call"] == 2
+    assert store.stats()['replayed'] == 0
+    assert store.stats()['stored_results'] == 0
+
+@pytest.mark.asyncio
+async def test_failed_execution_is_taken_over_by_waiters():
+    store = IdempotencyStore()
+    calls = 0
+    
+    async def flaky():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if calls == 1:
+            raise ConnectionError("store unavailable")
+        return {"result": "ok"}
+    
+    results = await asyncio.gather(store.execute("key", "fp", flaky), store.execute("key", "fp", flaky),
+                                   return_exceptions=True)
+    
+    assert isinstance(results[0], ConnectionError)
+    assert results[1] == {"result": "ok"}
+    assert calls == 2
+
+@pytest.mark.asyncio
+async def test_workers_sharing_redis_execute_once():
+    redis = InMemoryRedis()
+    workers = [IdempotencyStore(redis_client=redis, poll_interval=0.005) for _ in range(3)]
+    operation = Operation(delay=0.05)
+    
+    results = await asyncio.gather(*(worker.execute("key", "fp", operation) for worker in workers))
+    assert operation.calls == 1
+    assert all(result == results[0] for result in results)
+    
+    # A fresh worker replays from Redis and still checks the fingerprint
+    late = IdempotencyStore(redis_client=redis)
+    assert await late.execute("key", "fp", operation) == results[0]
+    with pytest.raises(IdempotencyConflictError):
+        await IdempotencyStore(redis_client=redis).execute("key", "other", operation)
+    assert operation.calls == 1
+
+@pytest.mark.asyncio
+async def test_derived_keys_are_not_shared_through_redis():
+    redis = InMemoryRedis()
+    operation = Operation()
+    
+    await IdempotencyStore(redis_client=redis).execute("key", "fp", operation, derived=True)
+    await IdempotencyStore(redis_client=redis).execute("key", "fp", operation, derived=True)
+    
+    assert operation.calls == 2
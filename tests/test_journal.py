@@ -0,0 +1,72 @@
+"""
+Tests for the write-behind operation journal
+"""
+
+from datetime import datetime
+import pytest
+
+from src.core.journal import WriteBehindJournal
+
+class FlakyStore:
+    def __init__(self):
+        self.failing = True
+        self.operations = {}
+        self.audit = {}
+    
+    async def insert_profile_operations(self, rows):
+        if self.failing:
+            raise ConnectionError("store unavailable")
+        self.operations.update((row["operation_id"], row) for row in rows)
+    
+    async def insert_audit_records(self, rows):
+        if self.failing:
+            raise ConnectionError("store unavailable")
+        self.audit.update((row["id"], row) for row in rows)
+
+def record(journal: WriteBehindJournal, count: int):
+    for i in range(count):
+        journal.record_operation(f"{i:032X}", None, "enable", {"result": "ok"}, datetime.utcnow())
+
+@pytest.mark.asyncio
+async def test_failed_flushes_drop_overflow_without_spill():
+    store = FlakyStore()
+    journal = WriteBehindJournal(store, max_buffered=10)
+    
+    record(journal, 8)
+    await journal.flush()
+    record(journal, 8)
+    await journal.flush()
+    
+    stats = journal.stats()
+    assert stats['buffered'] == 10
+    assert stats['dropped'] == 22
+    assert stats['flush_failures'] == 2
+    
+    store.failing = False
+    await journal.flush()
+    assert len(store.operations) + len(store.audit) == 10
+
+@pytest.mark.asyncio
+async def test_overflow_stays_in_spill_segments_until_restart(tmp_path):
+    store = FlakyStore()
+    spill_path = str(tmp_path / "journal")
+    journal = WriteBehindJournal(store, flush_interval=60, spill_path=spill_path, max_buffered=10)
+    await journal.start()
+    
+    record(journal, 20)
+    await journal.flush()
+    assert journal.stats()['buffered'] == 10
+    assert journal.stats()['spilled'] == 30
+    
+    # The buffered tail reaches the store; the evicted records' segments survive
+    store.failing = False
+    await journal.stop()
+    assert len(store.operations) + len(store.audit) == 10
+    assert list(tmp_path.iterdir())
+    
+    restarted = WriteBehindJournal(store, flush_interval=60, spill_path=spill_path)
+    await restarted.start()
+    await restarted.stop()
+    assert len(store.operations) == 20
+    assert len(store.audit) == 20
+    assert not list(tmp_path.iterdir())
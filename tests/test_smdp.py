@@ -0,0 +1,139 @@
+"""
+End-to-end tests for the ES9+ client against the stub SM-DP+
+"""
+
+import os
+import pytest
+import pytest_asyncio
+
+from src.core.esim_manager import ESIMManager, EUICCInfo, OperationResult
+from src.core.smdp_client import SMDPClient, SMDPError
+from src.core.smdp_stub import StubSMDPServer
+
+@pytest_asyncio.fixture
+async def smdp():
+    server = StubSMDPServer(bpp_size=100_000)
+    await server.start()
+    yield server
+    await server.stop()
+
+@pytest_asyncio.fixture
+async def client():
+    client = SMDPClient(retries=1, backoff_base=0.01)
+    yield client
+    await client.close()
+
+async def begin(client: SMDPClient, address: str) -> str:
+    return (await client.initiate_authentication(address, "Y2hhbGxlbmdl"))["transactionId"]
+
+@pytest.mark.asyncio
+async def test_download_streams_package_to_file(smdp, client, tmp_path):
+    transaction_id = await begin(client, smdp.address)
+    auth = await client.authenticate_client(smdp.address, transaction_id, matching_id="MATCH1")
+    assert len(auth["profileMetadata"]["iccid"]) == 19
+    
+    path = str(tmp_path / "profile.bpp")
+    size = await client.get_bound_profile_package(smdp.address, transaction_id, path)
+    assert size == 100_000
+    assert os.path.getsize(path) == 100_000
+
+@pytest.mark.asyncio
+async def test_download_streams_package_to_sink(smdp, client):
+    transaction_id = await begin(client, smdp.address)
+    await client.authenticate_client(smdp.address, transaction_id)
+    chunks = []
+    
+    async def sink(chunk: bytes):
+        chunks.append(chunk)
+    
+    assert await client.get_bound_profile_package(smdp.address, transaction_id, sink) == 100_000
+    assert sum(map(len, chunks)) == 100_000
+
+@pytest.mark.asyncio
+async def test_unknown_transaction_is_rejected(smdp, client):
+    with pytest.raises(SMDPError, match="3.9"):
+        await client.authenticate_client(smdp.address, "0" * 32)
+
+@pytest.mark.asyncio
+async def test_package_requires_authenticate_client_first(smdp, client, tmp_path):
+    transaction_id = await begin(client, smdp.address)
+    path = str(tmp_path / "profile.bpp")
+    with pytest.raises(SMDPError, match="1.2"):
+        await client.get_bound_profile_package(smdp.address, transaction_id, path)
+    assert not os.path.exists(path)
+
+@pytest.mark.asyncio
+async def test_completed_transaction_cannot_be_reused(smdp, client, tmp_path):
+    transaction_id = await begin(client, smdp.address)
+    await client.authenticate_client(smdp.address, transaction_id)
+    await client.get_bound_profile_package(smdp.address, transaction_id, str(tmp_path / "a.bpp"))
+    
+    with pytest.raises(SMDPError):
+        await client.authenticate_client(smdp.address, transaction_id)
+    with pytest.raises(SMDPError):
+        await client.get_bound_profile_package(smdp.address, transaction_id, str(tmp_path / "b.bpp"))
+
+@pytest.mark.asyncio
+async def test_transient_failures_are_retried(client):
+    server = StubSMDPServer(bpp_size=1000, failure_rate=0.5)
+    await server.start()
+    client.retries = 20
+    try:
+        for _ in range(10):
+            transaction_id = await begin(client, server.address)
+            await client.authenticate_client(server.address, transaction_id)
+        assert client.retried > 0
+        assert client.failures == 0
+    finally:
+        await server.stop()
+
+@pytest.mark.asyncio
+async def test_manager_runs_one_transaction_per_download(smdp, tmp_path):
+    manager = ESIMManager({
+        'default_notification_address': smdp.address,
+        'smdp_spool_dir': str(tmp_path)
+    })
+    await manager.initialize()
+    try:
+        eids = [f"{i:032X}" for i in range(3)]
+        for eid in eids:
+            await manager.register_euicc(EUICCInfo(eid, {}, [], None, 'lpa.ds.gsma.com'))
+        for i, eid in enumerate(eids):
+            result = await manager.download_profile(eid, f"1${smdp.address}$MATCH{i}")
+            assert result["result"] == OperationResult.OK.value, result
+        
+        # The downloads share one cached channel but never a transaction
+        assert manager.channel_sessions.stats()['establishments'] == 1
+        assert len(smdp.transactions) == 3
+        assert all(t["step"] == "completed" for t in smdp.transactions.values())
+        assert os.listdir(tmp_path) == []
+    finally:
+        await manager.shutdown()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("retryable, sessions_left", [(False, 0), (True, 1)])
+async def test_manager_drops_channel_rejected_by_smdp(smdp, tmp_path, monkeypatch, retryable, sessions_left):
+    manager = ESIMManager({
+        'default_notification_address': smdp.address,
+        'smdp_spool_dir': str(tmp_path)
+    })
+    await manager.initialize()
+    try:
+        eid = "0" * 32
+        await manager.register_euicc(EUICCInfo(eid, {}, [], None, 'lpa.ds.gsma.com'))
+        authenticate_client = manager.smdp_client.authenticate_client
+        
+        async def reject(*args, **kwargs):
+            raise SMDPError("authenticateClient failed: Failed", 200, retryable=retryable)
+        
+        monkeypatch.setattr(manager.smdp_client, "authenticate_client", reject)
+        result = await manager.download_profile(eid, f"1${smdp.address}$MATCH")
+        assert result["result"] == OperationResult.ERROR.value
+        assert manager.channel_sessions.stats()['sessions'] == sessions_left
+        
+        monkeypatch.setattr(manager.smdp_client, "authenticate_client", authenticate_client)
+        result = await manager.download_profile(eid, f"1${smdp.address}$MATCH")
+        assert result["result"] == OperationResult.OK.value, result
+        assert manager.channel_sessions.stats()['establishments'] == 2 - sessions_left
+    finally:
+        await manager.shutdown()